@@ -39,16 +39,21 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # DRF's JSON renderer, through orjson when it is installed (core/renderers.py).
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     # 1. Add Throttling Classes
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',  # For guests (not logged in)
-        'rest_framework.throttling.UserRateThrottle'   # For logged-in users
+        'core.throttling.AnonRateThrottle',  # For guests (not logged in)
+        'core.throttling.UserRateThrottle'   # For logged-in users
     ],
 
     # 2. Set the Rates
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '150/hour',      # Guests: 150 requests per hour
-        'user': '1000/hour',     # Users: 1000 requests per hour
+        'anon': os.getenv('ANON_THROTTLE_RATE', '150/hour'),   # Guests: 150 requests per hour
+        'user': os.getenv('USER_THROTTLE_RATE', '1000/hour'),  # Users: 1000 requests per hour
         'signup': '5/minute',    # Custom Scope: strict limit for creating accounts!
     }
 }
@@ -60,6 +65,20 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# Seconds the user behind an access token is cached by core.authentication (dropped on save),
+# when JWT_USER_CACHE is on.
+JWT_USER_CACHE_TIMEOUT = int(os.getenv("JWT_USER_CACHE_TIMEOUT", "60"))
+# Serve safe requests from the token's claims without loading the user. A deactivated or
+# demoted user then keeps read access until their access token expires.
+JWT_STATELESS_READS = os.getenv("JWT_STATELESS_READS", "False") == "True"
+# Bloom filter of blacklisted refresh tokens in core.tokens: expected size, the longest a
+# process goes without checking for new rows, and how often it is rebuilt to drop expired ones.
+TOKEN_BLACKLIST_FILTER_CAPACITY = int(os.getenv("TOKEN_BLACKLIST_FILTER_CAPACITY", "100000"))
+TOKEN_BLACKLIST_FILTER_MAX_AGE = float(os.getenv("TOKEN_BLACKLIST_FILTER_MAX_AGE", "5"))
+TOKEN_BLACKLIST_FILTER_REBUILD = float(os.getenv("TOKEN_BLACKLIST_FILTER_REBUILD", "3600"))
+# Rows below the highest id seen that each sync reads again, for ids that commit out of order.
+TOKEN_BLACKLIST_FILTER_LOOKBACK = int(os.getenv("TOKEN_BLACKLIST_FILTER_LOOKBACK", "100"))
+
 
 # Application definition
 
@@ -82,7 +101,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',        # Serve static files in production
+    'core.middleware.WhiteNoiseMiddleware',              # Serve static files in production (async-capable)
+    'core.instrumentation.PerformanceMiddleware',        # Server-Timing, /core/_metrics and budgets
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,10 +141,92 @@ import dj_database_url
 DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv("DATABASE_URL"),
-        conn_max_age=600
+        # Persistent connections are per thread, which under ASGI means per request:
+        # the Procfile sets CONN_MAX_AGE=0 for uvicorn workers.
+        conn_max_age=int(os.getenv("CONN_MAX_AGE", "600")),
+        # Test a persistent connection before reusing it, rather than failing a request on it.
+        conn_health_checks=True,
     )
 }
 
+# On PostgreSQL each worker process borrows connections from its own psycopg 3 pool
+# (psycopg[pool]) instead of opening one per request or per thread, so at most
+# DB_POOL_MAX_SIZE times the number of workers connections are open. Connections are checked
+# when borrowed and replaced after DB_POOL_MAX_LIFETIME; a request waits up to DB_POOL_TIMEOUT
+# for one. Pool statistics are exported by /core/_metrics.
+DATABASE_POOL = os.getenv("DATABASE_POOL", "True") == "True"
+if DATABASE_POOL and DATABASES["default"].get("ENGINE") == "django.db.backends.postgresql":
+    from psycopg_pool import ConnectionPool
+
+    # The pool keeps the connections open; Django refuses persistent connections on top of it.
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+        "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+        "check": ConnectionPool.check_connection,
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Redis when REDIS_URL is set (needs the redis package), a file cache when CACHE_DIR is set,
+# otherwise a size-capped local-memory LRU. Local memory is per process, so with several
+# gunicorn workers a worker can serve a cached list for up to RESPONSE_CACHE_TIMEOUT after an
+# edit made through another worker; use Redis there.
+
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+elif os.getenv("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR"),
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    }
+
+# Seconds a cached list response is kept (see core/cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "300"))
+
+# Serve list GETs through compiled serializers (core/compiled.py), which map values() rows
+# straight to the same output instead of building model instances and serializing them.
+COMPILED_SERIALIZERS = os.getenv("COMPILED_SERIALIZERS", "True") == "True"
+
+# Most objects one POST to a bulk endpoint may create (core/bulk.py).
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+
+# Most tags in the ?facets=true block of the story and event lists (core/facets.py).
+TAG_FACET_LIMIT = int(os.getenv("TAG_FACET_LIMIT", "50"))
+
+# Threads that build uncached /core/home/ sections in parallel (core/home.py); 0 or 1 builds
+# them one after another on the request's own connection.
+HOME_SECTION_WORKERS = int(os.getenv("HOME_SECTION_WORKERS", "4"))
+
+# Where core.throttling keeps rate limit counters. They must be shared by all workers, so
+# the cache only when it is Redis, otherwise a database table.
+THROTTLE_STORE = os.getenv("THROTTLE_STORE", "cache" if REDIS_URL else "database")
+
+# Cache the user behind an access token (core.authentication). Saving a user drops it from the
+# cache, which every worker only sees when the cache is shared, so on by default with Redis only.
+JWT_USER_CACHE = os.getenv("JWT_USER_CACHE", "True" if REDIS_URL else "False") == "True"
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -161,7 +263,44 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# collectstatic writes hashed copies of every file, which WhiteNoise serves with
+# "Cache-Control: immutable", and Brotli and gzip versions of them (core/storage.py).
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "core.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Full-text search backend: "auto" picks PostgreSQL tsvector or SQLite FTS5 by database
+# vendor, "python" forces the portable inverted index (run rebuild_search_index after switching)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+# Per-view limits checked by core.instrumentation.PerformanceMiddleware, keyed by
+# "METHOD url-name" (or a bare url name for every method). Limits: "queries", "db_ms", "total_ms". Over budget logs a warning, or raises when
+# PERFORMANCE_BUDGET_ACTION is "raise" (as in the test suite).
+PERFORMANCE_BUDGETS = {
+    "GET core:team-member-list-create": {"queries": 3},
+    "GET core:announcement-list-create": {"queries": 3},
+    "GET core:tag-list-create": {"queries": 3},
+    "GET core:event-list-create": {"queries": 4},
+    "GET core:fanart-list-create": {"queries": 3},
+    "GET core:seasonal-report-list-create": {"queries": 3},
+    "GET core:blogpost-list-create": {"queries": 3},
+    "GET core:fanfiction-list-create": {"queries": 6},
+    "GET core:chapter-list-create": {"queries": 3},
+    "GET core:comment-list-create": {"queries": 3},
+    "GET core:comment-tree": {"queries": 4},
+    "GET core:search": {"queries": 4},
+    "GET core:home": {"queries": 6},
+}
+PERFORMANCE_BUDGET_ACTION = os.getenv("PERFORMANCE_BUDGET_ACTION", "log")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "True") == "True"
+
+# Bytes of chapter text read from the database per query by the streaming reader (core/reader.py)
+CHAPTER_STREAM_CHUNK_SIZE = int(os.getenv("CHAPTER_STREAM_CHUNK_SIZE", str(64 * 1024)))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -42,6 +42,7 @@ class EventAdmin(admin.ModelAdmin):
 class FanArtAdmin(admin.ModelAdmin):
     list_display = ("week", "artist", "artist_name", "created_at")
     search_fields = ("artist_name", "week")
+    list_select_related = ("artist",)
 
 @admin.register(SeasonalReport)           
 class SeasonalReportAdmin(admin.ModelAdmin):
@@ -54,6 +55,7 @@ class BlogPostAdmin(admin.ModelAdmin):
     list_filter = ("is_public",)
     search_fields = ("title", "author__username")
     ordering = ("-created_at",)
+    list_select_related = ("author",)
 
 @admin.register(FanFiction)
 class FanFictionAdmin(admin.ModelAdmin):
@@ -61,6 +63,7 @@ class FanFictionAdmin(admin.ModelAdmin):
     list_filter = ("status",)
     search_fields = ("title", "author__username")
     filter_horizontal = ("tags",)
+    list_select_related = ("author",)
 
 @admin.register(Chapter)
 class ChapterAdmin(admin.ModelAdmin):
@@ -68,9 +71,12 @@ class ChapterAdmin(admin.ModelAdmin):
     list_filter = ("fanfiction",)
     search_fields = ("title",)
     ordering = ("fanfiction", "chapter_number")
+    list_select_related = ("fanfiction",)
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ("author", "parent_type", "parent_id", "created_at")
+    list_display = ("author", "parent_type", "parent_id", "depth", "created_at")
     list_filter = ("parent_type",)
     search_fields = ("author__username", "content")
+    list_select_related = ("author",)
+    raw_id_fields = ("author", "blog_post", "fanfiction", "chapter", "reply_to")
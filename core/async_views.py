@@ -0,0 +1,246 @@
+"""
+Async read API for the public content, mounted under /core/async/.
+
+These are plain async Django views over the async ORM, returning the same
+JSON as the DRF endpoints. Under an ASGI server (uvicorn workers, see the
+Procfile) a slow client or a long poll then waits on the event loop instead
+of holding a worker thread for the whole request.
+
+Everything here is anonymous and read-only: responses are what a logged-out
+visitor gets from the DRF endpoints, and requests share the anonymous rate
+limit with them. Lists are keyset-paginated over the same orderings as the
+DRF cursor pages, forward only: {"next": url or null, "results": [...]}.
+"""
+import base64
+import binascii
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Announcement, Chapter, Comment, Event, FanArt, FanFiction
+from .serializers import (
+    AnnouncementSerializer,
+    ChapterSerializer,
+    ChapterSummarySerializer,
+    CommentSerializer,
+    EventSerializer,
+    FanArtSerializer,
+    FanFictionSerializer,
+)
+from .throttling import AnonRateThrottle
+from .views import COMMENT_PARENT_REQUIRED
+
+
+class AnonymousRateThrottle(AnonRateThrottle):
+    # Nobody is logged in here, every request counts against the client address.
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position, cls=JSONEncoder).encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise BadRequest("Invalid cursor")
+    if not isinstance(position, list) or len(position) != len(ordering):
+        raise BadRequest("Invalid cursor")
+    return position
+
+
+def after(ordering, position):
+    """Rows that come after position in ordering: (a > x) or (a = x and b > y) or ..."""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        ties = {earlier.lstrip("-"): position[j] for j, earlier in enumerate(ordering[:i])}
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**ties, **{f"{name}__{lookup}": position[i]})
+    return condition
+
+
+class AsyncReadView(View):
+    http_method_names = ["get", "head", "options"]
+    queryset = None
+    serializer_class = None
+    throttle_classes = [AnonymousRateThrottle]
+
+    def get_queryset(self):
+        # A fresh copy per request, as DRF's GenericAPIView does, so no results are cached on the class.
+        return self.queryset.all()
+
+    def get_serializer(self, instance, **kwargs):
+        return self.serializer_class(instance, context={"request": self.request}, **kwargs)
+
+    def get_eager_queryset(self, extra=()):
+        # ?fields= / ?exclude= narrow the columns loaded, as on the DRF endpoints.
+        return self.serializer_class.setup_eager_loading(
+            self.get_queryset(),
+            fields=self.serializer_class.selected_fields(self.request),
+            extra=extra,
+        )
+
+    async def get(self, request, *args, **kwargs):
+        wait = await self.check_throttles(request)
+        if wait is not None:
+            response = json_response({"detail": "Request was throttled."}, status=429)
+            if wait:
+                response["Retry-After"] = str(math.ceil(wait))
+            return response
+
+        try:
+            return json_response(await self.read(request))
+        except BadRequest as error:
+            return json_response({"detail": str(error)}, status=400)
+        except ValidationError as error:
+            return json_response(error.detail, status=400)
+        except ObjectDoesNotExist:
+            return json_response({"detail": "Not found."}, status=404)
+
+    async def check_throttles(self, request):
+        """None if the request may go ahead, otherwise the seconds to wait (0 if unknown)."""
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            # The counters live in the database or the cache, both blocking.
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                return throttle.wait() or 0
+        return None
+
+
+class AsyncListView(AsyncReadView):
+    ordering = ("-created_at", "-id")
+    paginated = True
+    page_size = 20
+    max_page_size = 50
+    page_size_query_param = "limit"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    async def read(self, request):
+        ordering_fields = [field.lstrip("-") for field in self.ordering]
+        queryset = self.get_eager_queryset(extra=ordering_fields).order_by(*self.ordering)
+        if not self.paginated:
+            return self.get_serializer([row async for row in queryset], many=True).data
+
+        cursor = request.GET.get("cursor")
+        if cursor:
+            try:
+                queryset = queryset.filter(after(self.ordering, decode_cursor(cursor, self.ordering)))
+            except (DjangoValidationError, TypeError, ValueError):
+                # A position that does not fit the ordering's fields.
+                raise BadRequest("Invalid cursor")
+
+        size = self.get_page_size(request)
+        rows = [row async for row in queryset[:size + 1]]
+        next_url = None
+        if len(rows) > size:
+            rows = rows[:size]
+            position = [getattr(rows[-1], field) for field in ordering_fields]
+            next_url = replace_query_param(request.build_absolute_uri(), "cursor", encode_cursor(position))
+        return {"next": next_url, "results": self.get_serializer(rows, many=True).data}
+
+
+class AsyncDetailView(AsyncReadView):
+    async def read(self, request):
+        instance = await self.get_eager_queryset().aget(pk=self.kwargs["pk"])
+        return self.get_serializer(instance).data
+
+
+class AnnouncementList(AsyncListView):
+    # Not paginated, like the DRF list.
+    queryset = Announcement.objects.filter(is_active=True)
+    serializer_class = AnnouncementSerializer
+    ordering = ("id",)
+    paginated = False
+
+
+class EventList(AsyncListView):
+    queryset = Event.objects.all()
+    serializer_class = EventSerializer
+    ordering = ("-date", "-id")
+
+
+class EventDetail(AsyncDetailView):
+    queryset = Event.objects.all()
+    serializer_class = EventSerializer
+
+
+class FanArtList(AsyncListView):
+    queryset = FanArt.objects.all()
+    serializer_class = FanArtSerializer
+
+
+class FanArtDetail(AsyncDetailView):
+    queryset = FanArt.objects.all()
+    serializer_class = FanArtSerializer
+
+
+class FanFictionList(AsyncListView):
+    queryset = FanFiction.objects.all()
+    serializer_class = FanFictionSerializer
+    page_size = 10
+    max_page_size = 20
+
+
+class FanFictionDetail(AsyncDetailView):
+    queryset = FanFiction.objects.all()
+    serializer_class = FanFictionSerializer
+
+
+class ChapterList(AsyncListView):
+    # A table of contents, like the DRF list without ?include=content.
+    queryset = Chapter.objects.all()
+    serializer_class = ChapterSummarySerializer
+    ordering = ("chapter_number",)
+    page_size = 50
+    max_page_size = 100
+
+    def get_queryset(self):
+        return super().get_queryset().filter(fanfiction_id=self.kwargs["fanfic_id"])
+
+
+class ChapterDetail(AsyncDetailView):
+    queryset = Chapter.objects.all()
+    serializer_class = ChapterSerializer
+
+
+class CommentList(AsyncListView):
+    queryset = Comment.objects.all()
+    serializer_class = CommentSerializer
+    ordering = ("created_at", "id")
+
+    def get_queryset(self):
+        lookup = Comment.parent_lookup(self.request.GET.get("parent_type"), self.request.GET.get("parent_id"))
+        if lookup is None:
+            raise BadRequest(COMMENT_PARENT_REQUIRED)
+        return super().get_queryset().filter(**lookup)
+
+
+class CommentDetail(AsyncDetailView):
+    queryset = Comment.objects.all()
+    serializer_class = CommentSerializer
@@ -1,10 +1,60 @@
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import new_version
+
+
+# All a request needs of its user, in model field order; the rest (the password hash ...) is
+# loaded if read.
+CACHED_USER_FIELDS = ("id", "username", "email", "is_staff", "is_active")
+
+
+def set_user_claims(token, user):
+    """The claims ClaimsUser reads. Set at login and again on every refresh, see FilteredRefreshToken."""
+    token["username"] = user.username
+    token["email"] = user.email
+    token["is_staff"] = user.is_staff
+
+
+def user_generation_key(user_id):
+    return f"auth-user-generation:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """Called when a user is saved or deleted, see core/signals.py."""
+    key = user_generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), None)
+
+
+class ClaimsUser(TokenUser):
+    """TokenUser whose id has the User pk type (the claim carries it as a string)."""
+
+    @cached_property
+    def id(self):
+        return get_user_model()._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
 
 class CookieJWTAuthentication(JWTAuthentication):
     """
     Custom authentication class that reads JWT from HttpOnly cookies
     instead of the Authorization header.
+
+    With JWT_USER_CACHE on, the user behind a token is cached for
+    JWT_USER_CACHE_TIMEOUT seconds, keyed by user id and token jti, and
+    dropped whenever the user is saved. With JWT_STATELESS_READS on, safe
+    requests skip the lookup altogether and get a ClaimsUser built from the
+    token's claims (see set_user_claims).
     """
 
     def authenticate(self, request):
@@ -18,4 +68,34 @@ class CookieJWTAuthentication(JWTAuthentication):
         except Exception:
             raise AuthenticationFailed("Invalid or expired token")
 
-        return self.get_user(validated_token), validated_token
+        if settings.JWT_STATELESS_READS and request.method in SAFE_METHODS:
+            return ClaimsUser(validated_token), validated_token
+
+        if not settings.JWT_USER_CACHE:
+            return self.get_user(validated_token), validated_token
+        return self.get_cached_user(validated_token), validated_token
+
+    def get_cached_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            # Let get_user() raise its usual error.
+            return self.get_user(validated_token)
+
+        generation_key = user_generation_key(user_id)
+        user_key = f"auth-user:{user_id}:{validated_token.get(api_settings.JTI_CLAIM)}"
+        cached = cache.get_many([generation_key, user_key])
+
+        generation = cached.get(generation_key)
+        if generation is None:
+            # Seeded before the user is read, so a save in between still invalidates it.
+            cache.add(generation_key, new_version(), None)
+            generation = cache.get(generation_key)
+        elif user_key in cached and cached[user_key][0] == generation:
+            # Other fields stay deferred, and save() only writes the loaded ones.
+            return self.user_model.from_db(DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, cached[user_key][1])
+
+        user = self.get_user(validated_token)
+        values = tuple(getattr(user, name) for name in CACHED_USER_FIELDS)
+        cache.set(user_key, (generation, values), settings.JWT_USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,361 @@
+"""
+Endpoint benchmarks for the run_benchmarks management command.
+
+Every GET-able URL in core/urls.py is filled in with ids from the current
+database (the busiest story, chapter and so on, see seed_data) and requested
+repeatedly, either in process through the Django test client or against a
+running server (e.g. local gunicorn) over HTTP. For each endpoint the report
+has latency percentiles, queries per request, response size and, in process,
+the peak Python memory allocated while serving one request.
+
+Reports are plain JSON so runs can be kept and compared: compare() lists the
+endpoints that got slower or run more queries than a baseline, and
+fast_path_speedup() measures the compiled serializers and orjson rendering
+against stock DRF, endpoint by endpoint, and connection_overhead() what a
+connection pool saves each request on PostgreSQL.
+"""
+import statistics
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import renderers
+from . import urls as core_urls
+from .async_views import AsyncReadView
+from .models import (
+    Announcement,
+    BlogPost,
+    Chapter,
+    Comment,
+    Event,
+    FanArt,
+    FanFiction,
+    SeasonalReport,
+    Tag,
+    TeamMember,
+)
+
+# POST-only or token-bound URLs, which a GET benchmark cannot exercise.
+SKIPPED = {
+    "register", "login", "refresh", "logout", "password_reset_confirm",
+    "tag-bulk-create", "event-bulk-create", "fanart-bulk-create", "chapter-bulk-create",
+}
+
+# Extra query strings benchmarked on top of the plain URL.
+VARIANTS = {
+    "fanfiction-list-create": ["count=false", "pagination=cursor", "search=dragon"],
+    "chapter-list-create": ["include=content"],
+    "comment-tree": ["depth=1"],
+}
+
+
+def percentile(values, quantile):
+    values = sorted(values)
+    return values[min(int(quantile * len(values)), len(values) - 1)]
+
+
+def sample_objects():
+    """The rows detail URLs are benchmarked against, the heaviest where it matters."""
+    busiest_chapter = (
+        Comment.objects
+        .filter(chapter__isnull=False)
+        .values("chapter")
+        .annotate(comments=Count("pk"))
+        .order_by("-comments")
+        .first()
+    )
+    chapter_id = busiest_chapter["chapter"] if busiest_chapter else Chapter.objects.values_list("pk", flat=True).first()
+    return {
+        "team-member": TeamMember.objects.first(),
+        "announcement": Announcement.objects.first(),
+        "tag": Tag.objects.order_by("-usage_count").first(),
+        "event": Event.objects.first(),
+        "fanart": FanArt.objects.first(),
+        "seasonal-report": SeasonalReport.objects.first(),
+        "blogpost": BlogPost.objects.filter(is_public=True).first(),
+        "fanfiction": FanFiction.objects.order_by("-chapter_count").first(),
+        "chapter": Chapter.objects.filter(pk=chapter_id).first(),
+        "comment": Comment.objects.filter(chapter_id=chapter_id).first(),
+    }
+
+
+def targets():
+    """(name, url) for every benchmarked endpoint; names are stable across databases."""
+    objects = sample_objects()
+    chapter = objects["chapter"]
+    comment_params = f"parent_type=chapter&parent_id={chapter.pk}" if chapter else None
+
+    found = []
+    for pattern in core_urls.urlpatterns:
+        name = pattern.name
+        if name is None or name in SKIPPED:
+            continue
+
+        kwargs = {}
+        params = pattern.pattern.converters
+        if "fanfic_id" in params:
+            if objects["fanfiction"] is None:
+                continue
+            kwargs["fanfic_id"] = objects["fanfiction"].pk
+        # The async read API mirrors the DRF endpoints, with the same parameters.
+        base_name = name.removeprefix("async-")
+        if "pk" in params:
+            obj = objects.get(base_name.rsplit("-", 1)[0])
+            if obj is None:
+                continue
+            kwargs["pk"] = obj.pk
+
+        url = reverse(f"{core_urls.app_name}:{name}", kwargs=kwargs)
+        query = None
+        if base_name.startswith("comment-") and "pk" not in kwargs:
+            if comment_params is None:
+                continue
+            query = comment_params
+        if name == "search":
+            query = "q=dragon"
+
+        full_name = f"{core_urls.app_name}:{name}"
+        found.append((full_name, f"{url}?{query}" if query else url))
+        for variant in VARIANTS.get(name, []):
+            joined = f"{query}&{variant}" if query else variant
+            found.append((f"{full_name}?{variant}", f"{url}?{joined}"))
+    return found
+
+
+class ClientRunner:
+    """Requests through the Django test client, in this process."""
+    mode = "client"
+
+    def __init__(self, user=None):
+        self.client = Client()
+        if user is not None:
+            self.client.cookies["access_token"] = str(AccessToken.for_user(user))
+
+    def request(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, secure=True)
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, len(body), len(queries)
+
+    def peak_memory(self, url):
+        tracemalloc.start()
+        try:
+            self.request(url)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def __enter__(self):
+        self._overrides = [
+            override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                SECURE_SSL_REDIRECT=False,
+                PERFORMANCE_BUDGET_ACTION="log",
+            ),
+            # Every endpoint is hit many times in a row, far beyond the rate limits.
+            mock.patch.object(APIView, "check_throttles"),
+            mock.patch.object(AsyncReadView, "check_throttles", mock.AsyncMock(return_value=None)),
+        ]
+        for override in self._overrides:
+            override.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for override in reversed(self._overrides):
+            override.__exit__(*exc_info)
+
+
+class HTTPRunner:
+    """Requests against a running server. Query counts come from Server-Timing."""
+
+    def __init__(self, base_url, user=None):
+        self.mode = base_url
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Cookie": f"access_token={AccessToken.for_user(user)}"} if user is not None else {}
+
+    def request(self, url):
+        request = urllib.request.Request(self.base_url + url, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, len(response.read()), server_timing_queries(response.headers)
+        except urllib.error.HTTPError as error:
+            return error.code, len(error.read()), server_timing_queries(error.headers)
+
+    def peak_memory(self, url):
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def server_timing_queries(headers):
+    timing = headers.get("Server-Timing", "")
+    for part in timing.split(","):
+        if part.strip().startswith("db;") and 'desc="' in part:
+            return int(part.split('desc="', 1)[1].split(" ", 1)[0])
+    return None
+
+
+def run(runner, iterations=20, warmup=2, only=None, log=None):
+    log = log or (lambda message: None)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "mode": runner.mode,
+        "database": connection.vendor,
+        "iterations": iterations,
+        "endpoints": {},
+    }
+    with runner:
+        for name, url in targets():
+            if only and not any(part in name for part in only):
+                continue
+
+            for _ in range(warmup):
+                runner.request(url)
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                status, size, queries = runner.request(url)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            result = {
+                "url": url,
+                "status": status,
+                "p50_ms": round(percentile(timings, 0.5), 3),
+                "p95_ms": round(percentile(timings, 0.95), 3),
+                "p99_ms": round(percentile(timings, 0.99), 3),
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "queries": queries,
+                "bytes": size,
+                "peak_memory_kb": None,
+            }
+            peak = runner.peak_memory(url)
+            if peak is not None:
+                result["peak_memory_kb"] = round(peak / 1024, 1)
+            report["endpoints"][name] = result
+            log(f"{name:55} {status} p50 {result['p50_ms']:8.2f}ms p95 {result['p95_ms']:8.2f}ms queries {queries}")
+    return report
+
+
+def compare(report, baseline, tolerance=0.2, noise_ms=1.0):
+    """
+    Regressions against a baseline report: p95 more than tolerance slower
+    (and by more than noise_ms), more queries, or a different status code.
+    """
+    regressions = []
+    for name, result in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        if result["status"] != before["status"]:
+            regressions.append(f"{name}: status {before['status']} -> {result['status']}")
+        slower = result["p95_ms"] - before["p95_ms"]
+        if slower > noise_ms and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+        if None not in (result["queries"], before["queries"]) and result["queries"] > before["queries"]:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+    return regressions
+
+
+def fast_path_speedup(iterations=20, warmup=2, only=None, user=None, log=None):
+    """
+    Benchmarks in process twice, with DRF serializers and the json module,
+    then with compiled serializers and orjson (when installed), and reports
+    both p50s and the speedup of each endpoint.
+    """
+    log = log or (lambda message: None)
+    with override_settings(COMPILED_SERIALIZERS=False), mock.patch.object(renderers, "orjson", None):
+        baseline = run(ClientRunner(user=user), iterations=iterations, warmup=warmup, only=only)
+    with override_settings(COMPILED_SERIALIZERS=True):
+        fast = run(ClientRunner(user=user), iterations=iterations, warmup=warmup, only=only)
+
+    report = {
+        "created": fast["created"],
+        "database": fast["database"],
+        "iterations": iterations,
+        "orjson": renderers.orjson is not None,
+        "endpoints": {},
+    }
+    for name, result in fast["endpoints"].items():
+        before = baseline["endpoints"][name]
+        speedup = before["p50_ms"] / result["p50_ms"] if result["p50_ms"] else None
+        report["endpoints"][name] = {
+            "url": result["url"],
+            "status": result["status"],
+            "baseline_p50_ms": before["p50_ms"],
+            "fast_p50_ms": result["p50_ms"],
+            "speedup": round(speedup, 2) if speedup else None,
+            "bytes": result["bytes"],
+        }
+        log(f"{name:55} {before['p50_ms']:8.2f}ms -> {result['p50_ms']:8.2f}ms  x{speedup or 0:.2f}")
+    return report
+
+
+def connection_overhead(iterations=200, warmup=10, log=None):
+    """
+    Time to get a connection, run SELECT 1 and let it go, as each request does
+    with CONN_MAX_AGE=0: first opening a new connection every time, then
+    borrowing one from a psycopg 3 pool (the configured one, or a small one).
+    Needs PostgreSQL; point DATABASE_URL at a local server to leave the
+    network out of it.
+    """
+    log = log or (lambda message: None)
+    settings_dict = connections["default"].settings_dict
+    if connections["default"].vendor != "postgresql":
+        raise ValueError("Connection pooling needs PostgreSQL.")
+    backend = load_backend(settings_dict["ENGINE"])
+    options = {name: value for name, value in settings_dict["OPTIONS"].items() if name != "pool"}
+    modes = {
+        "direct": options,
+        "pooled": {**options, "pool": settings_dict["OPTIONS"].get("pool") or {"min_size": 1, "max_size": 2}},
+    }
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "database": connection.vendor,
+        "iterations": iterations,
+        "modes": {},
+    }
+    for mode, mode_options in modes.items():
+        wrapper = backend.DatabaseWrapper({**settings_dict, "CONN_MAX_AGE": 0, "OPTIONS": mode_options}, f"benchmark-{mode}")
+        timings = []
+        try:
+            for i in range(warmup + iterations):
+                start = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                # Closes the connection, or hands it back to the pool.
+                wrapper.close()
+                if i >= warmup:
+                    timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            wrapper.close()
+            if wrapper.pool is not None:
+                wrapper.close_pool()
+        report["modes"][mode] = {
+            "p50_ms": round(percentile(timings, 0.5), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "mean_ms": round(statistics.mean(timings), 3),
+        }
+        log(f"{mode:8} p50 {report['modes'][mode]['p50_ms']:8.3f}ms  p95 {report['modes'][mode]['p95_ms']:8.3f}ms")
+
+    pooled = report["modes"]["pooled"]["p50_ms"]
+    report["speedup"] = round(report["modes"]["direct"]["p50_ms"] / pooled, 2) if pooled else None
+    log(f"pooled is x{report['speedup']} faster at the median")
+    return report
@@ -0,0 +1,167 @@
+"""
+Batch creation for the bulk endpoints: POST a JSON array to .../bulk/.
+
+A batch is validated in one pass and written in one transaction with
+bulk_create(), so its size does not change the number of queries.
+BulkListSerializer loads the rows that related fields (artist, tag_ids)
+refer to with one query per field for the whole batch, and checks unique
+fields with one query each. Any invalid item fails the whole batch, and
+the errors come back per item, in order, {} for the valid ones.
+
+bulk_create() sends no signals, so the create_* functions do by hand what
+core/signals.py would otherwise do: bump cache versions (when the batch
+commits), update counters and index new chapters for search.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.validators import UniqueValidator
+
+from . import cache, counters, search
+from .models import Chapter, Event, FanArt, FanFiction, Tag
+
+
+class Prefetched:
+    """
+    Stands in for a related field's queryset while a batch is validated:
+    get(pk=...) is answered from the rows the whole batch refers to.
+    """
+
+    def __init__(self, queryset, pks):
+        self.model = queryset.model
+        wanted = set()
+        for pk in pks:
+            try:
+                wanted.add(self.model._meta.pk.to_python(pk))
+            except DjangoValidationError:
+                pass
+        wanted.discard(None)
+        self.rows = queryset.in_bulk(wanted)
+
+    def get(self, pk):
+        try:
+            return self.rows[self.model._meta.pk.to_python(pk)]
+        except DjangoValidationError:
+            # Reported as the wrong type, as the query would have been.
+            raise ValueError(pk)
+        except KeyError:
+            raise self.model.DoesNotExist
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("allow_empty", False)
+        kwargs.setdefault("max_length", settings.BULK_MAX_ITEMS)
+        super().__init__(*args, **kwargs)
+        self.unique_fields = []
+        self.item_errors = []
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) <= self.max_length:
+            self.prepare(data)
+        items = super().to_internal_value(data)
+        self.check_unique(items)
+        if any(self.item_errors):
+            raise serializers.ValidationError(self.item_errors)
+        return items
+
+    def run_child_validation(self, data):
+        # Keep going, so every item's errors are reported together.
+        try:
+            validated = super().run_child_validation(data)
+        except serializers.ValidationError as exc:
+            self.item_errors.append(exc.detail)
+            return None
+        self.item_errors.append({})
+        return validated
+
+    def prepare(self, data):
+        """Swap per-item queries for per-batch ones."""
+        items = [item for item in data if isinstance(item, dict)]
+        for field in self.child.fields.values():
+            if field.read_only:
+                continue
+            if isinstance(field, serializers.ManyRelatedField):
+                pks = [pk for item in items if isinstance(item.get(field.field_name), list) for pk in item[field.field_name]]
+                field.child_relation.queryset = Prefetched(field.child_relation.get_queryset(), pks)
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                field.queryset = Prefetched(field.get_queryset(), [item.get(field.field_name) for item in items])
+
+            unique = [validator for validator in field.validators if isinstance(validator, UniqueValidator)]
+            if unique:
+                field.validators = [validator for validator in field.validators if validator not in unique]
+                self.unique_fields.append((field, unique[0]))
+
+    def check_unique(self, items):
+        for field, validator in self.unique_fields:
+            values = [item[field.source] for item in items if item is not None and item.get(field.source) is not None]
+            taken = set(validator.queryset.filter(**{f"{field.source}__in": values}).values_list(field.source, flat=True))
+            for index, item in enumerate(items):
+                value = item.get(field.source) if item is not None else None
+                if value is None:
+                    continue
+                if value in taken:
+                    self.item_errors[index] = {**self.item_errors[index], field.field_name: [validator.message]}
+                # Later items may not repeat an earlier one either.
+                taken.add(value)
+
+
+def link_tags(model, objects, tag_lists):
+    """objects[i].tags.set(tag_lists[i]) for new objects: one INSERT, then the tag and facet counts."""
+    relation = model.tags.field
+    through = relation.remote_field.through
+    owner, tag = f"{relation.m2m_field_name()}_id", f"{relation.m2m_reverse_field_name()}_id"
+    links = []
+    uses = Counter()
+    facets = Counter()
+    for obj, tags in zip(objects, tag_lists):
+        for pk in dict.fromkeys(tag.pk for tag in tags):
+            links.append(through(**{owner: obj.pk, tag: pk}))
+            uses[pk] += 1
+            facets[(pk, getattr(obj, "status", ""))] += 1
+    through.objects.bulk_create(links)
+    counters.tag_uses_added(uses)
+    counters.facets_changed(model._meta.model_name, facets)
+
+
+def create_tags(items):
+    tags = Tag.objects.bulk_create([Tag(**item) for item in items])
+    cache.bump_version_on_commit(Tag)
+    return tags
+
+
+def create_events(items):
+    tag_lists = [item.pop("tag_ids", []) for item in items]
+    events = Event.objects.bulk_create([Event(**item) for item in items])
+    link_tags(Event, events, tag_lists)
+    cache.bump_version_on_commit(Event)
+    return events
+
+
+def create_fanart(items):
+    fanart = FanArt.objects.bulk_create([FanArt(**item) for item in items])
+    cache.bump_version_on_commit(FanArt)
+    return fanart
+
+
+def create_chapters(items, fanfic_id, author):
+    """
+    Add chapters to the end of a story owned by author, numbered in order.
+    Must run in a transaction, see counters.allocate_chapter_numbers().
+    """
+    numbers = counters.allocate_chapter_numbers(fanfic_id, author, len(items))
+    if numbers is None:
+        if FanFiction.objects.filter(id=fanfic_id).exists():
+            raise PermissionDenied("Not allowed")
+        raise NotFound()
+    chapters = [Chapter(fanfiction_id=fanfic_id, chapter_number=number, **item) for number, item in zip(numbers, items)]
+    for chapter in chapters:
+        chapter.count_words()
+    Chapter.objects.bulk_create(chapters)
+    counters.chapters_added(fanfic_id, len(chapters))
+    search.index_new(chapters)
+    cache.bump_version_on_commit(Chapter)
+    return chapters
@@ -0,0 +1,85 @@
+"""
+Versioned read-through cache for list responses.
+
+Every model has a version counter in the cache, bumped by the signals in
+core/signals.py whenever a row is saved or deleted. Cache keys include the
+versions of the models a response depends on, so an edit makes every older
+entry unreachable and nothing ever has to be deleted explicitly.
+
+The cache backend itself (local-memory LRU, file based or Redis) is chosen in
+settings.CACHES.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(model):
+    return f"model-version:{model._meta.label_lower}"
+
+
+def new_version():
+    # Seeded from the clock rather than 1: if a counter gets evicted, the fresh
+    # one cannot collide with a version baked into entries that are still cached.
+    return time.time_ns()
+
+
+def get_versions(models):
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), None)
+
+
+def bump_version_on_commit(model):
+    """
+    bump_version() once the current transaction commits. Bumped before, a
+    concurrent read could cache the old rows under the new version.
+    """
+    transaction.on_commit(partial(bump_version, model))
+
+
+def response_key(prefix, request, models):
+    query = sorted(request.query_params.lists())
+    raw = f"{request.path}|{query}|{get_versions(models)}"
+    return f"response:{prefix}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+class CacheStats:
+    """In-process hit/miss counters per view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, view_name, hit):
+        with self._lock:
+            self._counts[(view_name, "hit" if hit else "miss")] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
@@ -0,0 +1,256 @@
+"""
+Compiled read serializers for list responses.
+
+A ModelSerializer does a good deal of Python work per field and per row:
+building model instances, walking sources with getattr, dispatching through
+every field. compile_serializer() instead reads a serializer class once and
+turns it into a plan over flat values() rows:
+
+- model columns, and columns reached through foreign keys ("author.username"),
+  become values() lookups, converted by the serializer field only where its
+  to_representation actually changes database values (dates, choices ...);
+- nested many=True serializers over a many-to-many or reverse foreign key
+  (FanFiction.tags) are loaded for the whole page in one values() query, as
+  prefetch_related would;
+- properties listed in the serializer's field_dependencies are evaluated on a
+  model instance built from just those columns.
+
+The output is the same as serializer.data, key for key. Serializers that do
+anything else (method fields, nested single objects, custom
+to_representation or list serializers) are not compiled, and views keep
+using them as they are. See ConditionalGetMixin.conditional_list.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from .instrumentation import timed_serialization
+from .serializers import BaseModelSerializer
+
+# Serializer field methods that return these model fields' database values unchanged.
+PASSTHROUGH = {
+    serializers.CharField.to_representation: (models.CharField, models.TextField),
+    serializers.IntegerField.to_representation: (models.IntegerField,),
+    serializers.BooleanField.to_representation: (models.BooleanField,),
+    serializers.ReadOnlyField.to_representation: (models.Field,),
+}
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class _NoAttributes:
+    pass
+
+
+class Column:
+    """A field read from one values() lookup."""
+
+    def __init__(self, name, field, lookup, model_field, hops=(), raw=False):
+        self.name = name
+        self.field = field
+        self.lookup = lookup
+        # Nullable foreign keys on the way to the column: when one is null
+        # the serializer field finds no attribute rather than a None value.
+        self.hops = hops
+        self.lookups = (lookup, *hops)
+        passthrough = PASSTHROUGH.get(type(field).to_representation, ())
+        self.convert = None if raw or isinstance(model_field, passthrough) else field.to_representation
+
+    def write(self, row, data):
+        value = row[self.lookup]
+        if value is not None:
+            data[self.name] = value if self.convert is None else self.convert(value)
+        elif any(row[hop] is None for hop in self.hops):
+            write_attribute(self.field, _NoAttributes(), data)
+        else:
+            data[self.name] = None
+
+
+class Computed:
+    """A model property, evaluated on an instance holding only its field_dependencies."""
+
+    def __init__(self, name, field, model, dependencies):
+        self.name = name
+        self.field = field
+        self.model = model
+        fields = [model._meta.get_field(name) for name in dependencies]
+        # Model.from_db() takes the columns in model order.
+        fields.sort(key=model._meta.concrete_fields.index)
+        self.lookups = tuple(field.name for field in fields)
+        self.attnames = [field.attname for field in fields]
+
+    def write(self, row, data):
+        instance = self.model.from_db(None, self.attnames, [row[lookup] for lookup in self.lookups])
+        write_attribute(self.field, instance, data)
+
+
+class Nested:
+    """A many=True nested serializer over a to-many relation."""
+
+    def __init__(self, name, related_model, owner, child):
+        self.name = name
+        self.related_model = related_model
+        self.owner = owner
+        self.child = child
+        self.lookups = ()
+
+    def load(self, rows, pk):
+        plan = self.child.plan()
+        queryset = self.related_model._default_manager.filter(**{f"{self.owner}__in": [row[pk] for row in rows]})
+        related = {}
+        for child in plan.values(queryset, owner=self.owner):
+            related.setdefault(child[self.owner], []).append(child)
+        for row in rows:
+            row[self.name] = related.get(row[pk], [])
+
+    def write(self, row, data):
+        data[self.name] = self.child.plan().represent(row[self.name])
+
+
+def is_forward(model_field):
+    return model_field.many_to_one or model_field.one_to_one
+
+
+def write_attribute(field, instance, data):
+    # Serializer.to_representation() for a single field.
+    try:
+        attribute = field.get_attribute(instance)
+    except SkipField:
+        return
+    data[field.field_name] = None if attribute is None else field.to_representation(attribute)
+
+
+class Plan:
+    """Loading and representation of some of a serializer's fields."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.pk = model._meta.pk.name
+        self.fields = fields
+        self.nested = [field for field in fields if isinstance(field, Nested)]
+        self.lookups = tuple(dict.fromkeys([self.pk, *(lookup for field in fields for lookup in field.lookups)]))
+
+    def values(self, queryset, extra=(), owner=None):
+        """
+        queryset as values() rows with the lookups the fields need. extra are
+        more columns the caller reads, e.g. the ordering for cursor links.
+        """
+        columns = {field.name for field in self.model._meta.concrete_fields}
+        lookups = [*self.lookups, *sorted(name for name in extra if name in columns and name not in self.lookups)]
+        if owner is not None and owner not in lookups:
+            lookups.append(owner)
+        return queryset.prefetch_related(None).values(*lookups)
+
+    def load(self, rows):
+        """Add the rows of nested serializers, for the whole list at once."""
+        if self.nested and rows:
+            for nested in self.nested:
+                nested.load(rows, self.pk)
+        return rows
+
+    @timed_serialization
+    def to_representation(self, rows):
+        return self.represent(rows)
+
+    def represent(self, rows):
+        represented = []
+        for row in rows:
+            data = {}
+            for field in self.fields:
+                field.write(row, data)
+            represented.append(data)
+        return represented
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, nested=True):
+        meta = serializer_class.Meta
+        if serializer_class.to_representation is not BaseModelSerializer.to_representation:
+            raise NotCompilable(f"{serializer_class.__name__} overrides to_representation()")
+        if getattr(meta, "list_serializer_class", None) is not None:
+            raise NotCompilable(f"{serializer_class.__name__} has its own list serializer")
+
+        self.model = meta.model
+        self.fields = {}
+        for name, field in serializer_class().fields.items():
+            if not field.write_only:
+                self.fields[name] = self.compile_field(serializer_class, name, field, nested)
+        self._plans = {}
+
+    def plan(self, fields=None):
+        """The Plan for these field names (a selected_fields() result), all fields by default."""
+        key = tuple(fields) if fields is not None else None
+        if key not in self._plans:
+            names = self.fields if fields is None else fields
+            self._plans[key] = Plan(self.model, [self.fields[name] for name in names])
+        return self._plans[key]
+
+    def compile_field(self, serializer_class, name, field, nested):
+        if isinstance(field, serializers.ListSerializer):
+            if not nested or not isinstance(field.child, BaseModelSerializer):
+                raise NotCompilable(f"nested serializer {name}")
+            return self.compile_nested(name, field)
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            model_field = self.get_field(self.model, field.source)
+            if field.pk_field is not None or model_field is None or not is_forward(model_field):
+                raise NotCompilable(f"related field {name}")
+            # values() gives the key itself, as PKOnlyObject does.
+            return Column(name, field, field.source, model_field, raw=True)
+        if isinstance(field, (serializers.BaseSerializer, serializers.RelatedField, serializers.ManyRelatedField,
+                              serializers.SerializerMethodField, serializers.FileField)):
+            raise NotCompilable(f"{type(field).__name__} {name}")
+
+        *path, attr = field.source.split(".")
+        model, hops = self.model, []
+        for i, part in enumerate(path):
+            model_field = self.get_field(model, part)
+            if model_field is None or not is_forward(model_field):
+                raise NotCompilable(f"{name} is not read through foreign keys")
+            if model_field.null:
+                hops.append("__".join(field.source.split(".")[:i + 1]))
+            model = model_field.related_model
+
+        model_field = self.get_field(model, attr)
+        if model_field is not None and not model_field.is_relation:
+            return Column(name, field, field.source.replace(".", "__"), model_field, tuple(hops))
+        dependencies = serializer_class.field_dependencies.get(name)
+        if not path and dependencies:
+            return Computed(name, field, model, dependencies)
+        raise NotCompilable(f"cannot tell which columns {name} reads")
+
+    def compile_nested(self, name, field):
+        model_field = self.get_field(self.model, field.source, concrete=False)
+        if model_field is None:
+            raise NotCompilable(f"nested serializer {name}")
+        if model_field.many_to_many and model_field.concrete:
+            owner = model_field.related_query_name()
+        elif model_field.one_to_many:
+            owner = model_field.field.name
+        else:
+            raise NotCompilable(f"nested serializer {name}")
+        child = CompiledSerializer(type(field.child), nested=False)
+        return Nested(name, model_field.related_model, owner, child)
+
+    @staticmethod
+    def get_field(model, name, concrete=True):
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        return model_field if model_field.concrete or not concrete else None
+
+
+_compiled = {}
+
+
+def compile_serializer(serializer_class):
+    """The CompiledSerializer for serializer_class, or None if it cannot be compiled."""
+    if serializer_class not in _compiled:
+        try:
+            _compiled[serializer_class] = CompiledSerializer(serializer_class)
+        except NotCompilable:
+            _compiled[serializer_class] = None
+    return _compiled[serializer_class]
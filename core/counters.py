@@ -0,0 +1,222 @@
+"""
+Denormalized counters: chapters, comments, the latest chapter date and the
+chapter number sequence on each story, how many stories and events use each
+tag, and the same per story status for the tag facets (TagFacetCount).
+
+They are kept up to date by the signals in core/signals.py with single F()
+updates, so concurrent writers never overwrite each other's counts. Bulk
+operations that skip signals (queryset.update(), bulk_create(), raw SQL) can
+make them drift; recompute() repairs them from the real rows and is exposed
+as the recompute_counters management command.
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, F, Func, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from . import cache
+from .models import Chapter, Comment, Event, FanFiction, Tag, TagFacetCount
+
+
+def latest_chapter():
+    return Subquery(
+        Chapter.objects
+        .filter(fanfiction=OuterRef("pk"))
+        .order_by("-published_at")
+        .values("published_at")[:1]
+    )
+
+
+def highest_chapter_number():
+    return Coalesce(
+        Subquery(
+            Chapter.objects
+            .filter(fanfiction=OuterRef("pk"))
+            .order_by("-chapter_number")
+            .values("chapter_number")[:1]
+        ),
+        0,
+    )
+
+
+def decremented(field, by=1):
+    # Never below zero, even if the counter had drifted low.
+    return Greatest(F(field) - by, 0)
+
+
+def count_of(queryset):
+    counted = queryset.order_by().annotate(n=Func(F("pk"), function="COUNT")).values("n")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+# ------------------------------------------ Stories ------------------------------------------------------------------
+def chapter_added(chapter):
+    chapters_added(chapter.fanfiction_id)
+
+
+def chapters_added(fanfic_id, count=1):
+    FanFiction.objects.filter(pk=fanfic_id).update(
+        chapter_count=F("chapter_count") + count,
+        last_chapter_published_at=latest_chapter(),
+    )
+
+
+def chapter_removed(chapter):
+    # Deleting the last chapter frees its number again.
+    FanFiction.objects.filter(pk=chapter.fanfiction_id).update(
+        chapter_count=decremented("chapter_count"),
+        last_chapter_published_at=latest_chapter(),
+        last_chapter_number=highest_chapter_number(),
+    )
+
+
+def allocate_chapter_number(fanfic_id, author):
+    numbers = allocate_chapter_numbers(fanfic_id, author, 1)
+    return numbers[0] if numbers is not None else None
+
+
+def allocate_chapter_numbers(fanfic_id, author, count):
+    """
+    Reserve the next count chapter numbers of a story owned by author, as a
+    range, or return None if there is no such story. Must run inside the
+    transaction that inserts the chapters: the UPDATE locks the story row
+    until it commits, so concurrent posts to the same story queue up and each
+    gets its own numbers.
+    """
+    reserved = FanFiction.objects.filter(pk=fanfic_id, author=author).update(
+        # The subquery only matters if the sequence fell behind the real chapters.
+        last_chapter_number=Greatest(F("last_chapter_number"), highest_chapter_number()) + count,
+    )
+    if not reserved:
+        return None
+    last = FanFiction.objects.filter(pk=fanfic_id).values_list("last_chapter_number", flat=True).get()
+    return range(last - count + 1, last + 1)
+
+
+def commented_story(comment):
+    # Comments on a chapter count towards its story.
+    if comment.chapter_id is not None:
+        return FanFiction.objects.filter(pk=Subquery(Chapter.objects.filter(pk=comment.chapter_id).values("fanfiction_id")))
+    if comment.fanfiction_id is not None:
+        return FanFiction.objects.filter(pk=comment.fanfiction_id)
+    return FanFiction.objects.none()
+
+
+def comment_added(comment):
+    commented_story(comment).update(comment_count=F("comment_count") + 1)
+
+
+def comment_removed(comment):
+    commented_story(comment).update(comment_count=decremented("comment_count"))
+
+
+def thread_removed(comment):
+    """comment_removed() for a comment and all its replies, which are deleted with it."""
+    thread = Comment.objects.filter(**{comment.PARENT_FIELDS[comment.parent_type]: comment.parent_id}, path__startswith=comment.path)
+    commented_story(comment).update(comment_count=decremented("comment_count", count_of(thread)))
+
+
+def chapter_comments_removed(chapter):
+    FanFiction.objects.filter(pk=chapter.fanfiction_id).update(
+        comment_count=decremented("comment_count", count_of(Comment.objects.filter(chapter=chapter.pk))),
+    )
+
+
+# ------------------------------------------ Tags ---------------------------------------------------------------------
+def tags_used(tag_ids, by=1):
+    if tag_ids and by:
+        usage_count = F("usage_count") + by if by > 0 else decremented("usage_count", -by)
+        Tag.objects.filter(pk__in=tag_ids).update(usage_count=usage_count)
+        cache.bump_version_on_commit(Tag)
+
+
+def tag_uses_added(counts):
+    """tags_used() for several tags at once, counts being {tag id: uses added}."""
+    if counts:
+        added = Case(*[When(pk=pk, then=count) for pk, count in counts.items()], output_field=IntegerField())
+        Tag.objects.filter(pk__in=counts).update(usage_count=F("usage_count") + added)
+        cache.bump_version_on_commit(Tag)
+
+
+def tag_links(through, instance, reverse, model, pk_set):
+    """Through rows an m2m_changed remove/clear is about to delete."""
+    if reverse:
+        links = through.objects.filter(tag=instance)
+        tagged = model._meta.model_name
+    else:
+        tagged = type(instance)._meta.model_name
+        links = through.objects.filter(**{tagged: instance})
+    if pk_set is not None:
+        # pk_set is what was asked for, which may include rows that are not linked.
+        links = links.filter(**{f"{tagged if reverse else 'tag'}__in": pk_set})
+    return links
+
+
+# ------------------------------------------ Tag facets ---------------------------------------------------------------
+def facet_status(tagged_model, prefix=""):
+    # Stories are counted per status, events have none.
+    return F(f"{prefix}status") if tagged_model is FanFiction else Value("")
+
+
+def facets_changed(kind, counts):
+    """Add to the facet counts, counts being {(tag id, status): change}. Never below zero."""
+    counts = {key: change for key, change in counts.items() if change}
+    if not counts:
+        return
+    TagFacetCount.objects.bulk_create(
+        [TagFacetCount(kind=kind, tag_id=pk, status=status) for (pk, status), change in counts.items() if change > 0],
+        ignore_conflicts=True,
+    )
+    by_status = {}
+    for (pk, status), change in counts.items():
+        by_status.setdefault(status, {})[pk] = change
+    for status, changes in by_status.items():
+        change = Case(*[When(tag_id=pk, then=n) for pk, n in changes.items()], output_field=IntegerField())
+        TagFacetCount.objects.filter(kind=kind, status=status, tag_id__in=changes).update(
+            count=Greatest(F("count") + change, 0)
+        )
+
+
+def tag_links_counted(tagged_model, links, by):
+    """Count links (a queryset of tagged_model.tags through rows) in (by=1) or out (by=-1) of the facets."""
+    kind = tagged_model._meta.model_name
+    rows = (
+        links.annotate(facet_status=facet_status(tagged_model, prefix=f"{kind}__"))
+        .values("tag_id", "facet_status")
+        .annotate(n=Count("pk"))
+        .order_by()
+    )
+    facets_changed(kind, {(row["tag_id"], row["facet_status"]): by * row["n"] for row in rows})
+
+
+def status_changed(fanfic, old_status):
+    tag_ids = fanfic.tags.through.objects.filter(fanfiction=fanfic).values_list("tag_id", flat=True)
+    counts = Counter()
+    for pk in tag_ids:
+        counts[(pk, old_status)] -= 1
+        counts[(pk, fanfic.status)] += 1
+    facets_changed("fanfiction", counts)
+
+
+# ------------------------------------------ Repair -------------------------------------------------------------------
+def recompute():
+    """Recount everything from the real rows. Returns (stories, tags) updated."""
+    stories = FanFiction.objects.update(
+        chapter_count=count_of(Chapter.objects.filter(fanfiction=OuterRef("pk"))),
+        comment_count=count_of(
+            Comment.objects.filter(Q(fanfiction=OuterRef("pk")) | Q(chapter__fanfiction=OuterRef("pk")))
+        ),
+        last_chapter_published_at=latest_chapter(),
+        last_chapter_number=highest_chapter_number(),
+    )
+    tags = Tag.objects.update(
+        usage_count=(
+            count_of(FanFiction.tags.through.objects.filter(tag=OuterRef("pk")))
+            + count_of(Event.tags.through.objects.filter(tag=OuterRef("pk")))
+        )
+    )
+    TagFacetCount.objects.all().delete()
+    for tagged_model in (FanFiction, Event):
+        tag_links_counted(tagged_model, tagged_model.tags.through.objects.all(), by=1)
+    cache.bump_version_on_commit(Tag)
+    return stories, tags
@@ -0,0 +1,119 @@
+"""
+The landing page payload: announcements, events, fanart, seasonal reports
+and team members in one response (HomeView, /core/home/).
+
+Each section is the first page of the matching list endpoint, as an
+anonymous visitor sees it, and is cached on its own under a key built from
+the versions of the models it reads (see core/cache.py). An edit to a fanart
+therefore only rebuilds the fanart section, and a fully cached page costs two
+cache round trips and no queries. Sections that do have to be built run
+their queries in parallel on HOME_SECTION_WORKERS threads, each with its own
+database connection.
+"""
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections
+
+from . import cache as response_cache
+from .models import Announcement, Event, FanArt, SeasonalReport, Tag, TeamMember
+from .serializers import (
+    AnnouncementSerializer,
+    EventSerializer,
+    FanArtSerializer,
+    SeasonalReportSerializer,
+    TeamMemberSerializer,
+)
+
+
+class Section:
+    def __init__(self, queryset, serializer_class, models, ordering=("pk",), limit=None):
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self.models = models
+        self.ordering = ordering
+        self.limit = limit
+
+    def build(self):
+        rows = self.serializer_class.setup_eager_loading(self.queryset.all()).order_by(*self.ordering)
+        if self.limit is not None:
+            rows = rows[:self.limit]
+        return self.serializer_class(list(rows), many=True).data
+
+
+# Same rows, order and page size as the list endpoints.
+SECTIONS = {
+    "announcements": Section(Announcement.objects.filter(is_active=True), AnnouncementSerializer, (Announcement,)),
+    "events": Section(Event.objects.all(), EventSerializer, (Event, Tag), ("-date", "-id"), 20),
+    "fanart": Section(FanArt.objects.all(), FanArtSerializer, (FanArt, User), ("-created_at", "-id"), 20),
+    "seasonal_reports": Section(
+        SeasonalReport.objects.all(), SeasonalReportSerializer, (SeasonalReport,), ("-published_at", "-id"), 20
+    ),
+    "team_members": Section(TeamMember.objects.all(), TeamMemberSerializer, (TeamMember,)),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def section_keys(names):
+    """Cache key of each section, reflecting the current versions of its models."""
+    models = list(dict.fromkeys(model for name in names for model in SECTIONS[name].models))
+    versions = dict(zip(models, response_cache.get_versions(models)))
+    return {
+        name: f"home:{name}:{hashlib.sha1(repr([versions[m] for m in SECTIONS[name].models]).encode()).hexdigest()}"
+        for name in names
+    }
+
+
+def etag_for(keys):
+    return '"' + hashlib.sha1("|".join(sorted(keys.values())).encode()).hexdigest() + '"'
+
+
+def build_in_thread(name):
+    try:
+        return SECTIONS[name].build()
+    finally:
+        # Pool threads live on; do not leave their connections open between requests.
+        connections.close_all()
+
+
+def get_pool(workers):
+    global _pool
+    if _pool is None:
+        # Two first requests at once must not both start a pool.
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="home-section")
+    return _pool
+
+
+def build(names):
+    workers = settings.HOME_SECTION_WORKERS
+    # Other connections would not see the rows of an open transaction.
+    if workers < 2 or len(names) < 2 or connection.in_atomic_block:
+        return {name: SECTIONS[name].build() for name in names}
+    pool = get_pool(workers)
+    # Each in a copy of this request's context, so its queries are still measured.
+    futures = [pool.submit(copy_context().run, build_in_thread, name) for name in names]
+    return {name: future.result() for name, future in zip(names, futures)}
+
+
+def payload(names, keys):
+    """({section: data}, number of sections served from the cache)."""
+    cached = cache.get_many(list(keys.values()))
+    data = {name: cached[keys[name]] for name in names if keys[name] in cached}
+    for name in names:
+        response_cache.stats.record(f"home:{name}", hit=name in data)
+
+    missing = [name for name in names if name not in data]
+    if missing:
+        built = build(missing)
+        cache.set_many({keys[name]: built[name] for name in missing}, settings.RESPONSE_CACHE_TIMEOUT)
+        data.update(built)
+    return {name: data[name] for name in names}, len(names) - len(missing)
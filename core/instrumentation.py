@@ -0,0 +1,317 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware measures every request routed to a named view: wall
+time, database query count and time, time spent in serializers and response
+size. Rate limit checks are timed separately (throttle_timing), and their
+queries are left out of the view's. It adds a Server-Timing header and keeps the most recent samples of
+each view in process, which MetricsView (staff only, /core/_metrics) exports
+as Prometheus summaries together with the response cache hit counters and the
+database connection pool statistics.
+
+PERFORMANCE_BUDGETS maps "METHOD view-name" (or a bare view name, for every
+method) to limits on "queries", "db_ms" or "total_ms". Going over logs a
+warning, or raises PerformanceBudgetExceeded when PERFORMANCE_BUDGET_ACTION
+is "raise" (the test suite sets this).
+
+The middleware runs natively under both WSGI and ASGI. Samples live in one
+process, so with several workers each reports its own.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import cache as response_cache
+
+logger = logging.getLogger("core.performance")
+
+SAMPLE_SIZE = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+
+# (metric, Prometheus name, unit scale, help)
+METRICS = (
+    ("total_ms", "anisoc_request_duration_seconds", 0.001, "Wall time per request."),
+    ("db_ms", "anisoc_request_db_seconds", 0.001, "Database time per request."),
+    ("serialize_ms", "anisoc_request_serialize_seconds", 0.001, "Serializer time per request."),
+    ("throttle_ms", "anisoc_request_throttle_seconds", 0.001, "Rate limit checks per request."),
+    ("queries", "anisoc_request_queries", 1, "Database queries per request."),
+    ("bytes", "anisoc_response_bytes", 1, "Response body size."),
+)
+
+# psycopg_pool statistics: (key, Prometheus name, type, unit scale, help)
+POOL_METRICS = (
+    ("pool_max", "anisoc_db_pool_max_connections", "gauge", 1, "Most connections the pool may open."),
+    ("pool_size", "anisoc_db_pool_connections", "gauge", 1, "Connections open, in use or idle."),
+    ("pool_available", "anisoc_db_pool_idle_connections", "gauge", 1, "Idle connections ready to be borrowed."),
+    ("requests_waiting", "anisoc_db_pool_waiting_requests", "gauge", 1, "Requests waiting for a connection now."),
+    ("requests_num", "anisoc_db_pool_requests_total", "counter", 1, "Connections borrowed from the pool."),
+    ("requests_queued", "anisoc_db_pool_queued_requests_total", "counter", 1, "Borrows that had to wait."),
+    ("requests_wait_ms", "anisoc_db_pool_wait_seconds_total", "counter", 0.001, "Time spent waiting to borrow."),
+    ("requests_errors", "anisoc_db_pool_request_errors_total", "counter", 1, "Borrows that timed out or failed."),
+    ("connections_num", "anisoc_db_pool_connects_total", "counter", 1, "Connections opened to the server."),
+    ("connections_ms", "anisoc_db_pool_connect_seconds_total", "counter", 0.001, "Time spent opening connections."),
+    ("connections_errors", "anisoc_db_pool_connect_errors_total", "counter", 1, "Failed attempts to connect."),
+    ("connections_lost", "anisoc_db_pool_lost_connections_total", "counter", 1, "Connections that failed their check."),
+)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class PerformanceBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.throttle_seconds = 0.0
+        self._serializing = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+def timed_serialization(to_representation):
+    """
+    Decorator for Serializer.to_representation that adds the time to the
+    current request. Nested serializers are only counted once, by the outermost.
+    """
+
+    def wrapper(serializer, instance):
+        metrics = _current.get()
+        if metrics is None or metrics._serializing:
+            return to_representation(serializer, instance)
+
+        metrics._serializing += 1
+        start = time.perf_counter()
+        try:
+            return to_representation(serializer, instance)
+        finally:
+            metrics.serialize_seconds += time.perf_counter() - start
+            metrics._serializing -= 1
+
+    return wrapper
+
+
+@contextmanager
+def throttle_timing():
+    """
+    Time rate limit checks on their own. Their queries (see core/throttling.py)
+    would otherwise count against every view's query budget.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    queries, db_seconds = metrics.queries, metrics.db_seconds
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.throttle_seconds += time.perf_counter() - start
+        metrics.queries, metrics.db_seconds = queries, db_seconds
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection; queries outside a request are not measured.
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_hook(connection):
+    """
+    Queries are measured by a wrapper that stays on each connection rather
+    than one added per request, because under ASGI the ORM runs them on
+    other threads, whose connections the middleware cannot see. The
+    request's metrics reach those threads through the context variable.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def hook_new_connection(sender, connection, **kwargs):
+    install_query_hook(connection)
+
+
+class ViewSamples:
+    """The last SAMPLE_SIZE measurements of every view, plus running totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=SAMPLE_SIZE))
+        self._totals = defaultdict(lambda: defaultdict(float))
+
+    def record(self, view_name, sample):
+        with self._lock:
+            self._samples[view_name].append(sample)
+            totals = self._totals[view_name]
+            totals["count"] += 1
+            for metric, value in sample.items():
+                totals[metric] += value
+
+    def summary(self):
+        """{view: {"count": n, metric: {"sum": s, quantile: value, ...}}}"""
+        with self._lock:
+            samples = {view: list(rows) for view, rows in self._samples.items()}
+            totals = {view: dict(values) for view, values in self._totals.items()}
+
+        summary = {}
+        for view, rows in samples.items():
+            view_summary = {"count": int(totals[view]["count"])}
+            for metric, *_ in METRICS:
+                values = sorted(row[metric] for row in rows)
+                view_summary[metric] = {"sum": totals[view].get(metric, 0.0)}
+                for quantile in QUANTILES:
+                    view_summary[metric][quantile] = values[min(int(quantile * len(values)), len(values) - 1)]
+            summary[view] = view_summary
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+samples = ViewSamples()
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported missed connection_created.
+        for connection in connections.all():
+            install_query_hook(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        match = getattr(request, "resolver_match", None)
+        if match is None or not match.view_name:
+            return response
+
+        sample = {
+            "total_ms": total * 1000,
+            "db_ms": metrics.db_seconds * 1000,
+            "serialize_ms": metrics.serialize_seconds * 1000,
+            "throttle_ms": metrics.throttle_seconds * 1000,
+            "queries": metrics.queries,
+            # Streamed bodies are still being produced, count what the header promises.
+            "bytes": int(response.get("Content-Length", 0)) if response.streaming else len(response.content),
+        }
+        samples.record(match.view_name, sample)
+
+        if getattr(settings, "SERVER_TIMING", True):
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={sample["db_ms"]:.1f};desc="{metrics.queries} queries"',
+                f'serialize;dur={sample["serialize_ms"]:.1f}',
+                f'throttle;dur={sample["throttle_ms"]:.1f}',
+                f'total;dur={sample["total_ms"]:.1f}',
+            ])
+
+        self.check_budget(request, match.view_name, sample)
+        return response
+
+    def check_budget(self, request, view_name, sample):
+        budgets = getattr(settings, "PERFORMANCE_BUDGETS", {})
+        budget = budgets.get(f"{request.method} {view_name}") or budgets.get(view_name)
+        if not budget:
+            return
+        over = [
+            f"{metric} {sample[metric]:g} > {limit:g}"
+            for metric, limit in budget.items()
+            if sample[metric] > limit
+        ]
+        if not over:
+            return
+
+        message = f"{request.method} {request.path} ({view_name}) over budget: {', '.join(over)}"
+        if getattr(settings, "PERFORMANCE_BUDGET_ACTION", "log") == "raise":
+            raise PerformanceBudgetExceeded(message)
+        logger.warning(message)
+
+
+def prometheus_text():
+    """Request summaries and cache counters in the Prometheus text format."""
+    lines = []
+    summary = samples.summary()
+    for metric, name, scale, help_text in METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} summary")
+        for view, view_summary in sorted(summary.items()):
+            values = view_summary[metric]
+            for quantile in QUANTILES:
+                lines.append(f'{name}{{view="{view}",quantile="{quantile}"}} {values[quantile] * scale:g}')
+            lines.append(f'{name}_sum{{view="{view}"}} {values["sum"] * scale:g}')
+            lines.append(f'{name}_count{{view="{view}"}} {view_summary["count"]}')
+
+    lines.append("# HELP anisoc_response_cache_requests_total Cached list lookups by result.")
+    lines.append("# TYPE anisoc_response_cache_requests_total counter")
+    for (view, result), count in sorted(response_cache.stats.snapshot().items()):
+        lines.append(f'anisoc_response_cache_requests_total{{view="{view}",result="{result}"}} {count}')
+
+    stats = pool_stats()
+    if stats:
+        for key, name, kind, scale, help_text in POOL_METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for alias, pool in sorted(stats.items()):
+                # Counters that never moved are left out by psycopg_pool.
+                lines.append(f'{name}{{database="{alias}"}} {pool.get(key, 0) * scale:g}')
+    return "\n".join(lines) + "\n"
+
+
+def pool_stats():
+    """{database alias: psycopg_pool statistics} for the databases with a connection pool."""
+    stats = {}
+    for alias in connections:
+        # Only the PostgreSQL backend has pools; the pool is shared by all threads.
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
@@ -0,0 +1,139 @@
+"""
+Concurrent-connection load test for the loadtest management command.
+
+Where run_benchmarks times one request at a time, this keeps N keep-alive
+connections busy against one or more running servers for a fixed time, at
+several concurrency levels, and reports throughput, latency percentiles and
+errors for each. Pointing it at the same paths on a WSGI deployment (sync
+gunicorn) and an ASGI one (uvicorn workers) shows how each copes as
+connections outnumber worker threads.
+
+The client is a minimal HTTP/1.1 one on asyncio streams, so thousands of
+connections cost the load generator little.
+"""
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from .benchmark import percentile
+
+
+class Connection:
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """Status of one GET, (re)connecting as needed."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        request = f"GET {path} HTTP/1.1\r\nHost: {self.host_header}\r\nAccept: application/json\r\n\r\n"
+        self.writer.write(request.encode())
+        await self.writer.drain()
+        return await asyncio.wait_for(self.read_response(), self.timeout)
+
+    async def read_response(self):
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+async def worker(base_url, paths, offset, deadline, timeout, results):
+    connection = Connection(base_url, timeout)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                status = await connection.get(path)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as error:
+                results["errors"][type(error).__name__] = results["errors"].get(type(error).__name__, 0) + 1
+                await connection.close()
+                continue
+            results["latencies"].append((time.perf_counter() - start) * 1000)
+            results["statuses"][status] = results["statuses"].get(status, 0) + 1
+    finally:
+        await connection.close()
+
+
+async def level(base_url, paths, concurrency, duration, timeout):
+    results = {"latencies": [], "statuses": {}, "errors": {}}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        worker(base_url, paths, offset, deadline, timeout, results)
+        for offset in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies = results["latencies"]
+    summary = {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "statuses": {str(status): count for status, count in sorted(results["statuses"].items())},
+        "errors": results["errors"],
+    }
+    for name, quantile in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        summary[name] = round(percentile(latencies, quantile), 3) if latencies else None
+    summary["mean_ms"] = round(statistics.fmean(latencies), 3) if latencies else None
+    return summary
+
+
+def run(base_urls, paths, concurrency_levels, duration=10.0, timeout=30.0, log=None):
+    log = log or (lambda message: None)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "paths": paths,
+        "duration": duration,
+        "servers": {},
+    }
+    for base_url in base_urls:
+        base_url = base_url.rstrip("/")
+        levels = []
+        for concurrency in concurrency_levels:
+            summary = asyncio.run(level(base_url, paths, concurrency, duration, timeout))
+            levels.append(summary)
+            errors = sum(summary["errors"].values())
+            log(
+                f"{base_url:30} c={concurrency:<5} {summary['requests_per_second']:9.1f} req/s "
+                f"p50 {summary['p50_ms'] or 0:8.2f}ms p99 {summary['p99_ms'] or 0:8.2f}ms errors {errors}"
+            )
+        report["servers"][base_url] = levels
+    return report
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = "Run migrate and collectstatic only if there are unapplied migrations or changed static files."
+    # The web process starts right after; checks add nothing a boot needs.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Run both, even if they look up to date.")
+
+    def handle(self, *args, **options):
+        verbosity = self.verbosity = options["verbosity"]
+
+        start = time.perf_counter()
+        unapplied = startup.unapplied_migrations(connection)
+        if unapplied or options["force"]:
+            call_command("migrate", interactive=False, verbosity=verbosity)
+            self.report("migrate", f"{len(unapplied)} unapplied migrations, migrated", start)
+        else:
+            self.report("migrate", "up to date, skipped", start)
+
+        start = time.perf_counter()
+        fingerprint = startup.static_fingerprint()
+        if fingerprint != startup.collected_fingerprint() or options["force"]:
+            call_command("collectstatic", interactive=False, verbosity=verbosity)
+            startup.save_fingerprint(fingerprint)
+            self.report("collectstatic", "static files changed, collected", start)
+        else:
+            self.report("collectstatic", "up to date, skipped", start)
+
+    def report(self, step, outcome, start):
+        if self.verbosity:
+            self.stdout.write(f"{step}: {outcome} ({(time.perf_counter() - start) * 1000:.0f} ms)")
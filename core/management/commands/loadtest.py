@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import loadtest
+
+DEFAULT_PATHS = [
+    "/core/async/events/",
+    "/core/async/fanart/",
+    "/core/async/fanfiction/",
+    "/core/async/announcements/",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test running servers with many concurrent connections, e.g. sync gunicorn against "
+        "uvicorn workers serving the same paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("base_urls", nargs="+", help="Servers to compare, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--path", action="append", dest="paths", help="Path to request, repeatable.")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--output", help="Write the JSON report here.")
+
+    def handle(self, *args, **options):
+        # The servers rate limit the load generator like any client: start them with a
+        # high ANON_THROTTLE_RATE (e.g. 1000000/hour) or most responses will be 429s.
+        report = loadtest.run(
+            options["base_urls"],
+            options["paths"] or DEFAULT_PATHS,
+            options["concurrency"],
+            duration=options["duration"],
+            timeout=options["timeout"],
+            log=lambda message: self.stdout.write(message),
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Report written to {options['output']}.")
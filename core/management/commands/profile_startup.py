@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = "Time a cold boot of the app, phase by phase and module by module, in fresh interpreters."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Boots to take the median of.")
+        parser.add_argument("--top", type=int, default=25, help="How many packages and modules to list.")
+        parser.add_argument("--output", help="Write the JSON report here.")
+
+    def handle(self, *args, **options):
+        report = startup.profile(runs=options["runs"], top=options["top"])
+
+        self.stdout.write(f"Boot phases (median of {report['runs']}):")
+        for phase, ms in report["phases"].items():
+            self.stdout.write(f"  {phase:<14} {ms:>8.1f} ms")
+        self.stdout.write(f"  {'total':<14} {report['total_ms']:>8.1f} ms")
+
+        self.stdout.write("\nImport time by package (own code only):")
+        for row in report["packages"]:
+            self.stdout.write(f"  {row['package']:<40} {row['ms']:>8.1f} ms")
+
+        self.stdout.write("\nSlowest imports (including what they import):")
+        for row in report["modules"]:
+            self.stdout.write(f"  {row['module']:<40} {row['cumulative_ms']:>8.1f} ms  (own {row['self_ms']:.1f} ms)")
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Report written to {options['output']}.")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--interval", type=int, default=None,
+            help="Keep running, pruning every this many seconds (e.g. as a sidecar instead of cron).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_expired_tokens(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens."))
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for fanfiction, chapters and public blog posts."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} documents with the {backend.name} backend."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = "Recount chapters, comments and tag usage from the real rows, repairing any drift."
+
+    def handle(self, *args, **options):
+        stories, tags = counters.recompute()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {stories} stories and {tags} tags."))
@@ -0,0 +1,97 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark every core GET endpoint and optionally compare against a baseline report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--base-url", help="Benchmark a running server (e.g. http://127.0.0.1:8000) instead of in process.")
+        parser.add_argument("--user", help="Username to authenticate as; anonymous by default.")
+        parser.add_argument("--only", action="append", help="Only endpoints whose name contains this, repeatable.")
+        parser.add_argument("--output", help="Write the JSON report here.")
+        parser.add_argument("--baseline", help="JSON report to compare against.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown, as a fraction.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument(
+            "--fast-path",
+            action="store_true",
+            help="Compare compiled serializers and orjson against stock DRF instead, in process.",
+        )
+        parser.add_argument(
+            "--connections",
+            action="store_true",
+            help="Compare connecting per request against borrowing from a connection pool instead (PostgreSQL).",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user {options['user']!r}.")
+
+        if options["connections"]:
+            try:
+                report = benchmark.connection_overhead(
+                    iterations=options["iterations"],
+                    warmup=options["warmup"],
+                    log=lambda message: self.stdout.write(message),
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.write_report(report, options)
+            return
+
+        if options["fast_path"]:
+            if options["base_url"]:
+                raise CommandError("--fast-path switches settings in this process and cannot use --base-url.")
+            report = benchmark.fast_path_speedup(
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                only=options["only"],
+                user=user,
+                log=lambda message: self.stdout.write(message),
+            )
+            self.write_report(report, options)
+            return
+
+        if options["base_url"]:
+            runner = benchmark.HTTPRunner(options["base_url"], user=user)
+        else:
+            runner = benchmark.ClientRunner(user=user)
+
+        report = benchmark.run(
+            runner,
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            only=options["only"],
+            log=lambda message: self.stdout.write(message),
+        )
+
+        self.write_report(report, options)
+
+        if not options["baseline"]:
+            return
+        with open(options["baseline"]) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = benchmark.compare(report, baseline, tolerance=options["tolerance"])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+            return
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(regression))
+        if options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regressions against the baseline.")
+
+    def write_report(self, report, options):
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Report written to {options['output']}.")
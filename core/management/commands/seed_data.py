@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seed import Seeder
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert a large synthetic dataset (users, tags, stories, chapters, blog posts, comments) for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--tags", type=int, default=300)
+        parser.add_argument("--stories", type=int, default=50000)
+        parser.add_argument("--chapters-per-story", type=int, default=5, help="Average, varies per story.")
+        parser.add_argument("--chapter-words", type=int, default=1500)
+        parser.add_argument("--blog-posts", type=int, default=2000)
+        parser.add_argument("--comments", type=int, default=1000000)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=None, help="Random seed, for repeatable datasets.")
+        parser.add_argument("--no-index", action="store_true", help="Skip rebuilding the search index.")
+        parser.add_argument("--force", action="store_true", help="Allow seeding when DEBUG is off.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Refusing to seed with DEBUG off, pass --force if this really is a scratch database.")
+        if options["users"] < 1:
+            raise CommandError("At least one user is needed to author the content.")
+
+        seeder = Seeder(
+            batch_size=options["batch_size"],
+            random_seed=options["seed"],
+            log=lambda message: self.stdout.write(message),
+        )
+        seeder.run(
+            users=options["users"],
+            tags=options["tags"],
+            stories=options["stories"],
+            chapters_per_story=options["chapters_per_story"],
+            chapter_words=options["chapter_words"],
+            comments=options["comments"],
+            blog_posts=options["blog_posts"],
+            index=not options["no_index"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Seeded rows prefixed {seeder.prefix}."))
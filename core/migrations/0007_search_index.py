@@ -0,0 +1,138 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_searchdocument_fts USING fts5(
+        title, body,
+        content='core_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_ai",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_ad",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_au",
+    "DROP TABLE IF EXISTS core_searchdocument_fts",
+]
+
+# Must stay identical to core.search.PG_VECTOR.
+GIN_SQL = """
+    CREATE INDEX core_searchdocument_fts_gin ON core_searchdocument USING GIN (
+        (setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B'))
+    )
+"""
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(GIN_SQL)
+    elif vendor == "sqlite":
+        try:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+                cursor.execute("DROP TABLE temp.fts5_probe")
+        except Exception:
+            # SQLite built without FTS5, core.search falls back to the python backend.
+            return
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS core_searchdocument_fts_gin")
+    elif vendor == "sqlite":
+        for sql in FTS_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+def index_existing_content(apps, schema_editor):
+    # Fills SearchDocument; the python backend's SearchTerm postings need rebuild_search_index.
+    SearchDocument = apps.get_model("core", "SearchDocument")
+    FanFiction = apps.get_model("core", "FanFiction")
+    Chapter = apps.get_model("core", "Chapter")
+    BlogPost = apps.get_model("core", "BlogPost")
+
+    documents = []
+    for fanfic in FanFiction.objects.prefetch_related("tags"):
+        tag_names = " ".join(tag.name for tag in fanfic.tags.all())
+        documents.append(SearchDocument(
+            kind="fanfiction", object_id=fanfic.pk,
+            title=fanfic.title, body=f"{fanfic.summary}\n{tag_names}",
+        ))
+    for chapter in Chapter.objects.all():
+        documents.append(SearchDocument(
+            kind="chapter", object_id=chapter.pk, parent_id=chapter.fanfiction_id,
+            title=chapter.title, body=chapter.content,
+        ))
+    for post in BlogPost.objects.filter(is_public=True):
+        documents.append(SearchDocument(
+            kind="blog", object_id=post.pk, title=post.title, body=post.content,
+        ))
+    # Plain INSERTs so the FTS5 triggers fire for every row.
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_alter_fanfiction_front_page_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fanfiction', 'Fanfiction'), ('chapter', 'Chapter'), ('blog', 'Blog post')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('parent_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('title', models.CharField(max_length=700)),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('frequency', models.PositiveIntegerField()),
+                ('in_title', models.BooleanField(default=False)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='core.searchdocument')),
+            ],
+            options={
+                'unique_together': {('term', 'document')},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(index_existing_content, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 13:02
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+TIMESTAMPED = {
+    "announcement": "created_at",
+    "event": "created_at",
+    "fanart": "created_at",
+    "seasonalreport": "published_at",
+    "fanfiction": "created_at",
+    "chapter": "published_at",
+    "comment": "created_at",
+}
+
+
+def copy_creation_time(apps, schema_editor):
+    for model_name, source in TIMESTAMPED.items():
+        apps.get_model("core", model_name).objects.update(updated_at=F(source))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_search_index'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name='updated_at',
+                field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+                preserve_default=False,
+            )
+            for model_name in TIMESTAMPED
+        ],
+        migrations.RunPython(copy_creation_time, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 12:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['created_at', 'id'], name='core_blogpost_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'id'], name='core_event_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fanart',
+            index=models.Index(fields=['created_at', 'id'], name='core_fanart_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fanfiction',
+            index=models.Index(fields=['created_at', 'id'], name='core_fanfic_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seasonalreport',
+            index=models.Index(fields=['published_at', 'id'], name='core_report_published_id_idx'),
+        ),
+    ]
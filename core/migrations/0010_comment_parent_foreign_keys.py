@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        # Nullable while rows move over, so 0012 can be reversed.
+        migrations.AlterField(
+            model_name='comment',
+            name='parent_id',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='blog_post',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.blogpost'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='fanfiction',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.fanfiction'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='chapter',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.chapter'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 14:21
+
+from functools import reduce
+from operator import or_
+
+from django.db import migrations
+from django.db.models import F, Q
+
+# Spellings the free-text parent_type column has been seen with.
+PARENT_ALIASES = {
+    "blog": ["blog", "blogpost", "blog_post", "blog-post", "post"],
+    "fanfiction": ["fanfiction", "fanfic", "fan_fiction", "story"],
+    "chapter": ["chapter"],
+}
+
+PARENTS = {
+    "blog": ("blog_post_id", "BlogPost"),
+    "fanfiction": ("fanfiction_id", "FanFiction"),
+    "chapter": ("chapter_id", "Chapter"),
+}
+
+
+def convert_parents(apps, schema_editor):
+    Comment = apps.get_model("core", "Comment")
+
+    for parent_type, aliases in PARENT_ALIASES.items():
+        field, model_name = PARENTS[parent_type]
+        parent_ids = apps.get_model("core", model_name).objects.values("pk")
+        spelled = reduce(or_, [Q(parent_type__iexact=alias) for alias in aliases])
+        (
+            Comment.objects
+            .filter(spelled, parent_id__in=parent_ids)
+            .update(parent_type=parent_type, **{field: F("parent_id")})
+        )
+
+    # Unknown parent types and comments whose parent was deleted before
+    # cascades existed can never be shown, drop them.
+    Comment.objects.filter(blog_post__isnull=True, fanfiction__isnull=True, chapter__isnull=True).delete()
+
+
+def restore_parent_ids(apps, schema_editor):
+    Comment = apps.get_model("core", "Comment")
+    for field, _ in PARENTS.values():
+        Comment.objects.filter(**{f"{field}__isnull": False}).update(parent_id=F(field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_comment_parent_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_parents, restore_parent_ids),
+    ]
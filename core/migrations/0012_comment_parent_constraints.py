@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_convert_comment_parents'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='comment',
+            name='parent_id',
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='parent_type',
+            field=models.CharField(choices=[('blog', 'Blog post'), ('fanfiction', 'Fanfiction'), ('chapter', 'Chapter')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog_post', 'created_at'], name='core_comment_blog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['fanfiction', 'created_at'], name='core_comment_fanfic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['chapter', 'created_at'], name='core_comment_chapter_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('blog_post__isnull', False), ('chapter__isnull', True), ('fanfiction__isnull', True), ('parent_type', 'blog')), models.Q(('blog_post__isnull', True), ('chapter__isnull', True), ('fanfiction__isnull', False), ('parent_type', 'fanfiction')), models.Q(('blog_post__isnull', True), ('chapter__isnull', False), ('fanfiction__isnull', True), ('parent_type', 'chapter')), _connector='OR'), name='core_comment_single_parent'),
+        ),
+    ]
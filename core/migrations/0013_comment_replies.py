@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+PATH_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+PATH_STEP = 8
+
+
+def path_segment(pk):
+    digits = ""
+    while pk:
+        pk, remainder = divmod(pk, len(PATH_DIGITS))
+        digits = PATH_DIGITS[remainder] + digits
+    return digits.rjust(PATH_STEP, "0")
+
+
+def set_root_paths(apps, schema_editor):
+    # Every existing comment is top level.
+    Comment = apps.get_model("core", "Comment")
+    batch = []
+    for comment in Comment.objects.only("pk").iterator(chunk_size=1000):
+        comment.path = path_segment(comment.pk)
+        batch.append(comment)
+        if len(batch) == 1000:
+            Comment.objects.bulk_update(batch, ["path"])
+            batch = []
+    Comment.objects.bulk_update(batch, ["path"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_comment_parent_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='core.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=72),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_root_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog_post', 'path'], name='core_comment_blog_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['fanfiction', 'path'], name='core_comment_fanfic_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['chapter', 'path'], name='core_comment_chapter_path_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset):
+    counted = queryset.order_by().annotate(n=Func(F("pk"), function="COUNT")).values("n")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    FanFiction = apps.get_model("core", "FanFiction")
+    Chapter = apps.get_model("core", "Chapter")
+    Comment = apps.get_model("core", "Comment")
+    Tag = apps.get_model("core", "Tag")
+
+    FanFiction.objects.update(
+        chapter_count=count_of(Chapter.objects.filter(fanfiction=OuterRef("pk"))),
+        comment_count=count_of(
+            Comment.objects.filter(Q(fanfiction=OuterRef("pk")) | Q(chapter__fanfiction=OuterRef("pk")))
+        ),
+        last_chapter_published_at=Subquery(
+            Chapter.objects.filter(fanfiction=OuterRef("pk")).order_by("-published_at").values("published_at")[:1]
+        ),
+    )
+    Tag.objects.update(
+        usage_count=(
+            count_of(FanFiction.tags.through.objects.filter(tag=OuterRef("pk")))
+            + count_of(apps.get_model("core", "Event").tags.through.objects.filter(tag=OuterRef("pk")))
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_comment_replies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fanfiction',
+            name='chapter_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='fanfiction',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='fanfiction',
+            name='last_chapter_published_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
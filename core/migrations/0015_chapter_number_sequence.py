@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 16:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_sequence(apps, schema_editor):
+    FanFiction = apps.get_model("core", "FanFiction")
+    Chapter = apps.get_model("core", "Chapter")
+    highest = Chapter.objects.filter(fanfiction=OuterRef("pk")).order_by("-chapter_number").values("chapter_number")[:1]
+    FanFiction.objects.update(last_chapter_number=Coalesce(Subquery(highest), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fanfiction',
+            name='last_chapter_number',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+def count_words(apps, schema_editor):
+    Chapter = apps.get_model("core", "Chapter")
+    batch = []
+    for chapter in Chapter.objects.only("pk", "content").iterator(chunk_size=200):
+        chapter.word_count = len(chapter.content.split())
+        batch.append(chapter)
+        if len(batch) == 200:
+            Chapter.objects.bulk_update(batch, ["word_count"])
+            batch = []
+    Chapter.objects.bulk_update(batch, ["word_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_chapter_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_words, migrations.RunPython.noop),
+    ]
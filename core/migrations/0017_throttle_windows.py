@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_chapter_word_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('window', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'unique_together': {('key', 'window')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Value
+
+
+def fill_facets(apps, schema_editor):
+    TagFacetCount = apps.get_model("core", "TagFacetCount")
+    tagged = [
+        ("fanfiction", apps.get_model("core", "FanFiction"), F("fanfiction__status")),
+        ("event", apps.get_model("core", "Event"), Value("")),
+    ]
+    for kind, model, status in tagged:
+        rows = (
+            model.tags.through.objects.annotate(facet_status=status)
+            .values("tag_id", "facet_status")
+            .annotate(n=Count("pk"))
+            .order_by()
+        )
+        TagFacetCount.objects.bulk_create(
+            [TagFacetCount(kind=kind, tag_id=row["tag_id"], status=row["facet_status"], count=row["n"]) for row in rows],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_throttle_windows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facet_counts', to='core.tag')),
+            ],
+            options={
+                'unique_together': {('kind', 'status', 'tag')},
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,251 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins
+from rest_framework.response import Response
+
+from . import cache as response_cache
+from .compiled import compile_serializer
+from .facets import tag_facets
+
+
+class EagerLoadingMixin:
+    """
+    Applies the serializer's select_related / prefetch_related plan to the
+    queryset, so list and detail views run a fixed number of queries no matter
+    how many rows they return.
+
+    Hooked into filter_queryset() because both list() and get_object() go
+    through it, including views that override get_queryset(). With ?fields=
+    or ?exclude= only the columns the chosen fields need are loaded.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        setup_eager_loading = getattr(serializer_class, "setup_eager_loading", None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(
+                queryset,
+                fields=self.get_selected_fields(),
+                extra=self.get_read_columns(queryset),
+            )
+        return queryset
+
+    def get_selected_fields(self):
+        selected_fields = getattr(self.get_serializer_class(), "selected_fields", None)
+        return selected_fields(self.request) if selected_fields is not None else None
+
+    def get_read_columns(self, queryset):
+        """Columns the view itself reads: the ordering, for cursor links, and updated_at."""
+        ordering = list(queryset.query.order_by)
+        paginator_ordering = getattr(self.paginator, "ordering", None) or ()
+        ordering += [paginator_ordering] if isinstance(paginator_ordering, str) else list(paginator_ordering)
+        return {name.lstrip("-") for name in ordering if isinstance(name, str)} | {"updated_at"}
+
+
+class CachedListMixin:
+    """
+    Serves list GETs from the versioned response cache in core/cache.py.
+    cache_models lists every model the serialized output reads from; a save or
+    delete on any of them invalidates the cached pages. Entries keep the ETag
+    and Last-Modified of the response, so a hit can still answer with 304.
+
+    Staff are never served from the cache since some views show them more rows.
+    Goes before ConditionalGetMixin in the bases.
+    """
+    cache_models = ()
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().get(request, *args, **kwargs)
+
+        view_name = self.__class__.__name__
+        key = response_cache.response_key(view_name, request, self.cache_models)
+        entry = cache.get(key)
+        if entry is not None:
+            response_cache.stats.record(view_name, hit=True)
+            etag, timestamp, data = entry
+            response = get_not_modified(request, etag, timestamp) or Response(data)
+            set_validators(response, etag, timestamp)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response_cache.stats.record(view_name, hit=False)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            entry = (response["ETag"], getattr(response, "last_modified_timestamp", None), response.data)
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class TagFacetMixin:
+    """
+    Adds the tag facets (see core/facets.py) to a list response when asked
+    for with ?facets=true. facet_kind names the TagFacetCount rows, and
+    get_facet_status() the story status to count, if any. Goes before
+    ConditionalGetMixin in the bases.
+    """
+    facet_kind = None
+    facets_param = "facets"
+
+    def get_facet_status(self):
+        return None
+
+    def get_facets(self):
+        if self.request.query_params.get(self.facets_param) != "true":
+            return None
+        if not hasattr(self, "_facets"):
+            self._facets = tag_facets(self.facet_kind, self.get_facet_status())
+        return self._facets
+
+    def get_validators(self, request, rows, *extra):
+        # Tags elsewhere change the counts without changing the page.
+        return super().get_validators(request, rows, *extra, self.get_facets())
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        facets = self.get_facets()
+        if facets is not None:
+            response.data["facets"] = facets
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds strong ETag and Last-Modified headers to GET responses and answers
+    If-None-Match / If-Modified-Since with 304 before anything is serialized.
+
+    The ETag fingerprints the rows the view loaded anyway (the object or the
+    page, plus the relations its serializer reads), so it is exact and costs
+    no extra query. Last-Modified is the object's updated_at. Lists send no
+    Last-Modified: deleting or hiding a row does not move the newest
+    updated_at on the page forward, so only the ETag can tell.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if isinstance(self, mixins.ListModelMixin):
+            return self.conditional_list(request)
+
+        obj = self.get_object()
+        etag, timestamp = self.get_validators(request, [obj])
+        not_modified = get_not_modified(request, etag, timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        set_validators(response, etag, timestamp)
+        return response
+
+    def get_object(self):
+        # get() has already fetched it to build the validators.
+        if getattr(self, "_conditional_object", None) is None:
+            self._conditional_object = super().get_object()
+        return self._conditional_object
+
+    def conditional_list(self, request):
+        # ListModelMixin.list(), with the validator check between loading and serializing.
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = self.get_compiled_plan()
+        if plan is not None:
+            queryset = plan.values(queryset, extra=self.get_read_columns(queryset))
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        if plan is not None:
+            rows = plan.load(rows)
+
+        # The page links and count are part of the representation too.
+        extra = ()
+        if page is not None:
+            extra = (getattr(self.paginator, "count", None), self.paginator.get_next_link(), self.paginator.get_previous_link())
+        etag, _ = self.get_validators(request, rows, *extra)
+        not_modified = get_not_modified(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        if plan is not None:
+            data = plan.to_representation(rows)
+        else:
+            data = self.get_serializer(rows, many=True).data
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        set_validators(response, etag, None)
+        return response
+
+    def get_compiled_plan(self):
+        """The compiled serializer plan for this list (see core/compiled.py), or None to use the serializer."""
+        if not settings.COMPILED_SERIALIZERS:
+            return None
+        compiled = compile_serializer(self.get_serializer_class())
+        return compiled.plan(self.get_selected_fields()) if compiled is not None else None
+
+    def get_related_names(self):
+        # The relations EagerLoadingMixin loaded, which ?fields= may have narrowed.
+        loading_plan = getattr(self.get_serializer_class(), "loading_plan", None)
+        if loading_plan is None:
+            return ()
+        select_related, prefetch_related, _ = loading_plan(self.get_selected_fields())
+        return tuple(select_related) + tuple(prefetch_related)
+
+    def get_validators(self, request, rows, *extra):
+        user = request.user
+        values = [
+            self.__class__.__name__,
+            request.get_full_path(),
+            user.pk if user.is_authenticated else None,
+            user.is_staff,
+            *extra,
+        ]
+        related_names = self.get_related_names()
+        latest = None
+        for obj in rows:
+            values.extend(instance_values(obj))
+            if isinstance(obj, dict):
+                # A compiled serializer's row (see get_compiled_plan), which holds its related rows.
+                updated_at = obj.get("updated_at")
+            else:
+                for name in related_names:
+                    related = getattr(obj, name)
+                    # Loaded by EagerLoadingMixin, so none of this hits the database.
+                    related_rows = related.all() if hasattr(related, "all") else [related]
+                    for row in related_rows:
+                        values.extend(instance_values(row) if row is not None else [None])
+                updated_at = getattr(obj, "updated_at", None)
+            if updated_at is not None and (latest is None or updated_at > latest):
+                latest = updated_at
+
+        etag = quote_etag(hashlib.sha1(repr(values).encode()).hexdigest())
+        # HTTP dates have whole-second resolution.
+        return etag, int(latest.timestamp()) if latest else None
+
+
+def instance_values(obj):
+    if isinstance(obj, dict):
+        return [instance_values(value) if isinstance(value, (dict, list)) else value for value in obj.values()]
+    if isinstance(obj, list):
+        return [instance_values(row) for row in obj]
+    # Deferred fields are not serialized, and reading them would cost a query each.
+    deferred = obj.get_deferred_fields()
+    return [field.value_from_object(obj) for field in obj._meta.concrete_fields if field.attname not in deferred]
+
+
+def get_not_modified(request, etag, timestamp):
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, timestamp)
+    return response
+
+
+def set_validators(response, etag, timestamp):
+    if response.status_code not in (200, 304):
+        return
+    response["ETag"] = etag
+    if timestamp is not None:
+        response["Last-Modified"] = http_date(timestamp)
+        response.last_modified_timestamp = timestamp
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 
@@ -21,6 +21,7 @@ class Announcement(models.Model):
     is_active = models.BooleanField(default=True)
     priority = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -28,6 +29,8 @@ class Announcement(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, blank=True)
+    # Stories and events using the tag, see core/counters.py
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -44,6 +47,10 @@ class Event(models.Model):
     poster_url = models.URLField(blank=True, null=True)
     tags = models.ManyToManyField(Tag, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["date", "id"], name="core_event_date_id_idx")]
 
     def __str__(self):
         return self.title
@@ -55,6 +62,10 @@ class FanArt(models.Model):
     caption = models.TextField(blank=True)
     week = models.CharField(max_length=50)  # e.g. Week 3 / Spring 2025
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="core_fanart_created_id_idx")]
 
     def __str__(self):
         return self.week
@@ -65,6 +76,10 @@ class SeasonalReport(models.Model):
     description = models.TextField()
     poster_url = models.URLField(blank=True, null=True)
     published_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["published_at", "id"], name="core_report_published_id_idx")]
 
     def __str__(self):
         return self.title
@@ -78,6 +93,9 @@ class BlogPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="core_blogpost_created_id_idx")]
+
     def __str__(self):
         return self.title
 
@@ -93,7 +111,16 @@ class FanFiction(models.Model):
     summary = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     tags = models.ManyToManyField(Tag, blank=True)
+    # Maintained by core/counters.py; comment_count includes comments on chapters.
+    chapter_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_chapter_published_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_chapter_number = models.PositiveIntegerField(default=0, editable=False)  # chapter number sequence
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="core_fanfic_created_id_idx")]
 
     def __str__(self):
         return self.title
@@ -107,20 +134,211 @@ class Chapter(models.Model):
     chapter_number = models.PositiveIntegerField()
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Kept in step with content by save(), so a table of contents never reads content.
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     published_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("fanfiction", "chapter_number")
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            self.count_words()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "word_count"}
+        super().save(*args, **kwargs)
+
+    def count_words(self):
+        self.word_count = len(self.content.split())
+
     def __str__(self):
         return f"{self.fanfiction.title} - Chapter {self.chapter_number}"
 
 class Comment(models.Model):
+    PARENT_TYPE_CHOICES = [
+        ("blog", "Blog post"),
+        ("fanfiction", "Fanfiction"),
+        ("chapter", "Chapter"),
+    ]
+    # parent_type -> the foreign key holding the parent
+    PARENT_FIELDS = {
+        "blog": "blog_post",
+        "fanfiction": "fanfiction",
+        "chapter": "chapter",
+    }
+
+    # Replies are stored as a materialized path: the fixed-width base36 ids of
+    # every ancestor followed by the comment's own id. Sorting by path gives a
+    # thread in reading order and a subtree is one contiguous path range.
+    PATH_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+    PATH_STEP = 8
+    MAX_DEPTH = 8
+
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
-    parent_type = models.CharField(max_length=50)  # blog / fanfiction / chapter
-    parent_id = models.PositiveIntegerField()
+    parent_type = models.CharField(max_length=20, choices=PARENT_TYPE_CHOICES)
+    # Exactly one of these is set, matching parent_type (see the constraint below).
+    # They are indexed by the composite indexes in Meta instead of on their own.
+    blog_post = models.ForeignKey(
+        BlogPost,
+        related_name="comments",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        db_index=False
+    )
+    fanfiction = models.ForeignKey(
+        FanFiction,
+        related_name="comments",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        db_index=False
+    )
+    chapter = models.ForeignKey(
+        Chapter,
+        related_name="comments",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        db_index=False
+    )
+    reply_to = models.ForeignKey(
+        "self",
+        related_name="replies",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    path = models.CharField(max_length=PATH_STEP * (MAX_DEPTH + 1), editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["blog_post", "created_at"], name="core_comment_blog_idx"),
+            models.Index(fields=["fanfiction", "created_at"], name="core_comment_fanfic_idx"),
+            models.Index(fields=["chapter", "created_at"], name="core_comment_chapter_idx"),
+            models.Index(fields=["blog_post", "path"], name="core_comment_blog_path_idx"),
+            models.Index(fields=["fanfiction", "path"], name="core_comment_fanfic_path_idx"),
+            models.Index(fields=["chapter", "path"], name="core_comment_chapter_path_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(parent_type="blog", blog_post__isnull=False, fanfiction__isnull=True, chapter__isnull=True)
+                    | models.Q(parent_type="fanfiction", blog_post__isnull=True, fanfiction__isnull=False, chapter__isnull=True)
+                    | models.Q(parent_type="chapter", blog_post__isnull=True, fanfiction__isnull=True, chapter__isnull=False)
+                ),
+                name="core_comment_single_parent",
+            ),
+        ]
+
+    @property
+    def parent_id(self):
+        return getattr(self, f"{self.PARENT_FIELDS[self.parent_type]}_id")
+
+    @classmethod
+    def parent_lookup(cls, parent_type, parent_id):
+        """Filter kwargs for the comments on one parent, or None if the pair is invalid."""
+        if parent_type not in cls.PARENT_FIELDS or not (parent_id or "").isdigit():
+            return None
+        return {f"{cls.PARENT_FIELDS[parent_type]}_id": int(parent_id)}
+
+    @classmethod
+    def path_segment(cls, pk):
+        digits = ""
+        while pk:
+            pk, remainder = divmod(pk, len(cls.PATH_DIGITS))
+            digits = cls.PATH_DIGITS[remainder] + digits
+        return digits.rjust(cls.PATH_STEP, "0")
+
+    def save(self, *args, **kwargs):
+        if self.path:
+            return super().save(*args, **kwargs)
+
+        # The path ends with our own id, so it can only be written after the insert.
+        self.depth = self.reply_to.depth + 1 if self.reply_to_id else 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            prefix = self.reply_to.path if self.reply_to_id else ""
+            self.path = prefix + self.path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
 
     def __str__(self):
         return f"Comment by {self.author.username}"
+
+
+class SearchDocument(models.Model):
+    """
+    One row per searchable object (story, chapter, public blog post), kept in
+    sync by the signals in core/signals.py. On SQLite an FTS5 table mirrors this
+    table through triggers and on PostgreSQL a GIN expression index covers it,
+    see core/search.py and migration 0007.
+    """
+    KIND_CHOICES = [
+        ("fanfiction", "Fanfiction"),
+        ("chapter", "Chapter"),
+        ("blog", "Blog post"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    parent_id = models.PositiveBigIntegerField(blank=True, null=True)  # fanfiction of a chapter
+    title = models.CharField(max_length=700)
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("kind", "object_id")
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+class SearchTerm(models.Model):
+    # Inverted index used by the pure-Python search backend.
+    document = models.ForeignKey(
+        SearchDocument,
+        related_name="terms",
+        on_delete=models.CASCADE
+    )
+    term = models.CharField(max_length=100)
+    frequency = models.PositiveIntegerField()
+    in_title = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("term", "document")
+
+    def __str__(self):
+        return self.term
+
+
+class ThrottleWindow(models.Model):
+    # Requests one client made in one fixed rate-limit window, see core/throttling.py.
+    key = models.CharField(max_length=255)
+    window = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("key", "window")
+
+    def __str__(self):
+        return f"{self.key} @ {self.window}: {self.count}"
+
+
+class TagFacetCount(models.Model):
+    # Stories (per status) or events carrying a tag, maintained by core/counters.py.
+    kind = models.CharField(max_length=20)  # "fanfiction" or "event"
+    tag = models.ForeignKey(Tag, related_name="facet_counts", on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, blank=True)  # the story's status, blank for events
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("kind", "status", "tag")
+
+    def __str__(self):
+        return f"{self.kind} {self.status} {self.tag_id}: {self.count}"
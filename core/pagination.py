@@ -1,5 +1,80 @@
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
 
 class FanFictionPagination(LimitOffsetPagination):
+    """
+    Limit/offset for the story feed, with ?count=false to skip the COUNT(*)
+    ("count" is then null and "next" is found by fetching one extra row).
+    """
     default_limit = 10
     max_limit = 20
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.skip_count = request.query_params.get(self.count_query_param) == "false"
+        if not self.skip_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = None
+
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.skip_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+# Keyset pagination: each page continues from the last row's position in the
+# ordering (carried in an opaque cursor), so deep pages cost the same as the
+# first one and no COUNT(*) is run. The first ordering field is the key, later
+# fields only break ties.
+class NewestFirstCursorPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 50
+
+
+class FanFictionCursorPagination(NewestFirstCursorPagination):
+    page_size = 10
+    max_page_size = 20
+
+
+class CommentPagination(NewestFirstCursorPagination):
+    # Oldest first so a thread reads top to bottom
+    ordering = ("created_at", "id")
+
+
+class CommentThreadPagination(NewestFirstCursorPagination):
+    # Pages top-level comments; a root's path sorts like its id.
+    ordering = "path"
+    page_size = 10
+    max_page_size = 20
+
+
+class ChapterPagination(CursorPagination):
+    ordering = "chapter_number"
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class EventPagination(NewestFirstCursorPagination):
+    ordering = ("-date", "-id")
+
+
+class SeasonalReportPagination(NewestFirstCursorPagination):
+    ordering = ("-published_at", "-id")
@@ -0,0 +1,450 @@
+"""
+Full-text search over fanfiction, chapters and public blog posts.
+
+Searchable objects are copied into SearchDocument by the signals in
+core/signals.py. Queries go through one of three backends, picked by the
+SEARCH_BACKEND setting ("auto" chooses by database vendor):
+
+- postgresql: tsvector over title + body, served by a GIN expression index
+- sqlite: an FTS5 table kept in sync with SearchDocument by triggers
+- python: the SearchTerm inverted index, ranked with tf-idf in Python
+
+Every backend returns results as dicts with kind, object_id, parent_id, title,
+snippet and score, best match first. Matches in the snippet are wrapped in
+<mark></mark>. Backends can also rank() a queryset of the searched model, so
+list views page and count matches in the database like any other filter.
+"""
+import html
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.expressions import OrderBy, RawSQL
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+from .models import BlogPost, Chapter, FanFiction, SearchDocument, SearchTerm
+
+TOKEN_RE = re.compile(r"\w+")
+KINDS = [kind for kind, _ in SearchDocument.KIND_CHOICES]
+
+FTS_TABLE = "core_searchdocument_fts"
+
+# Must match the GIN index expression created in migration 0007 exactly,
+# otherwise PostgreSQL cannot use the index.
+PG_VECTOR = (
+    "(setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', body), 'B'))"
+)
+
+SNIPPET_WORDS = 24
+
+# The database backends mark matches with these, then the snippet is escaped and
+# they become <mark> tags, so stored text can never inject markup.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def document_for(instance):
+    """
+    Return (kind, parent_id, title, body) for a model instance, or None if the
+    instance should not be searchable.
+    """
+    if isinstance(instance, FanFiction):
+        tag_names = " ".join(tag.name for tag in instance.tags.all())
+        return "fanfiction", None, instance.title, f"{instance.summary}\n{tag_names}"
+    if isinstance(instance, Chapter):
+        return "chapter", instance.fanfiction_id, instance.title, instance.content
+    if isinstance(instance, BlogPost):
+        if not instance.is_public:
+            return None
+        return "blog", None, instance.title, instance.content
+    return None
+
+
+def kind_of(instance):
+    if isinstance(instance, FanFiction):
+        return "fanfiction"
+    if isinstance(instance, Chapter):
+        return "chapter"
+    if isinstance(instance, BlogPost):
+        return "blog"
+    return None
+
+
+def make_snippet(text, terms):
+    """Plain-Python highlight, used by the python backend."""
+    words = text.split()
+    terms = set(terms)
+    hit = 0
+    for i, word in enumerate(words):
+        if terms.intersection(tokenize(word)):
+            hit = i
+            break
+
+    start = max(0, hit - SNIPPET_WORDS // 3)
+    window = words[start:start + SNIPPET_WORDS]
+    marked = []
+    for word in window:
+        escaped = html.escape(word)
+        if terms.intersection(tokenize(word)):
+            escaped = f"<mark>{escaped}</mark>"
+        marked.append(escaped)
+
+    snippet = " ".join(marked)
+    if start > 0:
+        snippet = "…" + snippet
+    if start + SNIPPET_WORDS < len(words):
+        snippet += "…"
+    return snippet
+
+
+class PythonSearchBackend:
+    name = "python"
+
+    def index(self, document):
+        self.index_many([document])
+
+    def index_many(self, documents):
+        SearchTerm.objects.filter(document__in=documents).delete()
+        SearchTerm.objects.bulk_create([
+            term for document in documents for term in self.terms(document)
+        ], ignore_conflicts=True)
+
+    def terms(self, document):
+        title_terms = set(tokenize(document.title))
+        counts = Counter(tokenize(document.title) + tokenize(document.body))
+        return [
+            SearchTerm(
+                document=document,
+                term=term[:100],
+                frequency=frequency,
+                in_title=term in title_terms,
+            )
+            for term, frequency in counts.items()
+        ]
+
+    def search(self, query, kinds, limit, offset, snippets=True):
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        postings = (
+            SearchTerm.objects
+            .filter(term__in=terms, document__kind__in=kinds)
+            .values_list("document_id", "term", "frequency", "in_title")
+        )
+        by_document = defaultdict(dict)
+        document_frequency = Counter()
+        for document_id, term, frequency, in_title in postings:
+            by_document[document_id][term] = (frequency, in_title)
+            document_frequency[term] += 1
+
+        total = SearchDocument.objects.filter(kind__in=kinds).count()
+        scores = {}
+        for document_id, matched in by_document.items():
+            # AND semantics, like websearch_to_tsquery and FTS5 MATCH.
+            if len(matched) < len(terms):
+                continue
+            score = 0.0
+            for term, (frequency, in_title) in matched.items():
+                idf = math.log(1 + total / document_frequency[term])
+                score += idf * frequency / (frequency + 1.2) * (2.0 if in_title else 1.0)
+            scores[document_id] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        ranked = ranked[offset:offset + limit]
+        columns = ["id", "kind", "object_id", "parent_id", "title"] + (["body"] if snippets else [])
+        documents = {
+            row["id"]: row
+            for row in SearchDocument.objects.filter(id__in=[pk for pk, _ in ranked]).values(*columns)
+        }
+
+        results = []
+        for document_id, score in ranked:
+            row = documents[document_id]
+            snippet = make_snippet(row["body"], terms) if snippets else None
+            results.append(result(row["kind"], row["object_id"], row["parent_id"], row["title"], score, snippet))
+        return results
+
+    def rank(self, queryset, query, kind):
+        # search()'s tf-idf, summed in SQL. Only the idf of each term is worked out first.
+        terms = list(dict.fromkeys(tokenize(query)))
+        postings = SearchTerm.objects.filter(term__in=terms, document__kind=kind)
+        document_frequency = dict(postings.values_list("term").annotate(n=Count("pk")).order_by())
+        if not terms or len(document_frequency) < len(terms):
+            return queryset.none()
+
+        total = SearchDocument.objects.filter(kind=kind).count()
+        idf = Case(
+            *[When(term=term, then=Value(math.log(1 + total / n))) for term, n in document_frequency.items()],
+            output_field=FloatField(),
+        )
+        frequency = Cast("frequency", FloatField())
+        title_weight = Case(When(in_title=True, then=Value(2.0)), default=Value(1.0), output_field=FloatField())
+        score = Subquery(
+            postings.filter(document__object_id=OuterRef("pk"))
+            .values("document_id")
+            .annotate(score=Sum(idf * frequency / (frequency + 1.2) * title_weight))
+            .values("score")
+        )
+        # AND semantics, like websearch_to_tsquery and FTS5 MATCH.
+        matches = (
+            postings.values("document_id")
+            .annotate(n=Count("pk"))
+            .filter(n=len(terms))
+            .values("document__object_id")
+        )
+        return queryset.filter(pk__in=matches).order_by(OrderBy(score, descending=True), "-pk")
+
+
+class SQLiteSearchBackend:
+    name = "sqlite"
+
+    def index(self, document):
+        # The FTS5 table is maintained by triggers on core_searchdocument.
+        pass
+
+    def index_many(self, documents):
+        pass
+
+    def search(self, query, kinds, limit, offset, snippets=True):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quote every token so user input is never parsed as FTS5 syntax.
+        match = " ".join(f'"{term}"' for term in terms)
+        kind_placeholders = ", ".join(["%s"] * len(kinds))
+        snippet_sql = f"snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS})" if snippets else "NULL"
+        sql = f"""
+            SELECT d.kind, d.object_id, d.parent_id, d.title,
+                   -bm25({FTS_TABLE}, 10.0, 1.0) AS score, {snippet_sql}
+            FROM {FTS_TABLE}
+            JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND d.kind IN ({kind_placeholders})
+            ORDER BY score DESC, d.id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = ([MARK_START, MARK_END] if snippets else []) + [match, *kinds, limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [result(*row[:5], highlight(row[5])) for row in cursor.fetchall()]
+
+    def rank(self, queryset, query, kind):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        match = " ".join(f'"{term}"' for term in terms)
+        matches = RawSQL(
+            f"""
+            SELECT d.object_id FROM {FTS_TABLE}
+            JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND d.kind = %s
+            """,
+            [match, kind],
+        )
+        # Only run for rows that matched; the rowid lookup keeps it to one document.
+        score = RawSQL(
+            f"""
+            SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = (
+                SELECT id FROM core_searchdocument WHERE kind = %s AND object_id = {outer_pk(queryset)}
+            )
+            """,
+            [match, kind],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).order_by(OrderBy(score, descending=True), "-pk")
+
+
+class PostgresSearchBackend:
+    name = "postgresql"
+
+    def index(self, document):
+        # The GIN expression index is maintained by PostgreSQL.
+        pass
+
+    def index_many(self, documents):
+        pass
+
+    def search(self, query, kinds, limit, offset, snippets=True):
+        # Rank and limit in the inner query so ts_headline only runs on the page.
+        snippet_sql = "ts_headline('english', d.body, ranked.q, %s)" if snippets else "NULL"
+        sql = f"""
+            SELECT d.kind, d.object_id, d.parent_id, d.title, ranked.score, {snippet_sql}
+            FROM (
+                SELECT id, q, ts_rank_cd({PG_VECTOR}, q) AS score
+                FROM core_searchdocument, websearch_to_tsquery('english', %s) q
+                WHERE {PG_VECTOR} @@ q AND kind = ANY(%s)
+                ORDER BY score DESC, id DESC
+                LIMIT %s OFFSET %s
+            ) ranked
+            JOIN core_searchdocument d ON d.id = ranked.id
+            ORDER BY ranked.score DESC, ranked.id DESC
+        """
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=8"
+        params = ([options] if snippets else []) + [query, list(kinds), limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [result(*row[:5], highlight(row[5])) for row in cursor.fetchall()]
+
+    def rank(self, queryset, query, kind):
+        matches = RawSQL(
+            f"""
+            SELECT object_id FROM core_searchdocument
+            WHERE kind = %s AND {PG_VECTOR} @@ websearch_to_tsquery('english', %s)
+            """,
+            [kind, query],
+        )
+        score = RawSQL(
+            f"""
+            SELECT ts_rank_cd({PG_VECTOR}, websearch_to_tsquery('english', %s)) FROM core_searchdocument
+            WHERE kind = %s AND object_id = {outer_pk(queryset)}
+            """,
+            [query, kind],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).order_by(OrderBy(score, descending=True), "-pk")
+
+
+def outer_pk(queryset):
+    # The ranked model's id column, for the score subqueries to refer back to.
+    opts = queryset.model._meta
+    return f"{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(opts.pk.column)}"
+
+
+def result(kind, object_id, parent_id, title, score, snippet):
+    return {
+        "kind": kind,
+        "object_id": object_id,
+        "parent_id": parent_id,
+        "title": title,
+        "snippet": snippet,
+        "score": round(score, 4),
+    }
+
+
+def highlight(snippet):
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PythonSearchBackend, SQLiteSearchBackend, PostgresSearchBackend)
+}
+
+_fts_available = None
+
+
+def sqlite_fts_available():
+    global _fts_available
+    if _fts_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def get_backend():
+    name = getattr(settings, "SEARCH_BACKEND", "auto")
+    if name == "auto":
+        if connection.vendor == "postgresql":
+            name = "postgresql"
+        elif connection.vendor == "sqlite" and sqlite_fts_available():
+            name = "sqlite"
+        else:
+            name = "python"
+    return BACKENDS[name]()
+
+
+def index_instance(instance):
+    kind = kind_of(instance)
+    if kind is None:
+        return
+
+    document = document_for(instance)
+    if document is None:
+        remove_instance(instance)
+        return
+
+    _, parent_id, title, body = document
+    search_document, _ = SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=instance.pk,
+        defaults={"parent_id": parent_id, "title": title, "body": body},
+    )
+    get_backend().index(search_document)
+
+
+def index_new(instances):
+    """index_instance() for a batch of objects created with bulk_create(), which sends no signals."""
+    documents = []
+    for instance in instances:
+        document = document_for(instance)
+        if document is not None:
+            kind, parent_id, title, body = document
+            documents.append(SearchDocument(kind=kind, object_id=instance.pk, parent_id=parent_id, title=title, body=body))
+    if documents:
+        SearchDocument.objects.bulk_create(documents)
+        get_backend().index_many(documents)
+
+
+def remove_instance(instance):
+    kind = kind_of(instance)
+    if kind is not None:
+        SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def remove_chapters(fanfic):
+    SearchDocument.objects.filter(
+        kind="chapter", object_id__in=Chapter.objects.filter(fanfiction=fanfic.pk).values("pk")
+    ).delete()
+
+
+def rebuild_index():
+    SearchDocument.objects.all().delete()
+    count = 0
+    querysets = (
+        FanFiction.objects.prefetch_related("tags"),
+        Chapter.objects.all(),
+        BlogPost.objects.filter(is_public=True),
+    )
+    for queryset in querysets:
+        for instance in queryset.iterator(chunk_size=500):
+            index_instance(instance)
+            count += 1
+    return count
+
+
+def search(query, kinds=None, limit=20, offset=0, snippets=True):
+    kinds = [kind for kind in (kinds or KINDS) if kind in KINDS]
+    if not query.strip() or not kinds:
+        return []
+    return get_backend().search(query, kinds, limit, offset, snippets=snippets)
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter backed by the search index. The view
+    sets search_kind; matches come back in relevance order, ranked by the
+    backend inside the query, so the paginator's LIMIT/OFFSET and COUNT only
+    ever touch the database.
+    """
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        return get_backend().rank(queryset, query, view.search_kind)
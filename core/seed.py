@@ -0,0 +1,204 @@
+"""
+Bulk-inserts large, realistic-looking datasets for benchmarking (see the
+seed_data and run_benchmarks management commands).
+
+Rows go in with bulk_create, which skips save() and signals, so everything
+those normally maintain is filled in here instead: comment paths, chapter
+word counts, the counters in core/counters.py, the search index and the
+response cache versions.
+"""
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import cache, counters, search
+from .models import BlogPost, Chapter, Comment, FanFiction, Tag
+from .signals import VERSIONED_MODELS
+
+WORDS = (
+    "the a and of to in was her his she he it that with as for had on at by not but from they "
+    "sword moon night storm castle dragon quiet letter window blade river rain summer winter "
+    "festival school rooftop train station promise secret memory shadow light heart spirit "
+    "village forest mountain sea sky star fire ice voice hand eyes smile tears laughter "
+    "walked whispered ran looked remembered waited fought smiled turned fell held watched "
+    "slowly suddenly again never always almost finally softly"
+).split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+
+def max_pk(model):
+    return model.objects.aggregate(highest=Max("pk"))["highest"] or 0
+
+
+def inserted_pks(model, before):
+    return list(model.objects.filter(pk__gt=before).order_by("pk").values_list("pk", flat=True))
+
+
+def insert(model, rows, batch_size):
+    """bulk_create a generator of rows, batch_size at a time; returns the new pks."""
+    before = max_pk(model)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+    return inserted_pks(model, before)
+
+
+class Seeder:
+    def __init__(self, batch_size=2000, random_seed=None, log=None):
+        self.batch_size = batch_size
+        self.rng = random.Random(random_seed)
+        self.log = log or (lambda message: None)
+        # Keeps usernames, tag names and slugs unique across runs.
+        self.prefix = f"seed-{uuid.uuid4().hex[:6]}"
+
+    def run(self, users, tags, stories, chapters_per_story, chapter_words, comments, blog_posts, index=True):
+        with transaction.atomic():
+            user_ids = self.users(users)
+            tag_ids = self.tags(tags)
+            story_ids = self.stories(stories, user_ids, tag_ids)
+            chapter_ids = self.chapters(story_ids, chapters_per_story, chapter_words)
+            post_ids = self.blog_posts(blog_posts, user_ids)
+            self.comments(comments, user_ids, story_ids, chapter_ids, post_ids)
+
+            self.log("Recomputing counters")
+            counters.recompute()
+
+        if index:
+            self.log("Rebuilding the search index")
+            search.rebuild_index()
+        for model in VERSIONED_MODELS:
+            cache.bump_version(model)
+
+    def users(self, count):
+        self.log(f"Users: {count}")
+        password = make_password(None)
+        return insert(User, (
+            User(username=f"{self.prefix}-user-{i}", email=f"{self.prefix}-{i}@example.com", password=password)
+            for i in range(count)
+        ), self.batch_size)
+
+    def tags(self, count):
+        self.log(f"Tags: {count}")
+        return insert(Tag, (
+            Tag(name=f"{self.prefix} tag {i}", slug=f"{self.prefix}-tag-{i}")
+            for i in range(count)
+        ), self.batch_size)
+
+    def stories(self, count, user_ids, tag_ids):
+        self.log(f"Stories: {count}")
+        rng = self.rng
+        story_ids = insert(FanFiction, (
+            FanFiction(
+                author_id=rng.choice(user_ids),
+                title=sentence(rng, rng.randint(2, 6))[:-1],
+                summary=" ".join(sentence(rng, 12) for _ in range(rng.randint(1, 4))),
+                status=rng.choice(("ongoing", "completed")),
+            )
+            for _ in range(count)
+        ), self.batch_size)
+
+        if tag_ids:
+            Through = FanFiction.tags.through
+            insert(Through, (
+                Through(fanfiction_id=story_id, tag_id=tag_id)
+                for story_id in story_ids
+                for tag_id in rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, 4)))
+            ), self.batch_size)
+        return story_ids
+
+    def chapters(self, story_ids, per_story, words):
+        rng = self.rng
+
+        def rows():
+            for story_id in story_ids:
+                chapter_count = rng.randint(1, 2 * per_story - 1) if per_story else 0
+                for number in range(1, chapter_count + 1):
+                    content = "\n\n".join(sentence(rng, 15) for _ in range(max(words // 15, 1)))
+                    yield Chapter(
+                        fanfiction_id=story_id,
+                        chapter_number=number,
+                        title=sentence(rng, 3)[:-1],
+                        content=content,
+                        word_count=len(content.split()),
+                    )
+
+        self.log(f"Chapters: about {len(story_ids) * per_story}")
+        # Chapters are large, keep their batches smaller.
+        return insert(Chapter, rows(), max(self.batch_size // 10, 1))
+
+    def blog_posts(self, count, user_ids):
+        self.log(f"Blog posts: {count}")
+        rng = self.rng
+        return insert(BlogPost, (
+            BlogPost(
+                author_id=rng.choice(user_ids),
+                title=sentence(rng, 5)[:-1],
+                content=" ".join(sentence(rng, 15) for _ in range(10)),
+                is_public=rng.random() < 0.9,
+            )
+            for _ in range(count)
+        ), self.batch_size)
+
+    def comments(self, count, user_ids, story_ids, chapter_ids, post_ids):
+        """
+        About a third of the comments reply to a recent comment on the same
+        parent. Ids are assigned here so paths can be written in the insert.
+        """
+        self.log(f"Comments: {count}")
+        rng = self.rng
+        parents = (
+            [("chapter", "chapter_id", pk) for pk in chapter_ids]
+            + [("fanfiction", "fanfiction_id", pk) for pk in story_ids]
+            + [("blog", "blog_post_id", pk) for pk in post_ids]
+        )
+        if not parents or not count:
+            return []
+
+        next_pk = max_pk(Comment) + 1
+        recent = {}  # parent -> last few (pk, path, depth) posted on it
+
+        def rows():
+            nonlocal next_pk
+            for _ in range(count):
+                parent = rng.choice(parents)
+                parent_type, field, parent_pk = parent
+                pk, next_pk = next_pk, next_pk + 1
+
+                thread = recent.setdefault(parent, [])
+                reply_to = rng.choice(thread) if thread and rng.random() < 0.35 else None
+                if reply_to is not None and reply_to[2] >= Comment.MAX_DEPTH:
+                    reply_to = None
+                path = (reply_to[1] if reply_to else "") + Comment.path_segment(pk)
+                depth = reply_to[2] + 1 if reply_to else 0
+
+                thread.append((pk, path, depth))
+                del thread[:-5]
+                yield Comment(
+                    pk=pk,
+                    author_id=rng.choice(user_ids),
+                    content=sentence(rng, rng.randint(3, 40)),
+                    parent_type=parent_type,
+                    reply_to_id=reply_to[0] if reply_to else None,
+                    path=path,
+                    depth=depth,
+                    **{field: parent_pk},
+                )
+
+        pks = insert(Comment, rows(), self.batch_size)
+        # Explicit ids leave PostgreSQL's sequence behind.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Comment]):
+                cursor.execute(sql)
+        return pks
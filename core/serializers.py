@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.utils.text import slugify
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import set_user_claims
+from .instrumentation import timed_serialization
 from .models import (
     TeamMember,
     Announcement,
@@ -44,29 +48,151 @@ class UserSerializer(serializers.ModelSerializer):
         return user
     
 class CookieTokenObtainPairSerializer(TokenObtainPairSerializer):
-    pass
+    @classmethod
+    def get_token(cls, user):
+        # Read by CookieJWTAuthentication when JWT_STATELESS_READS is on.
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
 
 #----------------------------------------------------------------------------------------------------------------------
 
 
-
-
-class TeamMemberSerializer(serializers.ModelSerializer):
+class BaseModelSerializer(serializers.ModelSerializer):
+    """
+    Base serializer for the content models. Each serializer declares the
+    relations it reads so views can load them up front instead of once per row.
+
+    On reads, ?fields= and ?exclude= (comma separated) pick the fields the
+    top-level serializer returns, and setup_eager_loading() then loads only
+    the columns and relations those fields need. field_dependencies maps
+    serialized fields that are not model fields to the model fields they
+    read; if any selected field cannot be traced to columns, every column
+    is loaded as usual. required_fields are always loaded.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    deferred_fields = ()
+    field_dependencies = {}
+    required_fields = ()
+
+    @classmethod
+    def readable_fields(cls):
+        """{field name: source} of everything the serializer outputs."""
+        if "_field_sources" not in cls.__dict__:
+            cls._field_sources = {name: field.source for name, field in cls().fields.items() if not field.write_only}
+        return cls._field_sources
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Names picked by ?fields= / ?exclude=, in output order, or None if neither is given."""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, "query_params", request.GET)
+        only = split_names(params.get("fields"))
+        exclude = split_names(params.get("exclude"))
+        if not only and not exclude:
+            return None
+
+        readable = cls.readable_fields()
+        unknown = [name for name in only + exclude if name not in readable]
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}."})
+        return [name for name in readable if (not only or name in only) and name not in exclude]
+
+    @classmethod
+    def loading_plan(cls, fields=None, extra=()):
+        """
+        (select_related, prefetch_related, only) for serializing fields, where
+        only is None to load every column. extra are more model fields the
+        caller reads, e.g. the ordering; names that are not fields are ignored.
+        """
+        if fields is None:
+            return cls.select_related_fields, cls.prefetch_related_fields, None
+
+        readable = cls.readable_fields()
+        sources = set()
+        for name in fields:
+            sources.update(cls.field_dependencies.get(name, (readable[name],)))
+
+        def used(relation):
+            return any(source == relation or source.startswith(f"{relation}.") for source in sources)
+
+        select_related = tuple(relation for relation in cls.select_related_fields if used(relation))
+        prefetch_related = tuple(relation for relation in cls.prefetch_related_fields if used(relation))
+
+        model = cls.Meta.model
+        columns = {field.name for field in model._meta.concrete_fields}
+        only = {model._meta.pk.name, *cls.required_fields}
+        only.update(name for name in extra if name in columns)
+        for source in sources:
+            name = source.split(".")[0]
+            if name in prefetch_related:
+                continue
+            if name not in columns:
+                # A property, method or "*": cannot tell which columns it reads.
+                return select_related, prefetch_related, None
+            only.add(name)
+        return select_related, prefetch_related, tuple(sorted(only))
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, extra=()):
+        select_related, prefetch_related, only = cls.loading_plan(fields, extra)
+        if only is not None:
+            queryset = queryset.only(*only)
+        elif cls.deferred_fields:
+            queryset = queryset.defer(*cls.deferred_fields)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = getattr(self, "parent", None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        # Nested serializers always return all their fields.
+        if parent is None:
+            selected = self.selected_fields(self.context.get("request"))
+            if selected is not None:
+                fields = {name: field for name, field in fields.items() if name in selected or field.write_only}
+        return fields
+
+    @timed_serialization
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+def split_names(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+class TeamMemberSerializer(BaseModelSerializer):
     class Meta:
         model = TeamMember
         fields = "__all__"
 
-class AnnouncementSerializer(serializers.ModelSerializer):
+class AnnouncementSerializer(BaseModelSerializer):
     class Meta:
         model = Announcement
         fields = "__all__"
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(BaseModelSerializer):
     class Meta:
         model = Tag
         fields = "__all__"
 
-class EventSerializer(serializers.ModelSerializer):
+    def validate(self, data):
+        # As Tag.save() would, but early enough for bulk creation to check it is free.
+        if self.instance is None and not data.get("slug"):
+            data["slug"] = slugify(data["name"])
+        return data
+
+class EventSerializer(BaseModelSerializer):
+    prefetch_related_fields = ("tags",)
+
     tags = TagSerializer(many=True, read_only=True)
     tag_ids = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
@@ -85,7 +211,9 @@ class EventSerializer(serializers.ModelSerializer):
         event.tags.set(tag_ids)
         return event
 
-class FanArtSerializer(serializers.ModelSerializer):
+class FanArtSerializer(BaseModelSerializer):
+    select_related_fields = ("artist",)
+
     artist_username = serializers.CharField(
         source="artist.username",
         read_only=True
@@ -107,12 +235,14 @@ class FanArtSerializer(serializers.ModelSerializer):
         return data
 
 
-class SeasonalReportSerializer(serializers.ModelSerializer):
+class SeasonalReportSerializer(BaseModelSerializer):
     class Meta:
         model = SeasonalReport
         fields = "__all__"
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class BlogPostSerializer(BaseModelSerializer):
+    select_related_fields = ("author",)
+
     author_username = serializers.CharField(
         source="author.username",
         read_only=True
@@ -123,7 +253,10 @@ class BlogPostSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["author"]
 
-class FanFictionSerializer(serializers.ModelSerializer):
+class FanFictionSerializer(BaseModelSerializer):
+    select_related_fields = ("author",)
+    prefetch_related_fields = ("tags",)
+
     author_username = serializers.CharField(
         source="author.username",
         read_only=True
@@ -164,19 +297,127 @@ class FanFictionSerializer(serializers.ModelSerializer):
 
 
 
-class ChapterSerializer(serializers.ModelSerializer):
+class ChapterSerializer(BaseModelSerializer):
     class Meta:
         model = Chapter
         fields = "__all__"
         read_only_fields = ["fanfiction", "published_at", "chapter_number"]
 
-class CommentSerializer(serializers.ModelSerializer):
+class ChapterSummarySerializer(BaseModelSerializer):
+    # Table of contents entry; the text itself comes from ChapterDetail.
+    deferred_fields = ("content",)
+
+    class Meta:
+        model = Chapter
+        exclude = ["content"]
+
+class CommentSerializer(BaseModelSerializer):
+    select_related_fields = ("author",)
+
+    PARENT_MODELS = {
+        "blog": BlogPost,
+        "fanfiction": FanFiction,
+        "chapter": Chapter,
+    }
+
     author_username = serializers.CharField(
         source="author.username",
         read_only=True
     )
+    # Both can be left out of a reply, which is always on its comment's parent.
+    parent_id = serializers.IntegerField(min_value=1, required=False)
+    field_dependencies = {"parent_id": ("parent_type", "blog_post", "fanfiction", "chapter")}
 
     class Meta:
         model = Comment
-        fields = "__all__"
-        read_only_fields = ["author"]
+        fields = [
+            "id",
+            "author",
+            "author_username",
+            "content",
+            "parent_type",
+            "parent_id",
+            "reply_to",
+            "depth",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["author", "depth"]
+        extra_kwargs = {"parent_type": {"required": False}}
+
+    def validate(self, data):
+        # A comment stays on the parent and in the thread it was posted to.
+        if self.instance is not None:
+            for field in ("parent_type", "parent_id", "reply_to"):
+                data.pop(field, None)
+            return data
+
+        reply_to = data.get("reply_to")
+        if reply_to is not None:
+            return self.validate_reply(data, reply_to)
+
+        if "parent_type" not in data or "parent_id" not in data:
+            raise serializers.ValidationError("parent_type and parent_id are required unless replying.")
+
+        parent_type = data["parent_type"]
+        parent = self.get_visible_parent(parent_type, data.pop("parent_id"))
+        if parent is None:
+            raise serializers.ValidationError({"parent_id": f"No {parent_type} with this id."})
+
+        data[Comment.PARENT_FIELDS[parent_type]] = parent
+        return data
+
+    def get_visible_parent(self, parent_type, parent_id):
+        """The object to comment on, or None if there is none the user may see (another author's draft)."""
+        parent = self.PARENT_MODELS[parent_type].objects.filter(pk=parent_id).first()
+        request = self.context.get("request")
+        hidden_draft = (
+            parent_type == "blog"
+            and parent is not None
+            and not parent.is_public
+            and (request is None or parent.author_id != request.user.id)
+        )
+        return None if hidden_draft else parent
+
+    def validate_reply(self, data, reply_to):
+        given = (data.pop("parent_type", reply_to.parent_type), data.pop("parent_id", reply_to.parent_id))
+        if given != (reply_to.parent_type, reply_to.parent_id):
+            raise serializers.ValidationError({"reply_to": "Replies must be on the same parent as their comment."})
+        if self.get_visible_parent(reply_to.parent_type, reply_to.parent_id) is None:
+            # As if the comment did not exist, like its hidden parent.
+            raise serializers.ValidationError({"reply_to": "No comment with this id."})
+        if reply_to.depth >= Comment.MAX_DEPTH:
+            raise serializers.ValidationError({"reply_to": "This thread is too deep to reply to."})
+
+        data["parent_type"] = reply_to.parent_type
+        field = Comment.PARENT_FIELDS[reply_to.parent_type]
+        data[f"{field}_id"] = reply_to.parent_id
+        return data
+
+
+class CommentTreeListSerializer(serializers.ListSerializer):
+    """
+    Nests a path-ordered list of comments (roots first, then their replies)
+    under "replies". Replies whose comment is not in the list are left out.
+    """
+
+    def to_representation(self, data):
+        nodes = {}
+        roots = []
+        for comment in data:
+            node = self.child.to_representation(comment)
+            node["replies"] = []
+            nodes[comment.pk] = node
+            if comment.reply_to_id is None:
+                roots.append(node)
+            elif comment.reply_to_id in nodes:
+                nodes[comment.reply_to_id]["replies"].append(node)
+        return roots
+
+
+class CommentTreeSerializer(CommentSerializer):
+    # Read by CommentTreeListSerializer and CommentThreadList to assemble the tree.
+    required_fields = ("reply_to", "path")
+
+    class Meta(CommentSerializer.Meta):
+        list_serializer_class = CommentTreeListSerializer
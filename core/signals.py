@@ -0,0 +1,218 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import cache, counters, search
+from .authentication import invalidate_cached_user
+from .tokens import blacklist_filter
+from .models import (
+    TeamMember,
+    Announcement,
+    Tag,
+    Event,
+    FanArt,
+    SeasonalReport,
+    BlogPost,
+    FanFiction,
+    Chapter,
+    Comment,
+)
+
+
+def deleted_model(origin):
+    # origin is what delete() was called on, an instance or a queryset.
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+# ------------------------------------------ Cache versions -----------------------------------------------------------
+VERSIONED_MODELS = (
+    TeamMember,
+    Announcement,
+    Tag,
+    Event,
+    FanArt,
+    SeasonalReport,
+    BlogPost,
+    FanFiction,
+    Chapter,
+    Comment,
+    User,
+)
+
+
+def bump_model_version(sender, instance=None, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no cached response shows.
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    cache.bump_version(sender)
+
+
+def bump_tagged_model_version(sender, instance, action, reverse, model, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        cache.bump_version(model if reverse else type(instance))
+
+
+for versioned_model in VERSIONED_MODELS:
+    post_save.connect(bump_model_version, sender=versioned_model, dispatch_uid=f"version-save-{versioned_model.__name__}")
+    post_delete.connect(bump_model_version, sender=versioned_model, dispatch_uid=f"version-delete-{versioned_model.__name__}")
+
+for tagged_model in (Event, FanFiction):
+    m2m_changed.connect(
+        bump_tagged_model_version,
+        sender=tagged_model.tags.through,
+        dispatch_uid=f"version-tags-{tagged_model.__name__}",
+    )
+
+
+# ------------------------------------------ Authentication -----------------------------------------------------------
+@receiver(post_save, sender=User)
+def forget_saved_user(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which does not change who the user is.
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def remember_blacklisted_token(sender, instance, created, **kwargs):
+    if created:
+        blacklist_filter.added(instance)
+
+
+# ------------------------------------------ Search index -------------------------------------------------------------
+@receiver(post_save, sender=FanFiction)
+@receiver(post_save, sender=Chapter)
+@receiver(post_save, sender=BlogPost)
+def index_searchable(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance)
+
+
+@receiver(post_delete, sender=FanFiction)
+@receiver(post_delete, sender=Chapter)
+@receiver(post_delete, sender=BlogPost)
+def unindex_searchable(sender, instance, origin=None, **kwargs):
+    # Chapters deleted with their story are unindexed by unindex_story_chapters().
+    if sender is not Chapter or deleted_model(origin) is Chapter:
+        search.remove_instance(instance)
+
+
+@receiver(pre_delete, sender=FanFiction)
+def unindex_story_chapters(sender, instance, **kwargs):
+    search.remove_chapters(instance)
+
+
+@receiver(m2m_changed, sender=FanFiction.tags.through)
+def reindex_fanfiction_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # Tag names are part of the story's searchable text.
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        search.index_instance(instance)
+    elif pk_set:
+        for fanfic in FanFiction.objects.filter(pk__in=pk_set).prefetch_related("tags"):
+            search.index_instance(fanfic)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    for fanfic in FanFiction.objects.filter(tags=instance).prefetch_related("tags"):
+        search.index_instance(fanfic)
+
+
+# ------------------------------------------ Counters -----------------------------------------------------------------
+@receiver(post_save, sender=Chapter)
+def count_added_chapter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.chapter_added(instance)
+
+
+@receiver(pre_delete, sender=Chapter)
+def count_removed_chapter_comments(sender, instance, origin=None, **kwargs):
+    # The chapter's comments are deleted with it and skip count_removed_comment().
+    if deleted_model(origin) is Chapter:
+        counters.chapter_comments_removed(instance)
+
+
+@receiver(post_delete, sender=Chapter)
+def count_removed_chapter(sender, instance, origin=None, **kwargs):
+    # A chapter deleted any other way goes with its story, counters and all.
+    if deleted_model(origin) is Chapter:
+        counters.chapter_removed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_added_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance)
+
+
+@receiver(pre_delete, sender=Comment)
+def count_removed_comment(sender, instance, origin=None, **kwargs):
+    # pre_delete: when a chapter is deleted its row may be gone before its
+    # comments' post_delete, and the story is found through it. Cascades are
+    # counted once, by whatever delete() was called on, not per comment.
+    origin_model = deleted_model(origin)
+    if origin_model in (FanFiction, Chapter):
+        return
+    if origin_model is Comment and not isinstance(origin, QuerySet):
+        if origin.pk == instance.pk:
+            counters.thread_removed(instance)
+        return
+    counters.comment_removed(instance)
+
+
+@receiver(m2m_changed, sender=FanFiction.tags.through)
+@receiver(m2m_changed, sender=Event.tags.through)
+def count_tag_usage(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # Removals are counted in the pre_ step, while the through rows can still be
+    # looked up; Django runs both steps in the same transaction.
+    tagged_model = model if reverse else type(instance)
+    if action == "post_add":
+        if reverse:
+            counters.tags_used([instance.pk], by=len(pk_set))
+        else:
+            counters.tags_used(pk_set)
+        # pk_set only holds the links that were actually added.
+        counters.tag_links_counted(tagged_model, counters.tag_links(sender, instance, reverse, model, pk_set), by=1)
+    elif action in ("pre_remove", "pre_clear"):
+        links = counters.tag_links(sender, instance, reverse, model, pk_set)
+        tag_ids = list(links.values_list("tag_id", flat=True))
+        if reverse:
+            counters.tags_used([instance.pk], by=-len(tag_ids))
+        else:
+            counters.tags_used(tag_ids, by=-1)
+        counters.tag_links_counted(tagged_model, links, by=-1)
+
+
+@receiver(pre_delete, sender=FanFiction)
+@receiver(pre_delete, sender=Event)
+def count_deleted_tag_usage(sender, instance, **kwargs):
+    # Deleting the story or event drops its through rows without m2m_changed.
+    counters.tags_used(list(instance.tags.values_list("pk", flat=True)), by=-1)
+    links = sender.tags.through.objects.filter(**{sender._meta.model_name: instance})
+    counters.tag_links_counted(sender, links, by=-1)
+
+
+@receiver(pre_save, sender=FanFiction)
+def remember_story_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The tag facets count stories per status, see count_story_status().
+    if raw or instance.pk is None or (update_fields is not None and "status" not in update_fields):
+        return
+    instance._saved_status = sender.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+
+
+@receiver(post_save, sender=FanFiction)
+def count_story_status(sender, instance, created, raw=False, **kwargs):
+    old_status = instance.__dict__.pop("_saved_status", None)
+    if old_status is not None and old_status != instance.status:
+        counters.status_changed(instance, old_status)
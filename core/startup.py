@@ -0,0 +1,205 @@
+"""
+Cold start: what a worker spends before it can answer, and skipping the work
+a boot does not need.
+
+profile() boots Django in fresh interpreters, as a worker does, and times
+each phase (settings, apps, the ASGI handler and its middleware, the URLconf
+with every view) along with the import time of each module, from python
+-X importtime. See the profile_startup command.
+
+The fastboot command runs migrate and collectstatic only when
+unapplied_migrations() or static_fingerprint() say there is something to
+do. Both are cheap: a directory listing against the django_migrations
+table, and a stat() of every static source file.
+
+Nothing here imports Django at module level, so that `python -m core.startup`
+measures a boot from scratch.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+STATIC_FINGERPRINT_FILE = "staticfiles.fingerprint"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------------------------------ Profiling ----------------------------------------------------------------
+def boot():
+    """Boot Django one phase at a time, returning [(phase, ms)]. Meant for a fresh interpreter."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "anisoc_backend.settings")
+    phases = []
+
+    def timed(name, step):
+        start = time.perf_counter()
+        step()
+        phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def load_settings():
+        from django.conf import settings
+        settings.INSTALLED_APPS
+
+    def setup():
+        import django
+        django.setup(set_prefix=False)
+
+    def asgi():
+        from django.core.handlers.asgi import ASGIHandler
+        # What get_asgi_application() does after django.setup(): load the middleware.
+        ASGIHandler()
+
+    def urls():
+        from django.urls import get_resolver
+        # Normally done by the first request, which imports every view.
+        get_resolver().url_patterns
+
+    timed("settings", load_settings)
+    timed("apps", setup)
+    timed("asgi handler", asgi)
+    timed("urls", urls)
+    return phases
+
+
+def parse_importtime(output):
+    """{module: (self µs, cumulative µs)} from python -X importtime's stderr."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def profile_once():
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "core.startup"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=PROJECT_DIR,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    phases = dict(json.loads(result.stdout.strip().splitlines()[-1]))
+    # Whatever the phases do not cover: starting the interpreter and the process.
+    phases = {"interpreter": max(wall - sum(phases.values()), 0), **phases}
+    return phases, parse_importtime(result.stderr)
+
+
+def profile(runs=3, top=25):
+    """Median phase times and module import times over runs cold boots."""
+    phase_times = defaultdict(list)
+    module_times = defaultdict(list)
+    for _ in range(runs):
+        phases, modules = profile_once()
+        for name, ms in phases.items():
+            phase_times[name].append(ms)
+        for name, times in modules.items():
+            module_times[name].append(times)
+
+    phases = {name: round(statistics.median(times), 1) for name, times in phase_times.items()}
+    modules = {
+        name: (statistics.median(own for own, _ in times) / 1000, statistics.median(cum for _, cum in times) / 1000)
+        for name, times in module_times.items()
+    }
+    packages = defaultdict(float)
+    for name, (own, _) in modules.items():
+        packages[name.split(".")[0]] += own
+    return {
+        "runs": runs,
+        "phases": phases,
+        "total_ms": round(sum(phases.values()), 1),
+        # Self time summed per top-level package: what each dependency costs on its own.
+        "packages": [
+            {"package": name, "ms": round(ms, 1)}
+            for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        "modules": [
+            {"module": name, "self_ms": round(own, 1), "cumulative_ms": round(cum, 1)}
+            for name, (own, cum) in sorted(modules.items(), key=lambda item: -item[1][1])[:top]
+        ],
+    }
+
+
+# ------------------------------------------ Fast boot ----------------------------------------------------------------
+def migration_files():
+    """(app label, migration name) for every migration on disk, without importing any."""
+    from django.apps import apps
+    from django.db.migrations.loader import MigrationLoader
+
+    found = set()
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        if module_name is None:
+            continue
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except ModuleNotFoundError:
+            continue
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for location in spec.submodule_search_locations:
+            for entry in os.listdir(location):
+                name, extension = os.path.splitext(entry)
+                if extension in (".py", ".pyc") and not name.startswith(("_", "~")):
+                    found.add((app_config.label, name))
+    return found
+
+
+def unapplied_migrations(connection):
+    """Migrations on disk that the database has not recorded as applied."""
+    from django.db.migrations.recorder import MigrationRecorder
+
+    recorder = MigrationRecorder(connection)
+    on_disk = migration_files()
+    if not recorder.has_table():
+        return on_disk
+    return on_disk - set(recorder.applied_migrations())
+
+
+def static_fingerprint():
+    """Hash of the path, size and mtime of every file collectstatic would copy, and where to."""
+    from django.conf import settings
+    from django.contrib.staticfiles.finders import get_finders
+
+    digest = hashlib.sha1(repr((settings.STATIC_URL, settings.STORAGES["staticfiles"])).encode())
+    files = []
+    for finder in get_finders():
+        # collectstatic's default ignore patterns.
+        for path, storage in finder.list(["CVS", ".*", "*~"]):
+            stat = os.stat(storage.path(path))
+            files.append((getattr(storage, "prefix", None) or "", path, stat.st_size, stat.st_mtime_ns))
+    for entry in sorted(files):
+        digest.update(repr(entry).encode())
+    return digest.hexdigest()
+
+
+def fingerprint_path():
+    from django.conf import settings
+    return os.path.join(settings.STATIC_ROOT, STATIC_FINGERPRINT_FILE)
+
+
+def collected_fingerprint():
+    """The static_fingerprint() of the last collectstatic run through fastboot, or None."""
+    try:
+        with open(fingerprint_path()) as fingerprint_file:
+            return fingerprint_file.read().strip()
+    except OSError:
+        return None
+
+
+def save_fingerprint(fingerprint):
+    with open(fingerprint_path(), "w") as fingerprint_file:
+        fingerprint_file.write(fingerprint)
+
+
+if __name__ == "__main__":
+    # The child process of profile_once().
+    print(json.dumps(boot()))
@@ -0,0 +1,33 @@
+"""
+Static files: hashed names, and Brotli and gzip versions made by collectstatic.
+
+WhiteNoise's storage compresses every collected file on every collectstatic,
+and Brotli at its default quality is slow. Here a file is only compressed if
+its compressed versions are missing or out of date. A hashed name always has
+the same content, so once they exist they are current (Django rewrites hashed
+CSS on every run, but with the same bytes). Other files are compared by
+modification time, which WhiteNoise copies to the versions it makes. As
+collectstatic only copies files that changed, a run after a small edit
+compresses just the edited files.
+"""
+import os
+
+from whitenoise import compress
+from whitenoise.storage import CompressedManifestStaticFilesStorage as BaseCompressedManifestStaticFilesStorage
+
+
+class CompressedManifestStaticFilesStorage(BaseCompressedManifestStaticFilesStorage):
+    def compress_files(self, paths):
+        hashed = set(self.hashed_files.values())
+        stale = [path for path in paths if not self.is_compressed(path, hashed=path in hashed)]
+        yield from super().compress_files(stale)
+
+    def is_compressed(self, name, hashed=False):
+        suffixes = (".br", ".gz") if compress.brotli_installed else (".gz",)
+        path = self.path(name)
+        try:
+            modified = os.stat(path).st_mtime
+            versions = [os.stat(path + suffix).st_mtime for suffix in suffixes]
+        except FileNotFoundError:
+            return False
+        return hashed or all(version == modified for version in versions)
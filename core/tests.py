@@ -1,3 +1,1743 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from whitenoise import compress as whitenoise_compress
+
+from . import benchmark, home, instrumentation, loadtest, renderers, startup, throttling, tokens
+from .compiled import compile_serializer
+from .pagination import CommentPagination
+from .serializers import CommentTreeSerializer, CookieTokenObtainPairSerializer, FanFictionSerializer
+from .models import (
+    TeamMember,
+    Announcement,
+    Tag,
+    Event,
+    FanArt,
+    SeasonalReport,
+    BlogPost,
+    FanFiction,
+    Chapter,
+    Comment,
+    TagFacetCount,
+    ThrottleWindow,
+)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    PERFORMANCE_BUDGET_ACTION="raise",
+    THROTTLE_STORE="cache",
+)
+class APITestCase(TestCase):
+    def setUp(self):
+        # Throttle history lives in the cache, keep tests independent of each other.
+        cache.clear()
+
+
+# Each factory adds one row of the given kind, with the relations the serializer reads.
+def make_user(n):
+    return User.objects.create_user(username=f"user{n}", password="x")
+
+
+def make_tag(n):
+    return Tag.objects.create(name=f"tag {n}")
+
+
+def make_fanfiction(n):
+    fanfic = FanFiction.objects.create(
+        author=make_user(f"ff{n}"),
+        title=f"Story {n}",
+        summary="A summary",
+        status="ongoing",
+    )
+    fanfic.tags.set([make_tag(f"ff{n}a"), make_tag(f"ff{n}b")])
+    return fanfic
+
+
+def make_event(n):
+    event = Event.objects.create(title=f"Event {n}", description="d", date=date(2025, 1, 1))
+    event.tags.set([make_tag(f"ev{n}a"), make_tag(f"ev{n}b")])
+    return event
+
+
+def make_fanart(n):
+    return FanArt.objects.create(image_url="https://example.com/a.png", artist=make_user(f"fa{n}"), week="Week 1")
+
+
+def make_blog_post(n):
+    return BlogPost.objects.create(author=make_user(f"bp{n}"), title=f"Post {n}", content="c")
+
+
+def make_comment(n, blog_post=None):
+    blog_post = blog_post or BlogPost.objects.first() or make_blog_post("cm")
+    return Comment.objects.create(author=make_user(f"cm{n}"), content="c", parent_type="blog", blog_post=blog_post)
+
+
+class ListQueryCountTests(APITestCase):
+    """
+    Every list endpoint must run a fixed number of queries however many rows
+    it returns. Raising a budget here needs a reason in the commit.
+    """
+
+    def assertConstantQueries(self, url, factory, budget):
+        factory(0)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        for n in range(1, 8):
+            factory(n)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(small), len(large), f"{url} query count grows with rows")
+        self.assertLessEqual(len(large), budget, f"{url} exceeds its query budget")
+
+    def test_team_members(self):
+        self.assertConstantQueries(
+            reverse("core:team-member-list-create"),
+            lambda n: TeamMember.objects.create(name=f"m{n}", role="r", tenure="2024-25"),
+            budget=1,
+        )
+
+    def test_announcements(self):
+        self.assertConstantQueries(
+            reverse("core:announcement-list-create"),
+            lambda n: Announcement.objects.create(title=f"a{n}", message="m"),
+            budget=1,
+        )
+
+    def test_tags(self):
+        self.assertConstantQueries(reverse("core:tag-list-create"), make_tag, budget=1)
+
+    def test_events(self):
+        self.assertConstantQueries(reverse("core:event-list-create"), make_event, budget=2)
+
+    def test_fanart(self):
+        self.assertConstantQueries(reverse("core:fanart-list-create"), make_fanart, budget=1)
+
+    def test_seasonal_reports(self):
+        self.assertConstantQueries(
+            reverse("core:seasonal-report-list-create"),
+            lambda n: SeasonalReport.objects.create(
+                title=f"r{n}", season="Winter", description="d", published_at=timezone.now()
+            ),
+            budget=1,
+        )
+
+    def test_blog_posts(self):
+        self.assertConstantQueries(reverse("core:blogpost-list-create"), make_blog_post, budget=1)
+
+    def test_fanfiction(self):
+        # count + page + tags prefetch
+        self.assertConstantQueries(reverse("core:fanfiction-list-create"), make_fanfiction, budget=3)
+
+    def test_fanfiction_search(self):
+        self.assertConstantQueries(
+            reverse("core:fanfiction-list-create") + "?search=story",
+            make_fanfiction,
+            budget=4,
+        )
+
+    def test_chapters(self):
+        fanfic = make_fanfiction("ch")
+        self.assertConstantQueries(
+            reverse("core:chapter-list-create", args=[fanfic.pk]),
+            lambda n: Chapter.objects.create(fanfiction=fanfic, chapter_number=n + 1, title="t", content="c"),
+            budget=1,
+        )
+
+    def test_comments(self):
+        post = make_blog_post("commented")
+        self.assertConstantQueries(
+            reverse("core:comment-list-create") + f"?parent_type=blog&parent_id={post.pk}",
+            make_comment,
+            budget=1,
+        )
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("writer")
+        self.fanfic = FanFiction.objects.create(
+            author=self.author,
+            title="The Dragon Tamer",
+            summary="Knights and dragons in a mountain kingdom.",
+            status="ongoing",
+        )
+        self.fanfic.tags.set([Tag.objects.create(name="Isekai")])
+        self.chapter = Chapter.objects.create(
+            fanfiction=self.fanfic,
+            chapter_number=1,
+            title="Arrival",
+            content="The <b>knight</b> reached the castle at dawn.",
+        )
+        BlogPost.objects.create(author=self.author, title="Season recap", content="Dragon anime ranked.")
+        BlogPost.objects.create(author=self.author, title="Draft", content="Secret dragon notes.", is_public=False)
+
+    def get_results(self, query, **params):
+        response = self.client.get(reverse("core:search"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_results_are_ranked_and_highlighted(self):
+        results = self.get_results("dragon")
+        self.assertEqual([r["kind"] for r in results], ["fanfiction", "blog"])
+        self.assertEqual(results[0]["object_id"], self.fanfic.pk)
+        [result] = self.get_results("mountain")
+        self.assertIn("<mark>mountain</mark>", result["snippet"])
+
+    def test_snippets_are_escaped(self):
+        [result] = self.get_results("castle", type="chapter")
+        self.assertEqual(result["parent_id"], self.fanfic.pk)
+        self.assertIn("&lt;b&gt;", result["snippet"])
+        self.assertNotIn("<b>", result["snippet"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.chapter.content = "A wyvern circles overhead."
+        self.chapter.save()
+        self.assertEqual(self.get_results("castle"), [])
+        self.assertEqual(len(self.get_results("wyvern")), 1)
+
+        self.fanfic.delete()
+        self.assertEqual(self.get_results("wyvern"), [])
+        self.assertEqual([r["kind"] for r in self.get_results("dragon")], ["blog"])
+
+    def test_fanfiction_list_search_matches_tags(self):
+        response = self.client.get(reverse("core:fanfiction-list-create"), {"search": "isekai"})
+        self.assertEqual([f["id"] for f in response.json()["results"]], [self.fanfic.pk])
+
+    def test_limit_and_offset_are_validated(self):
+        for number in range(3):
+            BlogPost.objects.create(author=self.author, title=f"Dragon {number}", content="More dragons.")
+        self.assertEqual(len(self.get_results("dragon", limit=-1)), 1)
+        self.assertEqual(len(self.get_results("dragon", limit=0)), 1)
+        self.assertEqual(len(self.get_results("dragon", limit=1000)), 5)
+        for params in ({"limit": "x"}, {"offset": "1.5"}):
+            response = self.client.get(reverse("core:search"), {"q": "dragon", **params})
+            self.assertEqual(response.status_code, 400)
+
+    def test_fanfiction_search_pages_in_the_database(self):
+        from . import search
+        stories = FanFiction.objects.bulk_create([
+            FanFiction(author=self.author, title=f"Story {number}", summary="A dragon wakes.", status="ongoing")
+            for number in range(300)
+        ])
+        search.index_new(stories)
+        url = reverse("core:fanfiction-list-create")
+
+        def get(query, **params):
+            sizes = []
+
+            def record(execute, sql, sql_params, many, context):
+                sizes.append(len(sql_params or ()))
+                return execute(sql, sql_params, many, context)
+
+            with connection.execute_wrapper(record):
+                response = self.client.get(url, {"search": query, **params})
+            return response.json(), sizes
+
+        for backend in ("sqlite", "python"):
+            with self.subTest(backend=backend), override_settings(SEARCH_BACKEND=backend):
+                if backend == "python":
+                    search.rebuild_index()
+                page, sizes = get("dragon", limit=5)
+                self.assertEqual(page["count"], 301)
+                self.assertEqual(page["results"][0]["id"], self.fanfic.pk)
+                self.assertEqual(len(page["results"]), 5)
+                self.assertLess(max(sizes), 20)
+
+                deep_page, _ = get("dragon", limit=5, offset=300)
+                self.assertEqual(len(deep_page["results"]), 1)
+                _, few_matches = get("tamer", limit=5)
+                self.assertEqual(len(sizes), len(few_matches))
+
+    @override_settings(SEARCH_BACKEND="python")
+    def test_python_backend(self):
+        from . import search
+        search.rebuild_index()
+        results = self.get_results("dragon")
+        self.assertEqual([r["kind"] for r in results], ["fanfiction", "blog"])
+        self.assertIn("<mark>mountain</mark>", self.get_results("mountain")[0]["snippet"])
+        self.assertEqual(len(self.get_results("knight castle")), 1)
+
+
+class ResponseCacheTests(APITestCase):
+    def test_repeat_anonymous_get_is_served_from_cache(self):
+        Announcement.objects.create(title="Welcome", message="m")
+        url = reverse("core:announcement-list-create")
+
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()[0]["title"], "Welcome")
+
+    def test_query_params_are_part_of_the_key(self):
+        url = reverse("core:tag-list-create")
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, {"page": 2})["X-Cache"], "MISS")
+
+    def test_edits_invalidate_cached_lists(self):
+        announcement = Announcement.objects.create(title="Old", message="m")
+        url = reverse("core:announcement-list-create")
+        self.client.get(url)
+
+        announcement.title = "New"
+        announcement.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()[0]["title"], "New")
+
+        announcement.delete()
+        self.assertEqual(self.client.get(url).json(), [])
+
+    def test_tag_changes_invalidate_events(self):
+        event = make_event(1)
+        url = reverse("core:event-list-create")
+        self.client.get(url)
+
+        event.tags.clear()
+        self.assertEqual(self.client.get(url).json()["results"][0]["tags"], [])
+
+        Tag.objects.create(name="Unrelated")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+
+    def test_staff_bypass_the_cache(self):
+        Announcement.objects.create(title="Hidden", message="m", is_active=False)
+        url = reverse("core:announcement-list-create")
+        self.client.get(url)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="admin", password="x", is_staff=True))
+        response = client.get(url)
+        self.assertEqual([a["title"] for a in response.json()], ["Hidden"])
+        self.assertNotIn("X-Cache", response)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("writer")
+        self.fanfic = FanFiction.objects.create(author=self.author, title="T", summary="S", status="ongoing")
+        self.chapter = Chapter.objects.create(fanfiction=self.fanfic, chapter_number=1, title="One", content="c")
+        self.url = reverse("core:chapter-list-create", args=[self.fanfic.pk])
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response["ETag"].startswith('"'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_edit_changes_list_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        Chapter.objects.filter(pk=self.chapter.pk).update(title="Renamed", updated_at=timezone.now())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        url = reverse("core:chapter-detail", args=[self.chapter.pk])
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_lists_send_no_last_modified(self):
+        # Deleting a row leaves the newest updated_at on the page where it was.
+        Chapter.objects.create(fanfiction=self.fanfic, chapter_number=2, title="Two", content="c")
+        response = self.client.get(self.url)
+        self.assertNotIn("Last-Modified", response)
+
+        self.chapter.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_detail_etag_tracks_the_object_and_its_relations(self):
+        url = reverse("core:fanfiction-detail", args=[self.fanfic.pk])
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(2):  # story joined with author, tags prefetch
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.fanfic.tags.add(make_tag("new"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_differs_per_user(self):
+        url = reverse("core:blogpost-list-create")
+        anonymous = self.client.get(url)["ETag"]
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.assertNotEqual(client.get(url)["ETag"], anonymous)
+
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("writer")
+        self.stories = [
+            FanFiction.objects.create(author=self.author, title=f"Story {n}", summary="s", status="ongoing")
+            for n in range(5)
+        ]
+
+    def test_fanfiction_count_can_be_skipped(self):
+        url = reverse("core:fanfiction-list-create")
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get(url, {"limit": 2, "count": "false"}).json()
+        self.assertIsNone(page["count"])
+        self.assertIn("offset=2", page["next"])
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries))
+
+        last = self.client.get(url, {"limit": 2, "offset": 4, "count": "false"}).json()
+        self.assertEqual(len(last["results"]), 1)
+        self.assertIsNone(last["next"])
+
+    def test_fanfiction_cursor_pages_cover_every_story_once(self):
+        url = reverse("core:fanfiction-list-create") + "?pagination=cursor&limit=2"
+        seen = []
+        while url:
+            page = self.client.get(url).json()
+            self.assertNotIn("count", page)
+            seen += [story["id"] for story in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, [story.pk for story in reversed(self.stories)])
+
+    def test_chapters_are_paged_in_reading_order(self):
+        fanfic = self.stories[0]
+        for number in (3, 1, 2):
+            Chapter.objects.create(fanfiction=fanfic, chapter_number=number, title="t", content="c")
+        url = reverse("core:chapter-list-create", args=[fanfic.pk])
+
+        page = self.client.get(url, {"limit": 2}).json()
+        self.assertEqual([c["chapter_number"] for c in page["results"]], [1, 2])
+        self.assertEqual([c["chapter_number"] for c in self.client.get(page["next"]).json()["results"]], [3])
+
+    def test_page_size_is_capped(self):
+        for n in range(3):
+            make_comment(n)
+        post = BlogPost.objects.get()
+        page = self.client.get(
+            reverse("core:comment-list-create"), {"parent_type": "blog", "parent_id": post.pk, "limit": 10_000}
+        ).json()
+        self.assertEqual(len(page["results"]), 3)
+        self.assertEqual(CommentPagination.max_page_size, 50)
+
+
+class CommentTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.fanfic = FanFiction.objects.create(author=self.user, title="T", summary="S", status="ongoing")
+        self.chapter = Chapter.objects.create(fanfiction=self.fanfic, chapter_number=1, title="One", content="c")
+        self.url = reverse("core:comment-list-create")
+
+    def post_comment(self, parent_type, parent_id):
+        return self.client.post(self.url, {"content": "Nice", "parent_type": parent_type, "parent_id": parent_id})
+
+    def test_comment_is_attached_to_its_parent(self):
+        response = self.post_comment("chapter", self.chapter.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["parent_id"], self.chapter.pk)
+        self.assertEqual(Comment.objects.get().chapter, self.chapter)
+
+        listed = self.client.get(self.url, {"parent_type": "chapter", "parent_id": self.chapter.pk}).json()
+        self.assertEqual([c["content"] for c in listed["results"]], ["Nice"])
+        other = self.client.get(self.url, {"parent_type": "fanfiction", "parent_id": self.chapter.pk}).json()
+        self.assertEqual(other["results"], [])
+
+    def test_parent_must_exist(self):
+        self.assertEqual(self.post_comment("chapter", 999).status_code, 400)
+        self.assertEqual(self.post_comment("video", self.chapter.pk).status_code, 400)
+
+    def test_drafts_of_other_users_cannot_be_commented(self):
+        draft = BlogPost.objects.create(author=make_user("other"), title="d", content="c", is_public=False)
+        self.assertEqual(self.post_comment("blog", draft.pk).status_code, 400)
+
+        comment = Comment.objects.create(author=draft.author, content="Note", parent_type="blog", blog_post=draft)
+        response = self.client.post(self.url, {"content": "Reply", "reply_to": comment.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("reply_to", response.json())
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_listing_requires_a_parent(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_deleting_the_parent_removes_its_comments(self):
+        self.post_comment("chapter", self.chapter.pk)
+        self.post_comment("fanfiction", self.fanfic.pk)
+        self.chapter.delete()
+        self.assertEqual(list(Comment.objects.values_list("parent_type", flat=True)), ["fanfiction"])
+        self.fanfic.delete()
+        self.assertFalse(Comment.objects.exists())
+
+    def reply(self, comment, content="Reply"):
+        return Comment.objects.create(author=self.user, content=content, parent_type="chapter", chapter=self.chapter, reply_to=comment)
+
+    def test_reply_inherits_the_parent(self):
+        root = Comment.objects.create(author=self.user, content="Root", parent_type="chapter", chapter=self.chapter)
+        response = self.client.post(self.url, {"content": "Reply", "reply_to": root.pk})
+        self.assertEqual(response.status_code, 201)
+        reply = Comment.objects.get(pk=response.json()["id"])
+        self.assertEqual((reply.chapter, reply.depth), (self.chapter, 1))
+        self.assertEqual(reply.path, root.path + Comment.path_segment(reply.pk))
+
+        elsewhere = self.client.post(
+            self.url, {"content": "x", "reply_to": root.pk, "parent_type": "fanfiction", "parent_id": self.fanfic.pk}
+        )
+        self.assertEqual(elsewhere.status_code, 400)
+
+    def test_replies_stop_at_max_depth(self):
+        comment = Comment.objects.create(author=self.user, content="Root", parent_type="chapter", chapter=self.chapter)
+        for _ in range(Comment.MAX_DEPTH):
+            comment = self.reply(comment)
+        response = self.client.post(self.url, {"content": "Too deep", "reply_to": comment.pk})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tree_is_nested_and_loads_in_two_queries(self):
+        first = Comment.objects.create(author=self.user, content="First", parent_type="chapter", chapter=self.chapter)
+        second = Comment.objects.create(author=self.user, content="Second", parent_type="chapter", chapter=self.chapter)
+        first_reply = self.reply(first, "First reply")
+        self.reply(first_reply, "Nested reply")
+        self.reply(second, "Second reply")
+        # Same ids range, other parent: must not leak into the thread.
+        other = Comment.objects.create(author=self.user, content="Other", parent_type="fanfiction", fanfiction=self.fanfic)
+        Comment.objects.create(author=self.user, content="Other reply", parent_type="fanfiction", fanfiction=self.fanfic, reply_to=other)
+
+        url = reverse("core:comment-tree")
+        params = {"parent_type": "chapter", "parent_id": self.chapter.pk}
+        self.client.logout()
+        with CaptureQueriesContext(connection) as queries:
+            tree = self.client.get(url, params).json()["results"]
+        self.assertEqual(len(queries), 2)
+
+        def shape(nodes):
+            return [(node["content"], shape(node["replies"])) for node in nodes]
+
+        self.assertEqual(shape(tree), [
+            ("First", [("First reply", [("Nested reply", [])])]),
+            ("Second", [("Second reply", [])]),
+        ])
+
+        shallow = self.client.get(url, {**params, "depth": 1}).json()["results"]
+        self.assertEqual(shape(shallow), [("First", [("First reply", [])]), ("Second", [("Second reply", [])])])
+
+        first_page = self.client.get(url, {**params, "limit": 1}).json()
+        self.assertEqual(shape(first_page["results"]), [("First", [("First reply", [("Nested reply", [])])])])
+        self.assertIsNotNone(first_page["next"])
+
+    def test_deleting_a_comment_removes_its_replies(self):
+        root = Comment.objects.create(author=self.user, content="Root", parent_type="chapter", chapter=self.chapter)
+        self.reply(self.reply(root))
+        root.delete()
+        self.assertFalse(Comment.objects.exists())
+
+
+class CounterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.fanfic = make_fanfiction(1)
+        self.user = self.fanfic.author
+
+    def counts(self):
+        self.fanfic.refresh_from_db()
+        return self.fanfic.chapter_count, self.fanfic.comment_count
+
+    def add_chapter(self, number):
+        return Chapter.objects.create(fanfiction=self.fanfic, chapter_number=number, title="t", content="c")
+
+    def test_chapters_and_comments_are_counted(self):
+        first = self.add_chapter(1)
+        second = self.add_chapter(2)
+        Comment.objects.create(author=self.user, content="c", parent_type="chapter", chapter=first)
+        Comment.objects.create(author=self.user, content="c", parent_type="fanfiction", fanfiction=self.fanfic)
+        self.assertEqual(self.counts(), (2, 2))
+        self.assertEqual(self.fanfic.last_chapter_published_at, second.published_at)
+
+        first.delete()
+        self.assertEqual(self.counts(), (1, 1))
+        second.delete()
+        self.assertEqual(self.counts(), (0, 1))
+        self.assertIsNone(self.fanfic.last_chapter_published_at)
+
+    def test_tag_usage_follows_the_links(self):
+        first, second = self.fanfic.tags.all()
+        self.assertEqual([first.usage_count, second.usage_count], [1, 1])
+
+        event = make_event(1)
+        event.tags.add(first)
+        first.fanfiction_set.add(make_fanfiction(2))
+        first.refresh_from_db()
+        self.assertEqual(first.usage_count, 3)
+
+        self.fanfic.tags.remove(first, make_tag("unused"))
+        event.tags.clear()
+        first.refresh_from_db()
+        self.assertEqual(first.usage_count, 1)
+
+        first.fanfiction_set.clear()
+        self.fanfic.delete()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual([first.usage_count, second.usage_count], [0, 0])
+
+    def test_recompute_repairs_drift(self):
+        self.add_chapter(1)
+        FanFiction.objects.update(chapter_count=7, comment_count=3)
+        Tag.objects.update(usage_count=0)
+        call_command("recompute_counters", stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0))
+        self.assertEqual(set(Tag.objects.values_list("usage_count", flat=True)), {1})
+
+    def test_deleting_a_story_does_not_query_per_comment(self):
+        def deletion_queries(fanfic, comments):
+            chapter = Chapter.objects.create(fanfiction=fanfic, chapter_number=1, title="t", content="c")
+            for i in range(comments):
+                Comment.objects.create(author=self.user, content="c", parent_type="chapter", chapter=chapter)
+                Comment.objects.create(author=self.user, content="c", parent_type="fanfiction", fanfiction=fanfic)
+            with CaptureQueriesContext(connection) as queries:
+                fanfic.delete()
+            return len(queries)
+
+        self.assertEqual(deletion_queries(make_fanfiction(2), 1), deletion_queries(make_fanfiction(3), 40))
+
+    def test_deleting_a_chapter_or_thread_counts_everything_in_it(self):
+        chapter = self.add_chapter(1)
+        root = Comment.objects.create(author=self.user, content="c", parent_type="chapter", chapter=chapter)
+        reply = Comment.objects.create(author=self.user, content="c", parent_type="chapter", chapter=chapter, reply_to=root)
+        Comment.objects.create(author=self.user, content="c", parent_type="chapter", chapter=chapter, reply_to=reply)
+        Comment.objects.create(author=self.user, content="c", parent_type="chapter", chapter=chapter)
+        thread = Comment.objects.create(author=self.user, content="c", parent_type="fanfiction", fanfiction=self.fanfic)
+        Comment.objects.create(
+            author=self.user, content="c", parent_type="fanfiction", fanfiction=self.fanfic, reply_to=thread
+        )
+        self.assertEqual(self.counts(), (1, 6))
+
+        root.delete()
+        self.assertEqual(self.counts(), (1, 3))
+        chapter.delete()
+        self.assertEqual(self.counts(), (0, 2))
+        Comment.objects.filter(fanfiction=self.fanfic).delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_tag_version_moves_on_commit(self):
+        from .cache import get_versions
+        from .counters import tags_used
+
+        before = get_versions([Tag])
+        with self.captureOnCommitCallbacks(execute=True):
+            tags_used([self.fanfic.tags.first().pk])
+            self.assertEqual(get_versions([Tag]), before)
+        self.assertNotEqual(get_versions([Tag]), before)
+
+    def test_list_exposes_counts(self):
+        self.add_chapter(1)
+        story = self.client.get(reverse("core:fanfiction-list-create")).json()["results"][0]
+        self.assertEqual((story["chapter_count"], story["comment_count"]), (1, 0))
+        self.assertEqual(story["tags"][0]["usage_count"], 1)
+
+
+
+class TagFacetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("writer")
+        self.action, self.drama, self.comedy = (Tag.objects.create(name=name) for name in ("Action", "Drama", "Comedy"))
+        self.stories = []
+        for i, (status, tags) in enumerate([
+            ("ongoing", [self.action, self.drama]),
+            ("ongoing", [self.action]),
+            ("completed", [self.action, self.drama, self.comedy]),
+        ]):
+            story = FanFiction.objects.create(author=self.author, title=f"Story {i}", summary="s", status=status)
+            story.tags.set(tags)
+            self.stories.append(story)
+
+    def facets(self, kind="fanfiction"):
+        rows = TagFacetCount.objects.filter(kind=kind, count__gt=0)
+        return {(row.tag.slug, row.status): row.count for row in rows}
+
+    def titles(self, **params):
+        response = self.client.get(reverse("core:fanfiction-list-create"), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(story["title"] for story in response.json()["results"])
+
+    def test_counts_follow_tags_statuses_and_deletes(self):
+        self.assertEqual(self.facets(), {
+            ("action", "ongoing"): 2, ("action", "completed"): 1,
+            ("drama", "ongoing"): 1, ("drama", "completed"): 1,
+            ("comedy", "completed"): 1,
+        })
+        first, second, third = self.stories
+        self.comedy.fanfiction_set.add(first, second)
+        first.tags.remove(self.action)
+        second.status = "completed"
+        second.save()
+        third.delete()
+        self.assertEqual(self.facets(), {
+            ("action", "completed"): 1,
+            ("drama", "ongoing"): 1,
+            ("comedy", "ongoing"): 1, ("comedy", "completed"): 1,
+        })
+
+        event = make_event(1)
+        event.tags.add(self.action)
+        self.assertEqual(self.facets("event")[("action", "")], 1)
+
+        expected = self.facets()
+        TagFacetCount.objects.all().delete()
+        call_command("recompute_counters", stdout=StringIO())
+        self.assertEqual(self.facets(), expected)
+
+    def test_filter_by_all_or_any_tags(self):
+        self.assertEqual(self.titles(tags="action,drama"), ["Story 0", "Story 2"])
+        self.assertEqual(self.titles(tags="drama,comedy", tag_mode="any"), ["Story 0", "Story 2"])
+        self.assertEqual(self.titles(tags="action,missing"), [])
+        self.assertEqual(self.titles(tags="action", status="ongoing"), ["Story 0", "Story 1"])
+
+        url = reverse("core:fanfiction-list-create")
+        self.assertEqual(self.client.get(url, {"tags": "action", "tag_mode": "some"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"status": "paused"}).status_code, 400)
+
+    def test_facets_in_the_response(self):
+        url = reverse("core:fanfiction-list-create")
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(url, {"tags": "action,drama"})
+        with CaptureQueriesContext(connection) as faceted:
+            response = self.client.get(url, {"tags": "action,drama", "facets": "true"})
+        self.assertEqual(len(faceted), len(plain) + 1)
+        self.assertEqual(response.json()["facets"], [
+            {"slug": "action", "name": "Action", "count": 3},
+            {"slug": "drama", "name": "Drama", "count": 2},
+            {"slug": "comedy", "name": "Comedy", "count": 1},
+        ])
+        self.assertEqual(
+            self.client.get(url, {"facets": "true", "status": "ongoing"}).json()["facets"][1],
+            {"slug": "drama", "name": "Drama", "count": 1},
+        )
+        self.assertNotIn("facets", self.client.get(url).json())
+
+        # The page stays the same but the counts do not.
+        etag = response["ETag"]
+        FanFiction.objects.create(author=self.author, title="Other", summary="s", status="ongoing").tags.set([self.comedy])
+        response = self.client.get(url, {"tags": "action,drama", "facets": "true"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_facets(self):
+        make_event(1).tags.add(self.action)
+        url = reverse("core:event-list-create")
+        data = self.client.get(url, {"tags": "action", "facets": "true"}).json()
+        self.assertEqual([event["title"] for event in data["results"]], ["Event 1"])
+        self.assertEqual(data["facets"][0], {"slug": "action", "name": "Action", "count": 1})
+
+        make_event(2).tags.add(self.action)
+        data = self.client.get(url, {"tags": "action", "facets": "true"}).json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(data["facets"][0]["count"], 2)
+
+
+class ChapterNumberTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.fanfic = make_fanfiction(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.fanfic.author)
+        self.url = reverse("core:chapter-list-create", args=[self.fanfic.pk])
+
+    def post_chapter(self):
+        return self.client.post(self.url, {"title": "t", "content": "c"})
+
+    def test_numbers_follow_the_highest_chapter(self):
+        self.assertEqual([self.post_chapter().json()["chapter_number"] for _ in range(3)], [1, 2, 3])
+        Chapter.objects.get(chapter_number=3).delete()
+        self.assertEqual(self.post_chapter().json()["chapter_number"], 3)
+
+        # Chapters written without the sequence are still skipped over.
+        Chapter.objects.bulk_create([Chapter(fanfiction=self.fanfic, chapter_number=9, title="t", content="c")])
+        self.assertEqual(self.post_chapter().json()["chapter_number"], 10)
+
+    def test_only_the_author_can_add_chapters(self):
+        self.client.force_authenticate(make_user("other"))
+        self.assertEqual(self.post_chapter().status_code, 403)
+        missing = reverse("core:chapter-list-create", args=[self.fanfic.pk + 1])
+        self.assertEqual(self.client.post(missing, {"title": "t", "content": "c"}).status_code, 404)
+        self.assertFalse(Chapter.objects.exists())
+
+
+
+class BulkCreateTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username="admin", password="x", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, name, items, *args):
+        return self.client.post(reverse(f"core:{name}-bulk-create", args=args), items, format="json")
+
+    def events(self, n, tags):
+        return [
+            {"title": f"Event {i}", "description": "d", "date": "2025-01-01", "tag_ids": [tag.pk for tag in tags]}
+            for i in range(n)
+        ]
+
+    def test_events_are_created_with_their_tags(self):
+        tags = [make_tag(1), make_tag(2)]
+        with CaptureQueriesContext(connection) as few:
+            response = self.post("event", self.events(2, tags))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([event["title"] for event in response.json()], ["Event 0", "Event 1"])
+        self.assertEqual(len(response.json()[0]["tags"]), 2)
+
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.post("event", self.events(10, tags)).status_code, 201)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(Event.objects.count(), 12)
+        self.assertEqual(Event.tags.through.objects.count(), 24)
+        self.assertEqual(set(Tag.objects.values_list("usage_count", flat=True)), {12})
+
+    def test_cache_versions_move_when_the_batch_commits(self):
+        from .cache import get_versions
+        tags = [make_tag(1)]
+        before = get_versions([Event, Tag])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.post("event", self.events(2, tags)).status_code, 201)
+        self.assertEqual(get_versions([Event, Tag]), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotIn(get_versions([Event])[0], before)
+        self.assertNotIn(get_versions([Tag])[0], before)
+
+    def test_one_invalid_item_fails_the_batch(self):
+        items = self.events(3, [make_tag(1)])
+        items[1]["tag_ids"] = [999]
+        del items[2]["title"]
+        response = self.post("event", items)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("tag_ids", errors[1])
+        self.assertIn("title", errors[2])
+        self.assertFalse(Event.objects.exists())
+
+    def test_tag_names_must_be_free(self):
+        make_tag(1)
+        response = self.post("tag", [{"name": "tag 1"}, {"name": "New"}, {"name": "New"}])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertIn("name", errors[0])
+        self.assertEqual(errors[1], {})
+        self.assertIn("name", errors[2])
+
+        response = self.post("tag", [{"name": "New"}, {"name": "Other"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([tag["slug"] for tag in response.json()], ["new", "other"])
+
+    def test_fanart_needs_an_artist(self):
+        response = self.post("fanart", [
+            {"image_url": "https://example.com/a.png", "week": "Week 1", "artist": self.admin.pk},
+            {"image_url": "https://example.com/b.png", "week": "Week 1"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("non_field_errors", response.json()[1])
+        self.assertFalse(FanArt.objects.exists())
+
+    def test_batch_must_be_a_list_within_the_limit(self):
+        self.assertEqual(self.post("tag", {"name": "x"}).status_code, 400)
+        self.assertEqual(self.post("tag", []).status_code, 400)
+        with self.settings(BULK_MAX_ITEMS=2):
+            self.assertEqual(self.post("tag", [{"name": f"t{i}"} for i in range(3)]).status_code, 400)
+        self.client.force_authenticate(make_user("plain"))
+        self.assertEqual(self.post("tag", [{"name": "x"}]).status_code, 403)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_chapters_are_appended_in_order(self):
+        fanfic = make_fanfiction(1)
+        Chapter.objects.create(fanfiction=fanfic, chapter_number=1, title="t", content="c")
+        self.client.force_authenticate(fanfic.author)
+        items = [{"title": f"Part {i}", "content": "The knight rode on."} for i in range(3)]
+        response = self.post("chapter", items, fanfic.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([chapter["chapter_number"] for chapter in response.json()], [2, 3, 4])
+        self.assertEqual(response.json()[0]["word_count"], 4)
+
+        fanfic.refresh_from_db()
+        self.assertEqual(fanfic.chapter_count, 4)
+        results = self.client.get(reverse("core:search"), {"q": "knight", "type": "chapter"}).json()["results"]
+        self.assertEqual(len(results), 3)
+
+    def test_only_the_author_can_add_chapters(self):
+        fanfic = make_fanfiction(1)
+        items = [{"title": "t", "content": "c"}]
+        self.client.force_authenticate(make_user("other"))
+        self.assertEqual(self.post("chapter", items, fanfic.pk).status_code, 403)
+        self.assertEqual(self.post("chapter", items, fanfic.pk + 1).status_code, 404)
+        self.assertFalse(Chapter.objects.exists())
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    PERFORMANCE_BUDGET_ACTION="raise",
+)
+class ConcurrentChapterNumberTests(TransactionTestCase):
+    posts = 12
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("in-memory SQLite cannot serve concurrent writers")
+
+    def test_parallel_posts_get_gapless_numbers(self):
+        fanfic = make_fanfiction(1)
+        url = reverse("core:chapter-list-create", args=[fanfic.pk])
+
+        def post_chapter(n):
+            client = APIClient()
+            client.force_authenticate(fanfic.author)
+            try:
+                return client.post(url, {"title": f"t{n}", "content": "c"}).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            statuses = list(pool.map(post_chapter, range(self.posts)))
+
+        self.assertEqual(statuses, [201] * self.posts)
+        numbers = sorted(Chapter.objects.values_list("chapter_number", flat=True))
+        self.assertEqual(numbers, list(range(1, self.posts + 1)))
+
+
+class ChapterSummaryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.fanfic = make_fanfiction(1)
+        self.chapter = Chapter.objects.create(
+            fanfiction=self.fanfic, chapter_number=1, title="One", content="It was a dark and stormy night."
+        )
+        self.url = reverse("core:chapter-list-create", args=[self.fanfic.pk])
+
+    def test_word_count_follows_the_content(self):
+        self.assertEqual(self.chapter.word_count, 7)
+        self.chapter.content = "Short now."
+        self.chapter.save(update_fields=["content"])
+        self.chapter.refresh_from_db()
+        self.assertEqual(self.chapter.word_count, 2)
+
+    def test_list_is_a_table_of_contents(self):
+        with CaptureQueriesContext(connection) as queries:
+            entry = self.client.get(self.url).json()["results"][0]
+        self.assertNotIn("content", entry)
+        self.assertEqual((entry["title"], entry["word_count"]), ("One", 7))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"content"', queries[0]["sql"])
+
+    def test_content_can_be_included(self):
+        entry = self.client.get(self.url, {"include": "content"}).json()["results"][0]
+        self.assertEqual(entry["content"], self.chapter.content)
+        detail = self.client.get(reverse("core:chapter-detail", args=[self.chapter.pk])).json()
+        self.assertEqual(detail["content"], self.chapter.content)
+
+
+@override_settings(CHAPTER_STREAM_CHUNK_SIZE=5)
+class ChapterTextTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.text = "Chapter one: the café at midnight."
+        self.data = self.text.encode()
+        chapter = Chapter.objects.create(fanfiction=make_fanfiction(1), chapter_number=1, title="One", content=self.text)
+        self.url = reverse("core:chapter-text", args=[chapter.pk])
+
+    def read(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_streams_the_whole_text_in_chunks(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertEqual(int(response["Content-Length"]), len(self.data))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.read(response), self.data)
+        self.assertEqual(len(queries), -(-len(self.data) // 5))
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=8-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 8-10/{len(self.data)}")
+        self.assertEqual(self.read(response), b"one")
+
+        tail = self.client.get(self.url, HTTP_RANGE="bytes=-9")
+        self.assertEqual(self.read(tail), b"midnight.")
+        rest = self.client.get(self.url, HTTP_RANGE="bytes=17-")
+        self.assertEqual(self.read(rest), self.data[17:])
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.data)}-")
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_ranges_of_an_empty_text_are_unsatisfiable(self):
+        Chapter.objects.update(content="")
+        for header in ("bytes=-5", "bytes=0-"):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response["Content-Range"], "bytes */0")
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_stale_if_range_gets_the_whole_text(self):
+        etag = self.client.get(self.url)["ETag"]
+        same = self.client.get(self.url, HTTP_RANGE="bytes=0-6", HTTP_IF_RANGE=etag)
+        self.assertEqual(same.status_code, 206)
+        changed = self.client.get(self.url, HTTP_RANGE="bytes=0-6", HTTP_IF_RANGE='"old"')
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_edit_mid_stream_stops_the_stream(self):
+        response = self.client.get(self.url)
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), self.data[:5])
+        Chapter.objects.update(content="Rewritten", updated_at=timezone.now())
+        self.assertEqual(list(chunks), [])
+
+    def test_missing_chapter(self):
+        self.assertEqual(self.client.get(reverse("core:chapter-text", args=[999])).status_code, 404)
+
+
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.samples.reset()
+        self.url = reverse("core:fanfiction-list-create")
+
+    def test_server_timing_header(self):
+        make_fanfiction(1)
+        response = self.client.get(self.url)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="3 queries", serialize;dur=[\d.]+, throttle;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_metrics_are_staff_only(self):
+        self.client.get(self.url)
+        metrics_url = reverse("core:metrics")
+        self.assertEqual(self.client.get(metrics_url).status_code, 401)
+
+        client = APIClient()
+        client.force_authenticate(make_user("reader"))
+        self.assertEqual(client.get(metrics_url).status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(username="staff", password="x", is_staff=True))
+        response = client.get(metrics_url)
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('anisoc_request_queries{view="core:fanfiction-list-create",quantile="0.99"}', body)
+        self.assertIn('anisoc_request_duration_seconds_count{view="core:fanfiction-list-create"} 1', body)
+
+    def test_pool_statistics(self):
+        if connection.vendor != "postgresql":
+            self.assertEqual(instrumentation.pool_stats(), {})
+        stats = {"default": {"pool_max": 10, "pool_size": 3, "requests_wait_ms": 1500}}
+        with mock.patch.object(instrumentation, "pool_stats", return_value=stats):
+            body = instrumentation.prometheus_text()
+        self.assertIn('anisoc_db_pool_connections{database="default"} 3', body)
+        self.assertIn('anisoc_db_pool_wait_seconds_total{database="default"} 1.5', body)
+        self.assertIn('anisoc_db_pool_lost_connections_total{database="default"} 0', body)
+        self.assertIn("# TYPE anisoc_db_pool_requests_total counter", body)
+
+    @override_settings(PERFORMANCE_BUDGETS={"GET core:fanfiction-list-create": {"queries": 2}})
+    def test_budgets_raise_or_log(self):
+        make_fanfiction(1)
+        with self.assertRaisesMessage(instrumentation.PerformanceBudgetExceeded, "queries 3 > 2"):
+            self.client.get(self.url)
+        with self.settings(PERFORMANCE_BUDGET_ACTION="log"), self.assertLogs("core.performance", "WARNING"):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class BenchmarkTests(APITestCase):
+    def test_seed_data_fills_in_derived_fields(self):
+        call_command(
+            "seed_data", force=True, users=5, tags=4, stories=6, chapters_per_story=2, chapter_words=30,
+            blog_posts=3, comments=80, seed=7, no_index=True, stdout=StringIO(),
+        )
+        self.assertEqual(FanFiction.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 80)
+
+        for comment in Comment.objects.select_related("reply_to"):
+            prefix = comment.reply_to.path if comment.reply_to else ""
+            self.assertEqual(comment.path, prefix + Comment.path_segment(comment.pk))
+        self.assertTrue(Comment.objects.filter(depth__gt=0).exists())
+
+        chapter = Chapter.objects.first()
+        self.assertEqual(chapter.word_count, len(chapter.content.split()))
+        counted = list(FanFiction.objects.values_list("chapter_count", "comment_count").order_by("pk"))
+        call_command("recompute_counters", stdout=StringIO())
+        self.assertEqual(counted, list(FanFiction.objects.values_list("chapter_count", "comment_count").order_by("pk")))
+
+        # New comments continue after the explicitly assigned ids.
+        self.assertEqual(make_comment("after").pk, Comment.objects.order_by("-pk")[1].pk + 1)
+
+    def test_run_benchmarks_reports_and_compares(self):
+        make_fanfiction(1)
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, "report.json")
+            call_command("run_benchmarks", iterations=2, warmup=0, only=["fanfiction-list"], output=report_path, stdout=StringIO())
+            with open(report_path) as report_file:
+                report = json.load(report_file)
+
+        result = report["endpoints"]["core:fanfiction-list-create"]
+        self.assertEqual((result["status"], result["queries"]), (200, 3))
+        self.assertGreater(result["peak_memory_kb"], 0)
+
+        self.assertEqual(benchmark.compare(report, report), [])
+        fewer_queries = {"endpoints": {"core:fanfiction-list-create": {**result, "queries": 2}}}
+        self.assertEqual(benchmark.compare(report, fewer_queries), ["core:fanfiction-list-create: queries 2 -> 3"])
+
+    def test_fast_path_speedup(self):
+        make_fanfiction(1)
+        report = benchmark.fast_path_speedup(iterations=2, warmup=0, only=["fanfiction-list"])
+        result = report["endpoints"]["core:fanfiction-list-create"]
+        self.assertEqual(result["status"], 200)
+        self.assertGreater(result["speedup"], 0)
+        self.assertEqual(report["orjson"], renderers.orjson is not None)
+
+    def test_connection_overhead(self):
+        if connection.vendor != "postgresql":
+            with self.assertRaisesMessage(CommandError, "needs PostgreSQL"):
+                call_command("run_benchmarks", connections=True, stdout=StringIO())
+            return
+        report = benchmark.connection_overhead(iterations=5, warmup=1)
+        self.assertEqual(set(report["modes"]), {"direct", "pooled"})
+        self.assertGreater(report["speedup"], 0)
+
+
+@override_settings(JWT_USER_CACHE=True)
+class JWTUserCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.client = APIClient()
+        self.login(self.user)
+        self.me = reverse("core:me")
+
+    def login(self, user):
+        self.token = CookieTokenObtainPairSerializer.get_token(user).access_token
+        self.client.cookies["access_token"] = str(self.token)
+
+    def queries_for(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(queries)
+
+    def test_user_is_cached_per_token(self):
+        self.assertEqual(self.queries_for("get", self.me)[1], 1)
+        response, queries = self.queries_for("get", self.me)
+        self.assertEqual((response.json()["name"], queries), ("userreader", 0))
+
+        # A new token for the same user is looked up once too.
+        self.login(self.user)
+        self.assertEqual(self.queries_for("get", self.me)[1], 1)
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        self.client.get(self.me)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.me).status_code, 401)
+
+    def test_only_some_fields_are_cached(self):
+        self.client.get(self.me)
+        entry = cache.get(f"auth-user:{self.user.pk}:{self.token['jti']}")
+        self.assertEqual(entry[1], (self.user.pk, "userreader", "", False, True))
+
+        with self.assertNumQueries(1):  # the password, loaded when read
+            self.assertEqual(self.client.get(self.me).wsgi_request.user.password, self.user.password)
+
+    @override_settings(JWT_USER_CACHE=False)
+    def test_cache_is_off_by_default_without_a_shared_cache(self):
+        self.client.get(self.me)
+        self.assertEqual(self.queries_for("get", self.me)[1], 1)
+
+    def test_refresh_reloads_claims(self):
+        self.client.cookies["refresh_token"] = str(CookieTokenObtainPairSerializer.get_token(self.user))
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(reverse("core:refresh"))
+        access = AccessToken(response.cookies["access_token"].value)
+        self.assertTrue(access["is_staff"])
+
+    @override_settings(JWT_STATELESS_READS=True)
+    def test_stateless_reads_use_token_claims(self):
+        response, queries = self.queries_for("get", self.me)
+        self.assertEqual(response.json(), {"id": self.user.pk, "email": "", "name": "userreader"})
+        self.assertEqual(queries, 0)
+
+        draft = BlogPost.objects.create(author=self.user, title="Draft", content="c", is_public=False)
+        self.assertEqual(self.client.get(reverse("core:blogpost-detail", args=[draft.pk])).status_code, 200)
+
+        # Writes still load the real user.
+        response = self.client.post(
+            reverse("core:comment-list-create"), {"content": "Hi", "parent_type": "blog", "parent_id": draft.pk}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Comment.objects.get().author, self.user)
+
+
+class RefreshTokenTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        tokens.blacklist_filter.reset()
+        self.user = make_user("reader")
+        self.client = APIClient()
+        self.refresh_url = reverse("core:refresh")
+
+    def login(self):
+        refresh = str(CookieTokenObtainPairSerializer.get_token(self.user))
+        self.client.cookies["refresh_token"] = refresh
+        return refresh
+
+    def test_refresh_rotates_and_blacklists_the_old_token(self):
+        old = self.login()
+        response = self.client.post(self.refresh_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.cookies["refresh_token"].value, old)
+
+        self.client.cookies["refresh_token"] = old
+        self.assertEqual(self.client.post(self.refresh_url).status_code, 401)
+
+    def test_tokens_not_blacklisted_skip_the_blacklist_query(self):
+        self.login()
+        self.client.post(self.refresh_url)  # builds the filter
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.post(self.refresh_url).status_code, 200)
+        blacklist_checks = [
+            query for query in queries
+            if 'FROM "token_blacklist_blacklistedtoken"' in query["sql"] and '"jti" =' in query["sql"]
+        ]
+        self.assertEqual(blacklist_checks, [])
+
+    def test_logged_out_token_is_rejected(self):
+        self.login()
+        self.assertEqual(self.client.post(self.refresh_url).status_code, 200)
+        current = self.client.cookies["refresh_token"].value
+        self.client.post(reverse("core:logout"))
+        self.client.cookies["refresh_token"] = current
+        self.assertEqual(self.client.post(self.refresh_url).status_code, 401)
+
+    def test_refresh_reads_the_user_no_more_than_simplejwt(self):
+        def user_reads(serializer_class):
+            serializer = serializer_class(data={"refresh": str(CookieTokenObtainPairSerializer.get_token(self.user))})
+            with CaptureQueriesContext(connection) as queries:
+                self.assertTrue(serializer.is_valid())
+            return len([query for query in queries if query["sql"].startswith('SELECT "auth_user"')])
+
+        # The new access token's claims come from the user the serializer has loaded anyway.
+        self.assertEqual(user_reads(tokens.CookieTokenRefreshSerializer), user_reads(TokenRefreshSerializer))
+
+    def test_rows_committed_out_of_order_are_picked_up(self):
+        def blacklist(pk):
+            # bulk_create sends no signal, as if another process had blacklisted it.
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f"jti-{pk}", token="t", expires_at=timezone.now() + timedelta(days=1)
+            )
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(id=pk, token=token)])
+
+        blacklist_filter = tokens.BlacklistFilter()
+        blacklist(10)
+        self.assertTrue(blacklist_filter.might_contain("jti-10"))
+        # An id handed out before 10 whose transaction commits only now.
+        blacklist(5)
+        blacklist_filter.synced_at = 0
+        self.assertTrue(blacklist_filter.might_contain("jti-5"))
+
+    def test_bloom_filter(self):
+        bloom = tokens.BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        self.assertTrue(all(f"jti-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_prune_tokens_deletes_expired_rows(self):
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f"old-{i}", token="t", expires_at=now - timedelta(hours=1)
+            )
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(user=self.user, jti="live", token="t", expires_at=now + timedelta(hours=1))
+
+        out = StringIO()
+        call_command("prune_tokens", batch_size=2, stdout=out)
+        self.assertIn("Deleted 5", out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), ["live"])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class ThrottleTests(APITestCase):
+    class Throttle(throttling.ScopedRateThrottle):
+        THROTTLE_RATES = {"test": "3/minute"}
+        now = 6000.0
+
+        def timer(self):
+            return self.now
+
+    class View:
+        throttle_scope = "test"
+
+    def request(self, at):
+        self.Throttle.now = at
+        throttle = self.Throttle()
+        request = APIClient().get("/").wsgi_request  # any request, only REMOTE_ADDR is read
+        return throttle.allow_request(request, self.View()), throttle
+
+    def check_sliding_window(self):
+        for _ in range(3):
+            self.assertTrue(self.request(6000)[0])
+        allowed, throttle = self.request(6030)
+        self.assertFalse(allowed)
+        # Full window: the next one opens in 30s, then half of these 3 must slide out.
+        self.assertAlmostEqual(throttle.wait(), 30 + 20)
+
+        # Halfway through the next window the 3 weigh 1.5, room for one more.
+        self.assertTrue(self.request(6090)[0])
+        allowed, throttle = self.request(6090)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 10)
+        self.assertTrue(self.request(6100)[0])
+
+    def test_sliding_window_in_the_database(self):
+        with override_settings(THROTTLE_STORE="database"):
+            self.check_sliding_window()
+        self.assertEqual(ThrottleWindow.objects.count(), 2)
+
+    def test_sliding_window_in_the_cache(self):
+        with override_settings(THROTTLE_STORE="cache"):
+            self.check_sliding_window()
+
+    @override_settings(THROTTLE_STORE="database")
+    def test_expired_windows_are_deleted(self):
+        self.request(6000)
+        self.request(6060)
+        self.request(6120)
+        self.assertEqual(sorted(ThrottleWindow.objects.values_list("window", flat=True)), [101, 102])
+
+    @override_settings(THROTTLE_STORE="database")
+    def test_signup_limit_sets_retry_after(self):
+        url = reverse("core:register")
+        for i in range(5):
+            self.client.post(url, {"username": f"new{i}", "password": "x"})
+        response = self.client.post(url, {"username": "new5", "password": "x"})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 120)
+
+
+class AsyncReadTests(APITestCase):
+    def test_event_pages_match_the_drf_list(self):
+        for n in range(5):
+            make_event(n)
+
+        async def fetch_pages():
+            pages, url = [], reverse("core:async-event-list") + "?limit=2"
+            while url:
+                page = (await self.async_client.get(url)).json()
+                pages.append(page["results"])
+                url = page["next"]
+            return pages
+
+        pages = async_to_sync(fetch_pages)()
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        drf = self.client.get(reverse("core:event-list-create"), {"limit": 5}).json()["results"]
+        self.assertEqual([event for page in pages for event in page], drf)
+
+    async def test_detail_and_missing_rows(self):
+        fanfic = await sync_to_async(make_fanfiction)(1)
+        response = await self.async_client.get(reverse("core:async-fanfiction-detail", args=[fanfic.pk]))
+        self.assertEqual(response.json()["title"], "Story 1")
+        self.assertEqual(len(response.json()["tags"]), 2)
+
+        response = await self.async_client.get(reverse("core:async-fanfiction-detail", args=[fanfic.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_comments_need_a_parent_and_a_valid_cursor(self):
+        url = reverse("core:async-comment-list")
+        self.assertEqual((await self.async_client.get(url)).status_code, 400)
+
+        comment = await sync_to_async(make_comment)(1)
+        params = {"parent_type": "blog", "parent_id": comment.blog_post_id}
+        results = (await self.async_client.get(url, params)).json()["results"]
+        self.assertEqual([row["id"] for row in results], [comment.pk])
+
+        for cursor in ("not base64!", "WzFd", "WyJub3QgYSBkYXRlIiwgMV0="):  # wrong length, wrong type
+            response = await self.async_client.get(url, {**params, "cursor": cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_shares_the_anonymous_rate_limit(self):
+        with mock.patch.object(throttling.AnonRateThrottle, "THROTTLE_RATES", {"anon": "2/minute"}):
+            url = reverse("core:async-announcement-list")
+            self.assertEqual(self.client.get(reverse("core:announcement-list-create")).status_code, 200)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+
+class LoadTestTests(TestCase):
+    def test_reports_throughput_per_concurrency_level(self):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = b'{"results": []}'
+                self.send_response(200 if self.path == "/ok/" else 404)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            report = loadtest.run([base_url], ["/ok/", "/missing/"], [1, 3], duration=0.2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        levels = report["servers"][base_url]
+        self.assertEqual([level["concurrency"] for level in levels], [1, 3])
+        for level in levels:
+            self.assertGreater(level["requests"], 0)
+            self.assertEqual(set(level["statuses"]), {"200", "404"})
+            self.assertEqual(level["errors"], {})
+
+
+
+class StartupTests(TestCase):
+    def test_profile_times_each_phase(self):
+        report = startup.profile(runs=1, top=5)
+        self.assertEqual(list(report["phases"]), ["interpreter", "settings", "apps", "asgi handler", "urls"])
+        self.assertGreater(report["phases"]["apps"], 0)
+        self.assertEqual(len(report["modules"]), 5)
+        self.assertIn("django", [row["package"] for row in report["packages"]])
+
+    def test_unapplied_migrations_come_from_disk_and_table(self):
+        self.assertEqual(startup.unapplied_migrations(connection), set())
+        self.assertIn(("core", "0001_initial"), startup.migration_files())
+        MigrationRecorder(connection).migration_qs.filter(app="core", name="0018_tag_facet_counts").delete()
+        self.assertEqual(startup.unapplied_migrations(connection), {("core", "0018_tag_facet_counts")})
+
+    def test_fastboot_skips_what_is_up_to_date(self):
+        with tempfile.TemporaryDirectory() as static_root, tempfile.TemporaryDirectory() as static_dir:
+            with open(os.path.join(static_dir, "app.css"), "w") as css:
+                css.write("body {}")
+            with override_settings(STATIC_ROOT=static_root, STATICFILES_DIRS=[static_dir]), \
+                    mock.patch("core.management.commands.fastboot.call_command") as run:
+                call_command("fastboot", stdout=StringIO())
+                self.assertEqual([call.args[0] for call in run.call_args_list], ["collectstatic"])
+
+                run.reset_mock()
+                call_command("fastboot", stdout=StringIO())
+                self.assertEqual(run.call_args_list, [])
+
+                with open(os.path.join(static_dir, "app.js"), "w") as js:
+                    js.write("")
+                call_command("fastboot", stdout=StringIO())
+                self.assertEqual([call.args[0] for call in run.call_args_list], ["collectstatic"])
+
+                run.reset_mock()
+                MigrationRecorder(connection).migration_qs.filter(app="core", name="0018_tag_facet_counts").delete()
+                call_command("fastboot", stdout=StringIO())
+                self.assertEqual([call.args[0] for call in run.call_args_list], ["migrate"])
+
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.TemporaryDirectory()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.source.cleanup)
+        self.addCleanup(self.root.cleanup)
+        self.write("app.css", "body { color: red; }\n" * 50)
+        settings = override_settings(
+            STATIC_ROOT=self.root.name,
+            STATICFILES_DIRS=[self.source.name],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write(self, name, content):
+        with open(os.path.join(self.source.name, name), "w") as static_file:
+            static_file.write(content)
+
+    def collect(self):
+        """The files compressed by a collectstatic run."""
+        compress = whitenoise_compress.Compressor.compress
+        compressed = []
+
+        def recording(compressor, path):
+            compressed.append(os.path.basename(path))
+            return compress(compressor, path)
+
+        with mock.patch.object(whitenoise_compress.Compressor, "compress", recording):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        return sorted(compressed)
+
+    def test_only_changed_files_are_compressed(self):
+        first = self.collect()
+        self.assertEqual(len(first), 2)
+        self.assertIn("app.css", first)
+        self.assertEqual(self.collect(), [])
+
+        self.write("app.css", "body { color: blue; }\n" * 50)
+        # collectstatic compares modification times to the second.
+        later = timezone.now().timestamp() + 10
+        os.utime(os.path.join(self.source.name, "app.css"), (later, later))
+        self.write("new.js", "console.log(1);\n" * 50)
+        changed = self.collect()
+        self.assertEqual(len(changed), 4)
+        self.assertIn("app.css", changed)
+        self.assertIn("new.js", changed)
+        self.assertFalse(set(changed) & (set(first) - {"app.css"}))
+
+    def test_hashed_files_are_served_compressed_and_immutable(self):
+        self.collect()
+        with open(os.path.join(self.root.name, "staticfiles.json")) as manifest:
+            hashed = json.load(manifest)["paths"]["app.css"]
+        response = Client().get(f"/static/{hashed}", HTTP_ACCEPT_ENCODING="gzip", secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("immutable", response["Cache-Control"])
+        response.close()
+
+
+class HomeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("core:home")
+        Announcement.objects.create(title="Welcome", message="m")
+        Announcement.objects.create(title="Old", message="m", is_active=False)
+        make_event(1)
+        make_fanart(1)
+        TeamMember.objects.create(name="Lead", role="President", tenure="2025-26")
+
+    def test_concurrent_first_builds_share_one_pool(self):
+        with mock.patch.object(home, "_pool", None):
+            with ThreadPoolExecutor(max_workers=8) as callers:
+                pools = set(callers.map(lambda _: home.get_pool(2), range(8)))
+            self.assertEqual(len(pools), 1)
+            pools.pop().shutdown()
+
+    def test_sections_match_the_list_endpoints(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(list(data), list(home.SECTIONS))
+        self.assertEqual(data["announcements"], self.client.get(reverse("core:announcement-list-create")).json())
+        self.assertEqual(data["events"], self.client.get(reverse("core:event-list-create")).json()["results"])
+        self.assertEqual(data["fanart"], self.client.get(reverse("core:fanart-list-create")).json()["results"])
+
+    def test_sections_are_cached_and_invalidated_separately(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        make_fanart(2)
+        with self.assertNumQueries(1):  # only the fanart section is rebuilt
+            response = self.client.get(self.url)
+        self.assertEqual((response["X-Cache"], len(response.json()["fanart"])), ("PARTIAL", 2))
+
+    def test_sections_parameter(self):
+        with self.assertNumQueries(2):  # events and their tags
+            data = self.client.get(self.url, {"sections": "events"}).json()
+        self.assertEqual(list(data), ["events"])
+        self.assertEqual(list(self.client.get(self.url, {"fields": "fanart,announcements"}).json()), ["fanart", "announcements"])
+        self.assertEqual(self.client.get(self.url, {"sections": "events,nope"}).status_code, 400)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PERFORMANCE_BUDGET_ACTION="raise",
+    THROTTLE_STORE="cache",
+    HOME_SECTION_WORKERS=4,
+)
+class ParallelHomeTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("in-memory SQLite cannot serve concurrent readers")
+        cache.clear()
+
+    def test_sections_built_in_parallel(self):
+        make_event(1)
+        make_fanart(1)
+        data = self.client.get(reverse("core:home")).json()
+        self.assertEqual([len(data[name]) for name in ("events", "fanart", "team_members")], [1, 1, 0])
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.fanfic = make_fanfiction(1)
+        self.chapter = Chapter.objects.create(fanfiction=self.fanfic, chapter_number=1, title="One", content="Text")
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, [query["sql"] for query in queries]
+
+    def test_fields_prune_output_columns_and_relations(self):
+        url = reverse("core:fanfiction-list-create")
+        response, queries = self.get(url, {"fields": "id,title,author_username"})
+        self.assertEqual(list(response.json()["results"][0]), ["id", "author_username", "title"])
+        story_query = next(sql for sql in queries if 'FROM "core_fanfiction"' in sql and "COUNT" not in sql)
+        self.assertNotIn('"summary"', story_query)
+        self.assertIn('"auth_user"."username"', story_query)
+        self.assertFalse(any("core_tag" in sql for sql in queries))
+
+    def test_exclude(self):
+        url = reverse("core:chapter-detail", args=[self.chapter.pk])
+        response, queries = self.get(url, {"exclude": "content"})
+        self.assertNotIn("content", response.json())
+        self.assertEqual(response.json()["title"], "One")
+        self.assertNotIn('"content"', queries[0])
+
+    def test_dependencies_and_conditional_requests(self):
+        comment = Comment.objects.create(author=self.fanfic.author, content="c", parent_type="chapter", chapter=self.chapter)
+        url = reverse("core:comment-list-create")
+        params = {"parent_type": "chapter", "parent_id": self.chapter.pk, "fields": "id,parent_type,parent_id"}
+        response, queries = self.get(url, params)
+        self.assertEqual(response.json()["results"], [{"id": comment.pk, "parent_type": "chapter", "parent_id": self.chapter.pk}])
+        self.assertNotIn('"content"', queries[0])
+
+        url = reverse("core:fanfiction-detail", args=[self.fanfic.pk])
+        etag = self.client.get(url, {"fields": "title"})["ETag"]
+        self.assertNotEqual(etag, self.client.get(url)["ETag"])
+        with self.assertNumQueries(1):  # no author join, no tags prefetch
+            response = self.client.get(url, {"fields": "title"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_fields_and_writes(self):
+        url = reverse("core:fanfiction-list-create")
+        self.assertEqual(self.client.get(url, {"fields": "title,nope"}).status_code, 400)
+
+        self.client.force_authenticate(self.fanfic.author)
+        response = self.client.post(f"{url}?fields=id", {"title": "New", "summary": "s", "status": "ongoing"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["title"], "New")
+
+    async def test_async_views(self):
+        url = reverse("core:async-fanfiction-list")
+        response = await self.async_client.get(url, {"fields": "id,title"})
+        self.assertEqual(response.json()["results"], [{"id": self.fanfic.pk, "title": "Story 1"}])
+        self.assertEqual((await self.async_client.get(url, {"exclude": "nope"})).status_code, 400)
+
+
+class CompiledSerializerTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.fanfic = make_fanfiction(1)
+        make_fanfiction(2).tags.clear()
+        chapter = Chapter.objects.create(fanfiction=self.fanfic, chapter_number=1, title="One", content="Text")
+        make_fanart(1)
+        FanArt.objects.create(image_url="https://example.com/b.png", artist_name="Guest \u2028\u00e9", week="Week 2")
+        make_event(1)
+        Comment.objects.create(author=self.fanfic.author, content="c", parent_type="chapter", chapter=chapter)
+        self.urls = [
+            reverse("core:fanfiction-list-create"),
+            reverse("core:fanfiction-list-create") + "?fields=id,title,tags&pagination=cursor&limit=1",
+            reverse("core:fanart-list-create"),
+            reverse("core:event-list-create"),
+            reverse("core:chapter-list-create", args=[self.fanfic.pk]),
+            reverse("core:comment-list-create") + f"?parent_type=chapter&parent_id={chapter.pk}",
+        ]
+
+    def get(self, url, compiled):
+        cache.clear()
+        with override_settings(COMPILED_SERIALIZERS=compiled), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_same_output_as_serializers(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                expected, expected_queries = self.get(url, compiled=False)
+                response, queries = self.get(url, compiled=True)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(queries, expected_queries)
+                self.assertEqual(response["ETag"], self.get(url, compiled=True)[0]["ETag"])
+
+        # A fanart without an artist has no artist_username at all, as with the serializer.
+        fanart = self.get(reverse("core:fanart-list-create"), compiled=True)[0].json()["results"]
+        self.assertEqual([("artist_username" in row) for row in fanart], [False, True])
+
+    def test_conditional_requests_and_cursor_links(self):
+        url = self.urls[1]
+        response, _ = self.get(url, compiled=True)
+        self.assertEqual(response.json()["results"][0]["tags"], [])
+        next_page = self.client.get(response.json()["next"])
+        self.assertEqual([row["id"] for row in next_page.json()["results"]], [self.fanfic.pk])
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        FanFiction.objects.filter(pk=self.fanfic.pk).update(title="Renamed")  # not on this page
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The ETag covers the nested rows too.
+        url = self.urls[0]
+        etag = self.client.get(url)["ETag"]
+        Tag.objects.filter(pk=self.fanfic.tags.first().pk).update(name="renamed")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_serializers_that_cannot_be_compiled(self):
+        self.assertIsNotNone(compile_serializer(FanFictionSerializer))
+        self.assertIsNone(compile_serializer(CommentTreeSerializer))
+
+
+class JSONRendererTests(TestCase):
+    data = {
+        "text": "caf\u00e9 \u2028 \"quoted\" \x07\n",
+        "numbers": [1, -2, 2 ** 63, 0.5, None, True],
+        "when": timezone.now(),
+        "day": date(2025, 1, 2),
+        "nested": [{"a": []}, {}],
+    }
+
+    def test_same_bytes_as_drf(self):
+        expected = renderers.renderers.JSONRenderer().render(self.data)
+        self.assertEqual(renderers.JSONRenderer().render(self.data), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(renderers.JSONRenderer().render(self.data), expected)
+        self.assertEqual(
+            renderers.JSONRenderer().render(self.data, "application/json; indent=2"),
+            renderers.renderers.JSONRenderer().render(self.data, "application/json; indent=2"),
+        )
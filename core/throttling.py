@@ -0,0 +1,135 @@
+"""
+Sliding-window rate limits kept in a store shared by every worker.
+
+DRF's throttles keep a list of request timestamps per client in the default
+cache and rewrite it on every request, and with the local-memory cache each
+gunicorn worker counts on its own. These keep two counters per client
+instead: the requests in the current fixed window and in the previous one.
+The previous count is weighted by how much of that window still falls inside
+the sliding window, so
+
+    estimate = previous * (1 - elapsed / duration) + current
+
+approximates a true sliding window in constant time and space.
+
+THROTTLE_STORE picks where the counters live: "database" (ThrottleWindow
+rows, bumped with single UPDATE statements, so concurrent workers never lose
+a hit) or "cache" (cache.incr, shared and atomic with Redis, per process
+with local memory).
+"""
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework import throttling
+
+from .instrumentation import throttle_timing
+from .models import ThrottleWindow
+
+
+def window_start(window, duration):
+    return datetime.fromtimestamp(window * duration, timezone.utc)
+
+
+class DatabaseStore:
+    def hit(self, key, window, duration):
+        """Count one request in window. Returns (previous window, current window) counts."""
+        windows = ThrottleWindow.objects.filter(key=key)
+        if not windows.filter(window=window).update(count=F("count") + 1):
+            try:
+                with transaction.atomic():
+                    ThrottleWindow.objects.create(
+                        key=key,
+                        window=window,
+                        count=1,
+                        # Still needed while it is the previous window.
+                        expires_at=window_start(window + 2, duration),
+                    )
+            except IntegrityError:
+                # Another worker opened the window first.
+                windows.filter(window=window).update(count=F("count") + 1)
+            else:
+                # Once per client and window, so expired rows never pile up.
+                ThrottleWindow.objects.filter(expires_at__lte=window_start(window, duration)).delete()
+
+        counts = dict(windows.filter(window__in=(window - 1, window)).values_list("window", "count"))
+        return counts.get(window - 1, 0), counts.get(window, 0)
+
+    def undo(self, key, window, duration):
+        ThrottleWindow.objects.filter(key=key, window=window).update(count=F("count") - 1)
+
+
+class CacheStore:
+    def hit(self, key, window, duration):
+        current_key = f"{key}:{window}"
+        cache.add(current_key, 0, timeout=2 * duration)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr().
+            cache.set(current_key, 1, timeout=2 * duration)
+            current = 1
+        return cache.get(f"{key}:{window - 1}", 0), current
+
+    def undo(self, key, window, duration):
+        try:
+            cache.decr(f"{key}:{window}")
+        except ValueError:
+            pass
+
+
+STORES = {"database": DatabaseStore(), "cache": CacheStore()}
+
+
+def retry_after(previous, current, elapsed, duration, limit):
+    """
+    Seconds until one more request fits under limit, given the counts
+    without it and the time elapsed in the current window.
+    """
+    if limit < 1:
+        return None
+    if current + 1 <= limit:
+        # Wait for enough of the previous window to slide out.
+        needed = 1 - (limit - current - 1) / previous
+        return max(needed * duration - elapsed, 0)
+    # The current window is full: wait for the next one, in which it is the previous.
+    needed = max(1 - (limit - 1) / current, 0)
+    return duration - elapsed + needed * duration
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, elapsed = divmod(self.timer(), self.duration)
+        window = int(window)
+        store = STORES[settings.THROTTLE_STORE]
+        with throttle_timing():
+            previous, current = store.hit(self.key, window, self.duration)
+            if previous * (1 - elapsed / self.duration) + current <= self.num_requests:
+                return True
+            # Refused requests do not count, like DRF's own throttles.
+            store.undo(self.key, window, self.duration)
+        self._wait = retry_after(previous, current - 1, elapsed, self.duration, self.num_requests)
+        return False
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, SlidingWindowRateThrottle):
+    pass
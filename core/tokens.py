@@ -0,0 +1,191 @@
+"""
+Refresh token blacklist checks and pruning.
+
+Every refresh and logout has to prove the presented refresh token is not
+blacklisted. Almost none are, so each process keeps a Bloom filter of the
+blacklisted jtis: a miss means "not blacklisted" for certain and skips the
+database, and only a hit (a blacklisted token or a rare false positive)
+runs simplejwt's real query.
+
+The filter is kept complete incrementally. New BlacklistedToken rows bump a
+generation number in the cache (see core/signals.py), and a process that
+sees a new generation, or has not synced for TOKEN_BLACKLIST_FILTER_MAX_AGE
+seconds, loads the rows added since its last sync, plus the
+TOKEN_BLACKLIST_FILTER_LOOKBACK ids before them, which may have committed
+late. With a per-process cache (local memory) other workers' blacklistings
+are therefore picked up within the max age; with a shared cache (Redis)
+they are seen immediately.
+
+prune_expired_tokens() deletes expired outstanding and blacklisted tokens in
+batches, see the prune_tokens management command.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import set_user_claims
+from .cache import new_version
+
+GENERATION_KEY = "token-blacklist-generation"
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class BlacklistFilter:
+    """Process-wide Bloom filter over the jtis of unexpired blacklisted tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.bloom = None
+        self.last_id = 0
+        self.generation = None
+        self.synced_at = 0.0
+        self.built_at = 0.0
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self.bloom
+
+    def sync(self):
+        # Read the generation before the rows, so a blacklisting in between is
+        # picked up by the next sync rather than lost.
+        generation = cache.get(GENERATION_KEY)
+        now = time.monotonic()
+        with self._lock:
+            stale_build = now - self.built_at > settings.TOKEN_BLACKLIST_FILTER_REBUILD
+            if self.bloom is None or stale_build or self.bloom.count > self.bloom.capacity:
+                self.rebuild(now)
+            elif generation != self.generation or now - self.synced_at > settings.TOKEN_BLACKLIST_FILTER_MAX_AGE:
+                # Ids are handed out before rows commit, so a row may show up below
+                # last_id after a sync; look back over the last few. Adding twice is harmless.
+                self.load(BlacklistedToken.objects.filter(id__gt=self.last_id - settings.TOKEN_BLACKLIST_FILTER_LOOKBACK))
+            else:
+                return
+            self.generation = generation
+            self.synced_at = now
+
+    def rebuild(self, now):
+        # Also drops tokens that have expired since the last build.
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        self.bloom = BloomFilter(max(settings.TOKEN_BLACKLIST_FILTER_CAPACITY, 2 * rows.count()))
+        self.last_id = 0
+        self.load(rows)
+        self.built_at = now
+
+    def load(self, rows):
+        for pk, jti in rows.order_by("id").values_list("id", "token__jti").iterator(chunk_size=5000):
+            self.bloom.add(jti)
+            self.last_id = max(self.last_id, pk)
+
+    def added(self, blacklisted):
+        """A token was blacklisted: record it here and tell the other processes."""
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, new_version(), None)
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(blacklisted.token.jti)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class FilteredRefreshToken(RefreshToken):
+    # The token's user, when the caller has loaded it already.
+    user = None
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    @property
+    def access_token(self):
+        # The claims copied from the refresh token date from login; read them again.
+        access = super().access_token
+        if self.user is None:
+            self.user = get_user_model().objects.get(
+                **{api_settings.USER_ID_FIELD: self.payload[api_settings.USER_ID_CLAIM]}
+            )
+        set_user_claims(access, self.user)
+        return access
+
+
+class CookieTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FilteredRefreshToken
+
+    def validate(self, attrs):
+        # TokenRefreshSerializer.validate(), handing the user it checks to the new access token.
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            refresh.user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            if not api_settings.USER_AUTHENTICATION_RULE(refresh.user):
+                raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+
+        return data
+
+
+def prune_expired_tokens(batch_size=1000):
+    """Delete expired outstanding tokens and their blacklist rows. Returns the number deleted."""
+    deleted = 0
+    while True:
+        expired = list(
+            OutstandingToken.objects
+            .filter(expires_at__lte=timezone.now())
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not expired:
+            return deleted
+        BlacklistedToken.objects.filter(token_id__in=expired).delete()
+        OutstandingToken.objects.filter(id__in=expired).delete()
+        deleted += len(expired)
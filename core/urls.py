@@ -10,10 +10,13 @@ from .views import (
     AnnouncementDetail,
     TagListCreate,
     TagDetail,
+    TagBulkCreate,
     EventListCreate,
     EventDetail,
+    EventBulkCreate,
     FanArtListCreate,
     FanArtDetail,
+    FanArtBulkCreate,
     SeasonalReportListCreate,
     SeasonalReportDetail,
     BlogPostListCreate,
@@ -22,11 +25,18 @@ from .views import (
     FanFictionDetail,
     ChapterListCreate,
     ChapterDetail,
+    ChapterBulkCreate,
+    ChapterTextView,
     CommentListCreate,
+    CommentThreadList,
     CommentDetail,
+    SearchView,
+    MetricsView,
+    HomeView,
     MeView
 )
 from django.contrib.auth import views as auth_views
+from . import async_views
 
 
 app_name = "core"
@@ -129,6 +139,11 @@ urlpatterns = [
         TagDetail.as_view(),
         name="tag-detail",
     ),
+    path(
+        "tags/bulk/",
+        TagBulkCreate.as_view(),
+        name="tag-bulk-create",
+    ),
 
     # Events
     path(
@@ -141,6 +156,11 @@ urlpatterns = [
         EventDetail.as_view(),
         name="event-detail",
     ),
+    path(
+        "events/bulk/",
+        EventBulkCreate.as_view(),
+        name="event-bulk-create",
+    ),
 
     # FanArt
     path(
@@ -153,6 +173,11 @@ urlpatterns = [
         FanArtDetail.as_view(),
         name="fanart-detail",
     ),
+    path(
+        "fanart/bulk/",
+        FanArtBulkCreate.as_view(),
+        name="fanart-bulk-create",
+    ),
 
     # Seasonal reports
     path(
@@ -196,11 +221,21 @@ urlpatterns = [
         ChapterListCreate.as_view(),
         name="chapter-list-create",
     ),
+    path(
+        "fanfiction/<int:fanfic_id>/chapters/bulk/",
+        ChapterBulkCreate.as_view(),
+        name="chapter-bulk-create",
+    ),
     path(
         "chapters/<int:pk>/",
         ChapterDetail.as_view(),
         name="chapter-detail",
     ),
+    path(
+        "chapters/<int:pk>/text/",
+        ChapterTextView.as_view(),
+        name="chapter-text",
+    ),
 
     # Comments
     path(
@@ -208,11 +243,54 @@ urlpatterns = [
         CommentListCreate.as_view(),
         name="comment-list-create",
     ),
+    path(
+        "comments/tree/",
+        CommentThreadList.as_view(),
+        name="comment-tree",
+    ),
     path(
         "comments/<int:pk>/",
         CommentDetail.as_view(),
         name="comment-detail",
     ),
 
+    # Landing page
+    path(
+        "home/",
+        HomeView.as_view(),
+        name="home",
+    ),
+
+    # Search
+    path(
+        "search/",
+        SearchView.as_view(),
+        name="search",
+    ),
+
+    # Metrics
+    path(
+        "_metrics",
+        MetricsView.as_view(),
+        name="metrics",
+    ),
+
+#-----------------------------------------Async read API (see core/async_views.py)------------------------------------
+    path("async/announcements/", async_views.AnnouncementList.as_view(), name="async-announcement-list"),
+    path("async/events/", async_views.EventList.as_view(), name="async-event-list"),
+    path("async/events/<int:pk>/", async_views.EventDetail.as_view(), name="async-event-detail"),
+    path("async/fanart/", async_views.FanArtList.as_view(), name="async-fanart-list"),
+    path("async/fanart/<int:pk>/", async_views.FanArtDetail.as_view(), name="async-fanart-detail"),
+    path("async/fanfiction/", async_views.FanFictionList.as_view(), name="async-fanfiction-list"),
+    path("async/fanfiction/<int:pk>/", async_views.FanFictionDetail.as_view(), name="async-fanfiction-detail"),
+    path(
+        "async/fanfiction/<int:fanfic_id>/chapters/",
+        async_views.ChapterList.as_view(),
+        name="async-chapter-list",
+    ),
+    path("async/chapters/<int:pk>/", async_views.ChapterDetail.as_view(), name="async-chapter-detail"),
+    path("async/comments/", async_views.CommentList.as_view(), name="async-comment-list"),
+    path("async/comments/<int:pk>/", async_views.CommentDetail.as_view(), name="async-comment-detail"),
+
 ]
 
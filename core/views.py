@@ -2,21 +2,39 @@ from django.contrib.auth.models import User
 from rest_framework import generics, status
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, NotFound, PermissionDenied, ValidationError
 from rest_framework_simplejwt.exceptions import TokenError
-from .serializers import UserSerializer, CookieTokenObtainPairSerializer, TeamMemberSerializer, AnnouncementSerializer, TagSerializer, EventSerializer, FanArtSerializer, SeasonalReportSerializer, BlogPostSerializer, FanFictionSerializer, ChapterSerializer, CommentSerializer
+from .serializers import UserSerializer, CookieTokenObtainPairSerializer, TeamMemberSerializer, AnnouncementSerializer, TagSerializer, EventSerializer, FanArtSerializer, SeasonalReportSerializer, BlogPostSerializer, FanFictionSerializer, ChapterSerializer, ChapterSummarySerializer, CommentSerializer, CommentTreeSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, BasePermission, SAFE_METHODS
 from .models import TeamMember, Announcement, Tag, Event, FanArt, SeasonalReport, BlogPost, FanFiction, Chapter, Comment
+from django.db import transaction
 from django.db.models import Q
-from .pagination import FanFictionPagination
+from .pagination import (
+    FanFictionPagination,
+    FanFictionCursorPagination,
+    NewestFirstCursorPagination,
+    CommentPagination,
+    CommentThreadPagination,
+    ChapterPagination,
+    EventPagination,
+    SeasonalReportPagination,
+)
+from . import bulk, counters, home
+from .facets import TagFilter
+from .mixins import CachedListMixin, ConditionalGetMixin, EagerLoadingMixin, TagFacetMixin
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from rest_framework.filters import SearchFilter
-from rest_framework.throttling import ScopedRateThrottle
-from dotenv import load_dotenv
+from .search import FullTextSearchFilter, KINDS as SEARCH_KINDS, search
+from .instrumentation import prometheus_text
+from .reader import chapter_text_info, parse_range, stream_chapter_text
+from .tokens import CookieTokenRefreshSerializer, FilteredRefreshToken
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .throttling import ScopedRateThrottle
 import os
-load_dotenv()
 
 SECURE = os.getenv("SECURE", "False").lower() == "true"
 SAMESITE = os.getenv("SAMESITE", "Lax")
@@ -68,7 +86,6 @@ class CookieTokenObtainPairView(TokenObtainPairView):
 
         return response
 
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 
 class CookieTokenRefreshView(APIView):
     authentication_classes = []
@@ -83,19 +100,19 @@ class CookieTokenRefreshView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        # Rotates the refresh token and blacklists the old one, per SIMPLE_JWT.
+        serializer = CookieTokenRefreshSerializer(data={"refresh": refresh_token})
         try:
-            refresh = RefreshToken(refresh_token)
-
-            # SimpleJWT rotation happens here
-            new_access = refresh.access_token
-            new_refresh = str(refresh)  # SAME object, rotated internally
-
-        except TokenError:
+            serializer.is_valid(raise_exception=True)
+        except (TokenError, AuthenticationFailed, ObjectDoesNotExist):
             return Response(
                 {"detail": "Invalid or expired refresh token"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        new_access = serializer.validated_data["access"]
+        new_refresh = serializer.validated_data.get("refresh", refresh_token)
+
         response = Response({"detail": "Token refreshed"})
 
         response.set_cookie(
@@ -130,7 +147,7 @@ class LogoutView(APIView):
 
         if refresh_token:
             try:
-                RefreshToken(refresh_token).blacklist()
+                FilteredRefreshToken(refresh_token).blacklist()
             except TokenError:
                 pass
 
@@ -158,24 +175,26 @@ class MeView(APIView):
 
 
 # Team Member Views (Only admin can post or update or delete can be read by anyone)
-class TeamMemberListCreate(generics.ListCreateAPIView):
+class TeamMemberListCreate(CachedListMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = TeamMember.objects.all()
     serializer_class = TeamMemberSerializer
+    cache_models = (TeamMember,)
 
     def get_permissions(self):
         if self.request.method == "POST":
             return [IsAdminUser()]
         return [AllowAny()]
 
-class TeamMemberDetail(generics.RetrieveUpdateDestroyAPIView):
+class TeamMemberDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = TeamMember.objects.all()
     serializer_class = TeamMemberSerializer
     permission_classes = [IsAdminUser]
 
 
 # Announcement Views(Only admin can post or update or delete can be read by anyone)
-class AnnouncementListCreate(generics.ListCreateAPIView):
+class AnnouncementListCreate(CachedListMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = AnnouncementSerializer
+    cache_models = (Announcement,)
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -187,37 +206,43 @@ class AnnouncementListCreate(generics.ListCreateAPIView):
             return [IsAdminUser()]
         return [AllowAny()]
 
-class AnnouncementDetail(generics.RetrieveUpdateDestroyAPIView):
+class AnnouncementDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Announcement.objects.all()
     serializer_class = AnnouncementSerializer
     permission_classes = [IsAdminUser]
 
 # Tags Views (Only admin can create update or delete tags, can be used by anyone)
-class TagListCreate(generics.ListCreateAPIView):
+class TagListCreate(CachedListMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_models = (Tag,)
 
     def get_permissions(self):
         if self.request.method == "POST":
             return [IsAdminUser()]
         return [AllowAny()]
 
-class TagDetail(generics.RetrieveUpdateDestroyAPIView):
+class TagDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAdminUser]
 
 # Event Views(Only admin can create update or delete events, it can be read by anyone) 
-class EventListCreate(generics.ListCreateAPIView):
+class EventListCreate(CachedListMixin, TagFacetMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
+    pagination_class = EventPagination
+    cache_models = (Event, Tag)
+    # ?tags=slug,slug and ?facets=true, see core/facets.py
+    filter_backends = [TagFilter]
+    facet_kind = "event"
 
     def get_permissions(self):
         if self.request.method == "POST":
             return [IsAdminUser()]
         return [AllowAny()]
 
-class EventDetail(generics.RetrieveUpdateDestroyAPIView):
+class EventDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
 
@@ -227,16 +252,18 @@ class EventDetail(generics.RetrieveUpdateDestroyAPIView):
         return [AllowAny()]
     
 # FanArt Views (Only admin can create update or delete events, it can be read by anyone. Note: Serializer ensures that artist should be mentioned by admin)
-class FanArtListCreate(generics.ListCreateAPIView):
+class FanArtListCreate(CachedListMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = FanArt.objects.all()
     serializer_class = FanArtSerializer
+    pagination_class = NewestFirstCursorPagination
+    cache_models = (FanArt, User)
 
     def get_permissions(self):
         if self.request.method == "POST":
             return [IsAdminUser()]
         return [AllowAny()]
 
-class FanArtDetail(generics.RetrieveUpdateDestroyAPIView):
+class FanArtDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = FanArt.objects.all()
     serializer_class = FanArtSerializer
 
@@ -246,16 +273,18 @@ class FanArtDetail(generics.RetrieveUpdateDestroyAPIView):
         return [AllowAny()]
 
 # Seasonal Views (Only admin can create update or delete events, it can be read by anyone.)
-class SeasonalReportListCreate(generics.ListCreateAPIView):
+class SeasonalReportListCreate(CachedListMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = SeasonalReport.objects.all()
     serializer_class = SeasonalReportSerializer
+    pagination_class = SeasonalReportPagination
+    cache_models = (SeasonalReport,)
 
     def get_permissions(self):
         if self.request.method == "POST":
             return [IsAdminUser()]
         return [AllowAny()]
 
-class SeasonalReportDetail(generics.RetrieveUpdateDestroyAPIView):
+class SeasonalReportDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = SeasonalReport.objects.all()
     serializer_class = SeasonalReportSerializer
 
@@ -265,8 +294,9 @@ class SeasonalReportDetail(generics.RetrieveUpdateDestroyAPIView):
         return [AllowAny()]
     
 # Blog Views (Only user who are verified can post and all users can read)
-class BlogPostListCreate(generics.ListCreateAPIView):
+class BlogPostListCreate(ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = BlogPostSerializer
+    pagination_class = NewestFirstCursorPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -274,7 +304,7 @@ class BlogPostListCreate(generics.ListCreateAPIView):
             # Authenticated users see public posts + their own drafts
             return BlogPost.objects.filter(
                 Q(is_public=True) |
-                Q(author=user)
+                Q(author_id=user.id)
             )
         # Anonymous users see only public posts
         return BlogPost.objects.filter(is_public=True)
@@ -292,10 +322,10 @@ class BlogPostListCreate(generics.ListCreateAPIView):
 class IsAuthorOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
-            return obj.is_public or obj.author == request.user
-        return obj.author == request.user
+            return obj.is_public or obj.author_id == request.user.id
+        return obj.author_id == request.user.id
 
-class BlogPostDetail(generics.RetrieveUpdateDestroyAPIView):
+class BlogPostDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = BlogPost.objects.all()
     serializer_class = BlogPostSerializer
     permission_classes = [IsAuthorOrReadOnly]
@@ -307,20 +337,42 @@ class IsFanFictionAuthorOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
-        return obj.author == request.user
+        return obj.author_id == request.user.id
 
-class FanFictionListCreate(generics.ListCreateAPIView):
+class FanFictionListCreate(TagFacetMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = FanFiction.objects.all().order_by("-created_at")
     serializer_class = FanFictionSerializer
     pagination_class = FanFictionPagination
 
-    # 🔥 THIS WAS MISSING
-    filter_backends = [SearchFilter]
-    search_fields = [
-        "title",
-        "summary",
-        "tags__name",
-    ]
+    # ?search= goes through the full-text index (title, summary and tag names), ranked by relevance;
+    # ?tags=slug,slug and ?facets=true, see core/facets.py
+    filter_backends = [FullTextSearchFilter, TagFilter]
+    search_kind = "fanfiction"
+    facet_kind = "fanfiction"
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor switches to keyset pages; relevance-ranked searches stay on limit/offset.
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            use_cursor = (
+                (params.get("pagination") == "cursor" or "cursor" in params)
+                and not params.get(FullTextSearchFilter.search_param)
+            )
+            self._paginator = FanFictionCursorPagination() if use_cursor else self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        status = self.get_facet_status()
+        return super().get_queryset() if status is None else super().get_queryset().filter(status=status)
+
+    def get_facet_status(self):
+        # ?status= narrows both the stories and their tag facets.
+        status = self.request.query_params.get("status") or None
+        statuses = dict(FanFiction.STATUS_CHOICES)
+        if status is not None and status not in statuses:
+            raise ValidationError({"status": f"Choose from {', '.join(statuses)}."})
+        return status
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -330,7 +382,7 @@ class FanFictionListCreate(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class FanFictionDetail(generics.RetrieveUpdateDestroyAPIView):
+class FanFictionDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = FanFiction.objects.all()
     serializer_class = FanFictionSerializer
     permission_classes = [IsFanFictionAuthorOrReadOnly]
@@ -343,48 +395,93 @@ class IsChapterAuthorOrReadOnly(BasePermission):
             return True
 
         # Write allowed only to the fanfiction author
-        return obj.fanfiction.author == request.user
+        return obj.fanfiction.author_id == request.user.id
 
-class ChapterListCreate(generics.ListCreateAPIView):
-    serializer_class = ChapterSerializer
+class ChapterListCreate(ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
+    pagination_class = ChapterPagination
 
     def get_queryset(self):
         fanfic_id = self.kwargs["fanfic_id"]
         return Chapter.objects.filter(fanfiction_id=fanfic_id)
 
+    def get_serializer_class(self):
+        # Lists are a table of contents unless ?include=content asks for the full text.
+        if self.request.method == "GET" and self.request.query_params.get("include") != "content":
+            return ChapterSummarySerializer
+        return ChapterSerializer
+
     def get_permissions(self):
         if self.request.method == "POST":
             return [IsAuthenticated()]
         return [AllowAny()]
 
     def perform_create(self, serializer):
-        fanfic = FanFiction.objects.get(id=self.kwargs["fanfic_id"])
-
-        if fanfic.author != self.request.user:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Not allowed")
-
-        last_chapter = (
-            Chapter.objects
-            .filter(fanfiction=fanfic)
-            .order_by("-chapter_number")
-            .first()
-        )
+        fanfic_id = self.kwargs["fanfic_id"]
 
-        next_number = 1 if not last_chapter else last_chapter.chapter_number + 1
+        with transaction.atomic():
+            chapter_number = counters.allocate_chapter_number(fanfic_id, self.request.user)
+            if chapter_number is None:
+                if FanFiction.objects.filter(id=fanfic_id).exists():
+                    raise PermissionDenied("Not allowed")
+                raise NotFound()
 
-        serializer.save(
-            fanfiction=fanfic,
-            chapter_number=next_number
-        )
+            serializer.save(
+                fanfiction_id=fanfic_id,
+                chapter_number=chapter_number
+            )
 
 
-class ChapterDetail(generics.RetrieveUpdateDestroyAPIView):
+class ChapterDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Chapter.objects.all()
     serializer_class = ChapterSerializer
     permission_classes = [IsChapterAuthorOrReadOnly]
 
 
+class ChapterTextView(APIView):
+    """
+    Streams a chapter's text as UTF-8 plain text, read from the database in
+    chunks (see core/reader.py). Supports single byte ranges, with If-Range,
+    so readers can resume or page through a long chapter.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        info = chapter_text_info(pk)
+        if info is None:
+            raise NotFound()
+        size, updated_at = info
+
+        etag = quote_etag(f"{pk}-{updated_at.timestamp()}-{size}")
+        timestamp = int(updated_at.timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if if_range is None or if_range == etag:
+            byte_range = parse_range(request.headers.get("Range"), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            stream_chapter_text(pk, updated_at, start, end),
+            content_type="text/plain; charset=utf-8",
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        )
+        response["Content-Length"] = max(end - start + 1, 0)
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(timestamp)
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response
+
+
 
 # Comments (Can be read by any but written only by authenticated users)
 class IsCommentAuthorOrReadOnly(BasePermission):
@@ -393,24 +490,25 @@ class IsCommentAuthorOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         # Only author can edit/delete
-        return obj.author == request.user
+        return obj.author_id == request.user.id
 
-class CommentListCreate(generics.ListCreateAPIView):
-    serializer_class = CommentSerializer
+COMMENT_PARENT_REQUIRED = "parent_type (blog, fanfiction or chapter) and a numeric parent_id are required."
 
-    def get_queryset(self):
-        parent_type = self.request.query_params.get("parent_type")
-        parent_id = self.request.query_params.get("parent_id")
 
-        queryset = Comment.objects.all()
+class CommentListCreate(ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
 
-        if parent_type and parent_id:
-            queryset = queryset.filter(
-                parent_type=parent_type,
-                parent_id=parent_id
-            )
+    def get_queryset(self):
+        # Listing is always scoped to one parent, which is an index range scan on (parent, created_at).
+        if self.request.method != "GET":
+            return Comment.objects.all()
 
-        return queryset
+        params = self.request.query_params
+        lookup = Comment.parent_lookup(params.get("parent_type"), params.get("parent_id"))
+        if lookup is None:
+            raise ValidationError({"detail": COMMENT_PARENT_REQUIRED})
+        return Comment.objects.filter(**lookup)
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -420,13 +518,169 @@ class CommentListCreate(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
+class CommentThreadList(CommentListCreate):
+    """
+    Top-level comments of one parent with their replies nested under them.
+    Roots are paged, and ?depth= (0 to Comment.MAX_DEPTH) limits how many
+    levels of replies come back. The replies of a whole page are one path
+    range, so they load in a single ordered query.
+    """
+    http_method_names = ["get", "head", "options"]
+    serializer_class = CommentTreeSerializer
+    pagination_class = CommentThreadPagination
+    max_replies = 500
+
+    def get_queryset(self):
+        return super().get_queryset().filter(depth=0)
+
+    def get_depth(self):
+        depth = self.request.query_params.get("depth", "")
+        if not depth:
+            return Comment.MAX_DEPTH
+        if not depth.isdigit():
+            raise ValidationError({"depth": "Must be a non-negative integer."})
+        return min(int(depth), Comment.MAX_DEPTH)
+
+    def paginate_queryset(self, queryset):
+        roots = super().paginate_queryset(queryset)
+        depth = self.get_depth()
+        if not roots or depth == 0:
+            return roots
+
+        replies = (
+            super().get_queryset()
+            .filter(
+                depth__range=(1, depth),
+                path__gt=roots[0].path,
+                path__lt=roots[-1].path + "~",  # after every path starting with the last root's
+            )
+            .order_by("path")
+        )
+        return roots + list(self.filter_queryset(replies)[:self.max_replies])
+
+class CommentDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsCommentAuthorOrReadOnly]
 
 
+# Bulk creation (a JSON array per POST, see core/bulk.py)
+class BulkCreateView(generics.GenericAPIView):
+    """
+    Creates up to BULK_MAX_ITEMS objects, each as the list endpoint's POST
+    takes it, in one transaction. If any item is invalid nothing is created
+    and the 400 response lists each item's errors in order ({} if valid).
+
+    Subclasses set bulk_create_function, one of the create_* functions in
+    core/bulk.py, which get_bulk_create_kwargs() can pass more arguments.
+    """
+    http_method_names = ["post", "options"]
+    permission_classes = [IsAdminUser]
+    bulk_create_function = None
+
+    def post(self, request, *args, **kwargs):
+        serializer = bulk.BulkListSerializer(
+            child=self.get_serializer(),
+            data=request.data,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            created = self.bulk_create_function(serializer.validated_data, **self.get_bulk_create_kwargs())
+
+        serializer_class = self.get_serializer_class()
+        rows = serializer_class.setup_eager_loading(
+            serializer_class.Meta.model.objects.filter(pk__in=[obj.pk for obj in created])
+        ).order_by("pk")
+        return Response(self.get_serializer(rows, many=True).data, status=status.HTTP_201_CREATED)
+
+    def get_bulk_create_kwargs(self):
+        return {}
+
+
+class TagBulkCreate(BulkCreateView):
+    serializer_class = TagSerializer
+    bulk_create_function = staticmethod(bulk.create_tags)
+
+
+class EventBulkCreate(BulkCreateView):
+    serializer_class = EventSerializer
+    bulk_create_function = staticmethod(bulk.create_events)
+
 
+class FanArtBulkCreate(BulkCreateView):
+    serializer_class = FanArtSerializer
+    bulk_create_function = staticmethod(bulk.create_fanart)
 
 
+class ChapterBulkCreate(BulkCreateView):
+    # Appended to the story in order, with consecutive chapter numbers.
+    serializer_class = ChapterSerializer
+    permission_classes = [IsAuthenticated]
+    bulk_create_function = staticmethod(bulk.create_chapters)
+
+    def get_bulk_create_kwargs(self):
+        return {"fanfic_id": self.kwargs["fanfic_id"], "author": self.request.user}
+
+
+# Landing page (all the sections the homepage renders, in one request)
+class HomeView(APIView):
+    """
+    The landing page sections in one response, see core/home.py. ?sections=
+    (or ?fields=) picks the ones to include, comma separated; all by default.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        requested = params.get("sections") or params.get("fields") or ""
+        names = list(dict.fromkeys(name.strip() for name in requested.split(",") if name.strip()))
+        unknown = [name for name in names if name not in home.SECTIONS]
+        if unknown:
+            raise ValidationError({"sections": f"Unknown: {', '.join(unknown)}. Choose from {', '.join(home.SECTIONS)}."})
+        names = names or list(home.SECTIONS)
+
+        # The keys carry the sections' model versions, so they make the ETag too.
+        keys = home.section_keys(names)
+        etag = home.etag_for(keys)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+
+        data, hits = home.payload(names, keys)
+        response = Response(data)
+        response["ETag"] = etag
+        response["X-Cache"] = "HIT" if hits == len(names) else "MISS" if hits == 0 else "PARTIAL"
+        return response
+
+
+# Metrics (staff only, scraped by Prometheus)
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Search (Anyone can search stories, chapters and public blog posts)
+class SearchView(APIView):
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        kinds = request.query_params.get("type")
+        kinds = kinds.split(",") if kinds else SEARCH_KINDS
+
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), self.max_limit)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            return Response(
+                {"detail": "limit and offset must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        results = search(query, kinds=kinds, limit=limit, offset=offset) if query else []
+        return Response({"query": query, "results": results})